@@ -135,6 +135,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.utils.middleware.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -297,6 +298,33 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
+# Rust backed JSON rendering/parsing with orjson, see core.utils.renderers
+if env.bool("DJANGO_FAST_JSON", default=False):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "core.utils.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = (
+        "core.utils.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    )
+# Above this many rows views using EstimatedCountPagination and the admin
+# changelist report the planner's row estimate instead of running an exact COUNT(*)
+PAGINATION_ESTIMATE_THRESHOLD = env.int("PAGINATION_ESTIMATE_THRESHOLD", default=10_000)
+
+# Per request query budget, see core.utils.middleware.QueryBudgetMiddleware
+QUERY_BUDGET = {
+    "MAX_QUERIES": env.int("QUERY_BUDGET_MAX_QUERIES", default=50),
+    "MAX_DURATION_MS": env.int("QUERY_BUDGET_MAX_DURATION_MS", default=500),
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "RAISE": False,
+    "VIEWS": {},
+}
+
+# Seconds a CachedListMixin response is kept, entries are invalidated earlier
+# through the per model version counters in core.utils.cache
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=60 * 5)
 
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/api/.*$"
@@ -3,6 +3,7 @@ With these settings, tests run faster.
 """
 
 from .base import *  # noqa: F403
+from .base import QUERY_BUDGET
 from .base import TEMPLATES
 from .base import env
 
@@ -30,6 +31,13 @@ EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 # ------------------------------------------------------------------------------
 TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore[index]
 
+# QUERY BUDGET
+# ------------------------------------------------------------------------------
+# Fail the test instead of logging when a view goes over its query budget
+QUERY_BUDGET["RAISE"] = True
+# DB time is too noisy on shared CI runners to fail on
+QUERY_BUDGET["MAX_DURATION_MS"] = None
+
 # MEDIA
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
@@ -4,6 +4,8 @@ from django.db import models
 from unfold.admin import ModelAdmin as _ModelAdmin
 from unfold.contrib.forms.widgets import ArrayWidget, WysiwygWidget
 
+from core.utils.pagination import EstimatedCountPaginator
+
 
 class ModelAdmin(_ModelAdmin):
     # Display fields in changeform in compressed mode
@@ -28,6 +30,11 @@ class ModelAdmin(_ModelAdmin):
     # Position horizontal scrollbar in changelist at the top
     list_horizontal_scrollbar_top = True
 
+    # Use row estimates instead of COUNT(*) on large tables
+    paginator = EstimatedCountPaginator
+    # Skip the extra unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+
     # Custom actions
     # actions_list = []  # Displayed above the results list
     # actions_row = []  # Displayed in a table row in results list
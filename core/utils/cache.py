@@ -0,0 +1,157 @@
+import hashlib
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from logging import getLogger
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+logger = getLogger(__file__)
+
+MODEL_VERSION_PREFIX = "model-version"
+RESPONSE_CACHE_PREFIX = "response-cache"
+
+
+def get_response_cache_timeout() -> int:
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60 * 5)
+
+
+def _model_version_key(model: type[models.Model]) -> str:
+    return f"{MODEL_VERSION_PREFIX}:{model._meta.label_lower}"  # noqa: SLF001
+
+
+def get_model_versions(model_classes: Iterable[type[models.Model]]) -> dict[str, int]:
+    """Return the current version counter of each model, creating missing ones
+
+    Args:
+        model_classes (Iterable[type[models.Model]]): models a cached value
+            depends on
+
+    Returns:
+        dict[str, int]: model label -> version
+    """
+    keys = {
+        _model_version_key(model): model._meta.label_lower  # noqa: SLF001
+        for model in model_classes
+    }
+    versions = cache.get_many(list(keys))
+    for key in keys.keys() - versions.keys():
+        # seed with the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_model_version(model: type[models.Model]) -> None:
+    """Invalidate every cached response depending on ``model``.
+
+    ``save()``/``delete()`` of models passed to :func:`track_model_versions`
+    call this through signals; call it directly after
+    ``QuerySet.update()``, ``bulk_create()`` and ``bulk_update()`` which don't
+    send them.
+    """
+    key = _model_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _bump_on_write(sender, **kwargs):
+    bump_model_version(sender)
+
+
+def _bump_on_m2m_changed(sender, instance, action, model, **kwargs):
+    if not action.startswith("post_"):
+        return
+    bump_model_version(sender)
+    bump_model_version(type(instance))
+    bump_model_version(model)
+
+
+def track_model_versions(*model_classes: type[models.Model]) -> None:
+    """Bump the version of ``model_classes`` when one of their rows is saved
+    or deleted, or one of their many to many relations changes.
+
+    Receivers are connected per model so writes to untracked models (sessions,
+    ``last_login``) never touch the cache. Calling it again is a no-op.
+    """
+    for model in model_classes:
+        opts = model._meta  # noqa: SLF001
+        uid = f"{MODEL_VERSION_PREFIX}:{opts.label}"
+        post_save.connect(_bump_on_write, sender=model, dispatch_uid=uid)
+        post_delete.connect(_bump_on_write, sender=model, dispatch_uid=uid)
+        for field in opts.get_fields():
+            if not field.many_to_many:
+                continue
+            # m2m_changed is sent by the through model, forward and reverse
+            through = field.remote_field.through if field.concrete else field.through
+            m2m_changed.connect(
+                _bump_on_m2m_changed,
+                sender=through,
+                dispatch_uid=f"{MODEL_VERSION_PREFIX}:{through._meta.label}",  # noqa: SLF001
+            )
+
+
+def make_response_cache_key(*parts: Any) -> str:
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+    return f"{RESPONSE_CACHE_PREFIX}:{digest}"
+
+
+def get_or_compute(  # noqa: PLR0913
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int | None = None,
+    *,
+    lock_timeout: float = 10,
+    wait: float = 5,
+    poll_interval: float = 0.05,
+) -> Any:
+    """Fetch ``key`` from the cache or compute and store it.
+
+    Only the worker that wins the lock recomputes a missing entry, the others
+    poll the cache for up to ``wait`` seconds before computing it themselves.
+
+    Args:
+        key (str): cache key
+        compute (Callable[[], Any]): builds the value on a miss, returning None
+            skips caching
+        timeout (int | None, optional): cache timeout. Defaults to
+            RESPONSE_CACHE_TIMEOUT.
+        lock_timeout (float, optional): seconds before an abandoned lock
+            expires. Defaults to 10.
+        wait (float, optional): seconds to wait for another worker. Defaults to 5.
+        poll_interval (float, optional): seconds between polls. Defaults to 0.05.
+
+    Returns:
+        Any: cached or computed value
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    timeout = get_response_cache_timeout() if timeout is None else timeout
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        logger.warning("gave up waiting for %s, computing it", key)
+        return compute()
+
+    try:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout=timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
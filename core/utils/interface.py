@@ -1,7 +1,13 @@
+# random only draws example values, nothing here needs a secure generator
+# ruff: noqa: S311
+
 import json
-import string
+import math
 import random
-from logging import getLogger
+import string
+from collections.abc import Callable
+from logging import DEBUG, getLogger
+from time import perf_counter
 from typing import Any, ClassVar, Literal
 from django.utils.timezone import now
 from drf_spectacular.extensions import OpenApiSerializerFieldExtension
@@ -11,6 +17,327 @@ from pydantic import BaseModel as _BaseModel
 
 logger = getLogger(__file__)
 
+# (model, args, kwargs) -> json schema, see BaseModel.model_json_schema
+_json_schema_cache: dict[tuple, dict[str, Any]] = {}
+# model -> compiled example sampler, see BaseModel.example_sampler
+_sampler_cache: dict[type, Callable[[], dict]] = {}
+
+
+def copy_json(value):
+    """copy of a JSON-like tree, much cheaper than copy.deepcopy"""
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+def inline_refs(  # noqa: C901
+    schema: Any,
+    defs: dict[str, Any],
+    max_depth: int | None = None,
+    cycles: list[str] | None = None,
+) -> Any:
+    """Replace ``{"$ref": ...}`` nodes with their definition from ``defs``.
+
+    The tree is walked with an explicit stack, so deep schemas can't hit the
+    recursion limit. Each definition is resolved once and the result is
+    shared by every place referencing it instead of being copied.
+
+    Args:
+        schema (Any): tree to resolve, it is not modified
+        defs (dict[str, Any]): "$ref" value -> definition
+        max_depth (int | None, optional): levels of nested refs to inline,
+            deeper refs are left as they are. None inlines everything and
+            leaves a ref already being inlined above it (a cycle) as a stub.
+            Defaults to None.
+        cycles (list[str] | None, optional): collects the refs left as stubs
+
+    Returns:
+        Any: resolved tree
+    """
+    memo: dict[tuple[str, int | None], Any] = {}
+    result = [None]
+    # frames: [items iterator, result container, level, active refs, memo key]
+    stack: list[list] = []
+
+    def enter(node, level: int, active: frozenset, container, slot):
+        """resolve ``node`` into ``container[slot]``, pushing a frame when it
+        has children to walk"""
+        ref = node.get("$ref") if isinstance(node, dict) else None
+        if ref:
+            if ref not in defs or (max_depth is not None and level >= max_depth):
+                container[slot] = node
+                return
+            if max_depth is None and ref in active:
+                if cycles is not None:
+                    cycles.append(ref)
+                container[slot] = node
+                return
+            key = (ref, None if max_depth is None else level + 1)
+            if key in memo:
+                container[slot] = memo[key]
+                return
+            target = defs[ref]
+            if type(target) not in (dict, list) or (
+                max_depth is not None and level + 1 >= max_depth
+            ):
+                # nothing left to inline below, share the definition itself
+                memo[key] = container[slot] = target
+                return
+            if type(target) is dict and target.get("$ref"):
+                # alias of another definition
+                enter(target, level + 1, active | {ref}, container, slot)
+                memo[key] = container[slot]
+                return
+            node, level, active = target, level + 1, active | {ref}
+        else:
+            key = None
+        if isinstance(node, dict):
+            items, value = iter(node.items()), {}
+        elif isinstance(node, list):
+            items, value = iter(enumerate(node)), [None] * len(node)
+        else:
+            container[slot] = node
+            return
+        container[slot] = value
+        stack.append([items, value, level, active, key])
+
+    enter(schema, 0, frozenset(), result, 0)
+    while stack:
+        frame = stack[-1]
+        items, value, level, active, key = frame
+        for slot, item in items:
+            if type(item) in (list, dict):
+                enter(item, level, active, value, slot)
+                if stack[-1] is not frame:
+                    break
+            else:
+                value[slot] = item
+        else:
+            stack.pop()
+            if key is not None:
+                memo[key] = value
+    return result[0]
+
+
+def remove_circular_refs(ob, _seen=None, cycles: list[tuple] | None = None):  # noqa: C901
+    """Replace every container nested inside itself with None.
+
+    Walks with an explicit stack. Only the containers on the path to a
+    cycle are copied; every other subtree is returned as is, shared with
+    ``ob``.
+
+    Args:
+        ob (_type_): dict/list/tuple tree, it is not modified
+        _seen (_type_, optional): ids to treat as ancestors of ``ob``
+        cycles (list[tuple] | None, optional): collects the path (keys and
+            indexes from ``ob``) of every reference that was cut
+
+    Returns:
+        _type_: ``ob`` itself when there is no cycle
+    """
+    if not isinstance(ob, (dict, list, tuple)):
+        return ob
+    active = set(_seen or ())
+    if id(ob) in active:
+        return None
+
+    def items(node):
+        return iter(node.items()) if isinstance(node, dict) else iter(enumerate(node))
+
+    def path(frame, slot) -> tuple:
+        keys = [slot]
+        while frame[3] is not None:
+            keys.append(frame[4])
+            frame = frame[3]
+        return tuple(reversed(keys))
+
+    def rebuild(node, changes: dict):
+        if isinstance(node, dict):
+            return {k: changes.get(k, v) for k, v in node.items()}
+        copy = list(node)
+        for index, value in changes.items():
+            copy[index] = value
+        return copy if isinstance(node, list) else type(node)(copy)
+
+    # frames: [node, items, changes, parent frame, slot in parent]
+    root = [ob, items(ob), {}, None, None]
+    stack = [root]
+    active.add(id(ob))
+    result = ob
+    while stack:
+        frame = stack[-1]
+        for slot, value in frame[1]:
+            if not isinstance(value, (dict, list, tuple)):
+                continue
+            if id(value) in active:
+                frame[2][slot] = None
+                if cycles is not None:
+                    cycles.append(path(frame, slot))
+                continue
+            active.add(id(value))
+            stack.append([value, items(value), {}, frame, slot])
+            break
+        else:
+            stack.pop()
+            node, _, changes, parent, slot = frame
+            active.discard(id(node))
+            new = rebuild(node, changes) if changes else node
+            if parent is None:
+                result = new
+            elif new is not node:
+                parent[2][slot] = new
+    return result
+
+
+def _sample_string(schema: dict) -> Callable[[], str]:
+    format_ = schema.get("format")
+    if format_ == "date-time":
+        return lambda: now().strftime("%Y-%m-%d %H:%M:%S")
+    if format_ == "date":
+        return lambda: now().strftime("%Y-%m-%d")
+    max_length = schema.get("maxLength", 25)
+    min_length = schema.get("minLength", min(5, max_length))
+    max_length = max(max_length, min_length)
+    letters = string.ascii_uppercase
+    return lambda: "".join(
+        random.choices(letters, k=random.randint(min_length, max_length)),
+    )
+
+
+def _sample_integer(schema: dict) -> Callable[[], int]:  # noqa: C901
+    multiple = schema.get("multipleOf", 1)
+    if schema.get("format") == "int32":
+        default_low, default_high = 100000, 9000000
+    else:
+        default_low, default_high = 10000000000, 500000000000
+    span = default_high - default_low
+    # bounds in units of multipleOf, None when the schema leaves that side open
+    low = high = None
+    if "minimum" in schema:
+        low = math.ceil(schema["minimum"] / multiple)
+    if "maximum" in schema:
+        high = math.floor(schema["maximum"] / multiple)
+    # a number since JSON Schema draft 6, a flag on minimum/maximum in OpenAPI 3.0
+    exclusive_minimum = schema.get("exclusiveMinimum")
+    if exclusive_minimum is True and low is not None:
+        exclusive_minimum = schema["minimum"]
+    if not isinstance(exclusive_minimum, bool) and exclusive_minimum is not None:
+        bound = math.floor(exclusive_minimum / multiple) + 1
+        low = bound if low is None else max(low, bound)
+    exclusive_maximum = schema.get("exclusiveMaximum")
+    if exclusive_maximum is True and high is not None:
+        exclusive_maximum = schema["maximum"]
+    if not isinstance(exclusive_maximum, bool) and exclusive_maximum is not None:
+        bound = math.ceil(exclusive_maximum / multiple) - 1
+        high = bound if high is None else min(high, bound)
+
+    if low is None and high is None:
+        low, high = default_low, default_high
+    elif low is None and high >= default_low:
+        low = default_low
+    elif low is None:
+        low = 0 if high >= 0 else high - span
+    elif high is None:
+        high = max(default_high, low + span)
+    high = max(low, high)
+    return lambda: random.randint(low, high) * multiple
+
+
+def _sample_array(schema: dict, memo: dict) -> Callable[[], list] | None:
+    item = compile_sampler(schema.get("items") or {}, memo)
+    if item is None:
+        return None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    # 1 to 3 items unless the schema says otherwise
+    if min_items is None:
+        min_items = 1 if max_items is None else min(1, max_items)
+    if max_items is None:
+        max_items = max(3, min_items)
+    max_items = max(min_items, max_items)
+    return lambda: [item() for _ in range(random.randint(min_items, max_items))]
+
+
+def _sample_object(schema: dict, memo: dict) -> Callable[[], dict]:
+    fields = [
+        (key, sampler)
+        for key, value in (schema.get("properties") or {}).items()
+        if isinstance(value, dict) and (sampler := compile_sampler(value, memo))
+    ]
+    return lambda: {key: sampler() for key, sampler in fields}
+
+
+def _sample_any(samplers: list[Callable[[], Any]]) -> Callable[[], Any] | None:
+    if len(samplers) <= 1:
+        return samplers[0] if samplers else None
+
+    def sample():
+        return random.choice(samplers)()
+
+    return sample
+
+
+def compile_sampler(  # noqa: C901, PLR0912
+    schema: dict,
+    memo: dict | None = None,
+) -> Callable[[], Any] | None:
+    """Compile a json schema into a tree of closures drawing random examples.
+
+    The schema is read once, so each call only costs the random draws.
+    Unresolved "$ref"s and types that can't be sampled compile to None and
+    their properties are left out.
+
+    Args:
+        schema (dict): json schema
+        memo (dict | None, optional): compiled samplers by schema id, shared
+            subtrees compile once
+
+    Returns:
+        Callable[[], Any] | None: sampler
+    """
+    memo = {} if memo is None else memo
+    if id(schema) in memo:
+        return memo[id(schema)][1]
+
+    type_ = schema.get("type")
+    if "const" in schema:
+        value = schema["const"]
+        sampler = lambda: value  # noqa: E731
+    elif schema.get("enum"):
+        enum = list(schema["enum"])
+        sampler = lambda: random.choice(enum)  # noqa: E731
+    elif isinstance(type_, list):
+        sampler = _sample_any(
+            [s for t in type_ if (s := compile_sampler({**schema, "type": t}, memo))],
+        )
+    elif type_ is None and (branches := schema.get("anyOf") or schema.get("oneOf")):
+        sampler = _sample_any(
+            [s for branch in branches if (s := compile_sampler(branch, memo))],
+        )
+    elif type_ is None and schema.get("allOf"):
+        sampler = compile_sampler(schema["allOf"][0], memo)
+    elif type_ == "string":
+        sampler = _sample_string(schema)
+    elif type_ == "integer":
+        sampler = _sample_integer(schema)
+    elif type_ == "number":
+        sampler = random.random
+    elif type_ == "boolean":
+        sampler = lambda: random.choice((True, False))  # noqa: E731
+    elif type_ == "null":
+        sampler = lambda: None  # noqa: E731
+    elif type_ == "array":
+        sampler = _sample_array(schema, memo)
+    elif type_ == "object" or (type_ is None and "properties" in schema):
+        sampler = _sample_object(schema, memo)
+    else:
+        sampler = None
+    # keep the schema alive so its id can't be reused by another dict
+    memo[id(schema)] = (schema, sampler)
+    return sampler
+
 
 class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
     target_class: ClassVar[str]
@@ -29,7 +356,7 @@ class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
     def replace_ref(
         cls, defs: dict, schema: dict | list
     ) -> dict[str, Any] | list | Any:
-        """Function replace all ref with thier object
+        """Function replace all ref with thier object, one level deep
 
         Args:
             defs (dict): _description_
@@ -38,21 +365,7 @@ class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
         Returns:
             dict[str,Any]|list|Any: _description_
         """
-        if isinstance(schema, list):
-            return [cls.replace_ref(defs, value) for value in schema]
-        elif isinstance(schema, dict):
-            if schema.get("$ref"):
-                return defs.get(schema.get("$ref"), schema)
-            else:
-                return {
-                    key: (
-                        cls.replace_ref(defs, value)
-                        if type(value) in [list, dict]
-                        else value
-                    )
-                    for key, value in schema.items()
-                }
-        return schema
+        return inline_refs(schema, defs, max_depth=1)
 
     @classmethod
     def get_defs(cls, data: dict) -> dict[str, Any]:
@@ -61,16 +374,31 @@ class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
 
     @classmethod
     def model_json_schema(cls, *args, **kwargs) -> dict[str, Any]:
-        """Generate jsonschema of the model.
+        """Generate jsonschema of the model with every $ref inlined.
+
+        Schemas are memoized per class and arguments until the next
+        ``model_rebuild``, each caller gets its own copy.
 
         Returns:
             dict[str,Any]: _description_
         """
+        try:
+            key = (cls, args, tuple(sorted(kwargs.items())))
+            schema = _json_schema_cache.get(key)
+        except TypeError:
+            # unhashable arguments, nothing to memoize on
+            return cls._build_json_schema(*args, **kwargs)
+        if schema is None:
+            schema = _json_schema_cache[key] = cls._build_json_schema(*args, **kwargs)
+        return copy_json(schema)
+
+    @classmethod
+    def _build_json_schema(cls, *args, **kwargs) -> dict[str, Any]:
         data = super().model_json_schema(*args, **kwargs)
-        defs: dict = cls.get_defs(data)
-        res = cls.replace_ref(defs=defs, schema=data)
-        res.pop("$defs", None)
-        return res
+        defs = {f"#/$defs/{key}": value for key, value in data.pop("$defs", {}).items()}
+        # same as replace_ref over get_defs: refs inside definitions are
+        # inlined once, deeper ones are kept
+        return inline_refs(data, defs, max_depth=2)
 
     @classmethod
     def model_json_schema_no_defs(cls, *args, **kwargs) -> dict[str, Any]:
@@ -79,45 +407,62 @@ class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
         Returns:
             dict[str,Any]:
         """
-        data = super().model_json_schema(*args, **kwargs)
-        defs: dict = cls.get_defs(data)
-        res = cls.replace_ref(defs=defs, schema=data)
-        res.pop("$defs", None)
-        return res
-
-    def remove_circular_refs(self, ob, _seen=None):
-        if _seen is None:
-            _seen = set()
-        if id(ob) in _seen:
-            # circular reference, remove it.
-            return None
-        _seen.add(id(ob))
-        res = ob
-        if isinstance(ob, dict):
-            res = {
-                self.remove_circular_refs(k, _seen): self.remove_circular_refs(v, _seen)
-                for k, v in ob.items()
-            }
-        elif isinstance(ob, (list, tuple, set, frozenset)):
-            res = type(ob)(self.remove_circular_refs(v, _seen) for v in ob)
-        # remove id again; only *nested* references count
-        _seen.remove(id(ob))
-        return res
+        return cls.model_json_schema(*args, **kwargs)
+
+    @classmethod
+    def model_rebuild(
+        cls,
+        *,
+        force: bool = False,
+        raise_errors: bool = True,
+        _parent_namespace_depth: int = 2,
+        _types_namespace=None,
+    ) -> bool | None:
+        result = super().model_rebuild(
+            force=force,
+            raise_errors=raise_errors,
+            # one frame deeper than pydantic expects because of this override
+            _parent_namespace_depth=_parent_namespace_depth + 1,
+            _types_namespace=_types_namespace,
+        )
+        # other models embedding this one are affected too
+        _json_schema_cache.clear()
+        _sampler_cache.clear()
+        return result
+
+    def remove_circular_refs(self, ob, _seen=None, cycles: list[tuple] | None = None):
+        """Replace containers that contain themselves with None, see
+        :func:`remove_circular_refs`"""
+        return remove_circular_refs(ob, _seen, cycles)
 
     def model_dump_no_refs(self, *args, **kwargs) -> dict[str, Any]:
-        logger.info("Started .model_dump_no_refs")
-        data = self.model_dump(*args, **kwargs)
-        logger.info("Finished .model_dump_no_refs")
-        return data
+        return self.model_dump(*args, **kwargs)
+
+    def model_dump(self, *args, resolve_refs: bool = False, **kwargs) -> dict[str, Any]:
+        """pydantic's model_dump
 
-    def model_dump(self, *args, **kwargs) -> dict[str, Any]:
-        logger.info("Started .model_dump")
+        Args:
+            resolve_refs (bool, optional): inline "#/$defs/..." refs using a
+                dumped "$defs" key and drop it. Defaults to False.
+
+        Returns:
+            dict[str, Any]:
+        """
+        if not logger.isEnabledFor(DEBUG) and not resolve_refs:
+            return super().model_dump(*args, **kwargs)
+
+        start = perf_counter()
         data = super().model_dump(*args, **kwargs)
-        defs: dict = self.get_defs(data)
-        res = self.replace_ref(defs=defs, schema=data)
-        res.pop("$defs", None)
-        logger.info("Finished .model_dump")
-        return res
+        if resolve_refs:
+            defs: dict = self.get_defs(data)
+            data = self.replace_ref(defs=defs, schema=data)
+            data.pop("$defs", None)
+        logger.debug(
+            "%s.model_dump took %.1fms",
+            type(self).__name__,
+            (perf_counter() - start) * 1000,
+        )
+        return data
 
     @classmethod
     def to_representation(cls, content):
@@ -125,156 +470,41 @@ class BaseModel(_BaseModel, OpenApiSerializerFieldExtension):
         return cls(**main)
 
     def dict_plain(self) -> dict:
-        return json.loads(self.model_dump(by_alias=True, mode="json"))
+        return json.loads(self.model_dump_json(by_alias=True))
 
-    def generatestring(data):
-        letters = string.ascii_uppercase
-        if "minLength" in data.keys():
-            minLength = data["minLength"]
-        else:
-            minLength = 5
+    @classmethod
+    def example_sampler(cls) -> Callable[[], dict]:
+        """Compiled once per class, call it for every example payload
 
-        if "maxLength" in data.keys():
-            maxLength = data["maxLength"]
-        else:
-            maxLength = 25
-
-        if "enum" in data.keys():
-            outstring = random.choice(data["enum"])
-        # elif 'pattern' in data.keys():
-        #     outstring = rstr.xeger(data['pattern'])
-        elif "format" in data.keys():
-            if data["format"] == "date-time":
-                outstring = now.strftime("%Y-%m-%d %H:%M:%S")
-            elif data["format"] == "date":
-                outstring = now.strftime("%Y-%m-%d")
-            else:
-                pass
-        else:
-            outstring = "".join(
-                random.choice(letters) for i in range(minLength, maxLength)
-            )
+        Returns:
+            Callable[[], dict]: draws a random payload matching the json schema
+        """
+        sampler = _sampler_cache.get(cls)
+        if sampler is None:
+            sampler = compile_sampler(cls.model_json_schema()) or dict
+            _sampler_cache[cls] = sampler
+        return sampler
 
-        return outstring
+    @staticmethod
+    def generatestring(data):
+        return compile_sampler({**data, "type": "string"})()
 
+    @staticmethod
     def generatenumber(data):
-        if "enum" in data.keys():
-            outnumber = random.choice(data["enum"])
-        elif "format" in data.keys():
-            if data["format"] in ("float", "double"):
-                outnumber = random.random()
-                # outdict[key] = random.uniform(10.5, 75.5)  Returns value within a range
-            else:
-                pass
-        else:
-            outnumber = random.random()
-
-        return outnumber
+        return compile_sampler({**data, "type": "number"})()
 
+    @staticmethod
     def generateinteger(data):
-        if "multipleOf" in data.keys():
-            multipleOf = data["multipleOf"]
-        else:
-            multipleOf = 1
-
-        if "minimum" in data.keys():
-            int32minimum = data["minimum"] / multipleOf
-            int64minimum = data["minimum"] / multipleOf
-        else:
-            int32minimum = 100000
-            int64minimum = 10000000000
-
-        if "maximum" in data.keys():
-            int32maximum = data["maximum"] / multipleOf
-            int64maximum = data["maximum"] / multipleOf
-        else:
-            int32maximum = 9000000
-            int64maximum = 500000000000
-
-        if "enum" in data.keys():
-            outinteger = random.choice(data["enum"])
-        elif "format" in data.keys():
-            if data["format"] == "int32":
-                outinteger = random.randint(int32minimum, int32maximum) * multipleOf
-            elif data["format"] == "int64":
-                outinteger = random.randint(int64minimum, int64maximum) * multipleOf
-            else:
-                pass
-        else:
-            outinteger = random.randint(int64minimum, int64maximum) * multipleOf
-
-        return outinteger
+        return compile_sampler({**data, "type": "integer"})()
 
     def generate_value(self, data, outdict):
-        outlist = []
-        for key, value in data.items():
-            if "type" in data[key].keys():
-                if data[key]["type"] == "string":
-                    outdict[key] = self.generatestring(data[key])
-                elif data[key]["type"] == "boolean":
-                    outdict[key] = random.choice([True, False])
-                elif data[key]["type"] == "number":
-                    outdict[key] = self.generatenumber(data[key])
-                elif data[key]["type"] == "integer":
-                    outdict[key] = self.generateinteger(data[key])
-                elif data[key]["type"] == "array":
-                    if "minItems" in data[key]:
-                        minItems = data[key]["minItems"]
-                    else:
-                        minItems = 1
-                    if "maxItems" in data[key]:
-                        maxItems = data[key]["maxItems"]
-                    else:
-                        maxItems = 3
-                    if maxItems <= minItems:
-                        maxItems = minItems + 1
-                    arrayItems = random.randint(minItems, maxItems)
-                    if "type" in data[key]["items"].keys():
-                        array = []
-                        if data[key]["items"]["type"] == "string":
-                            for n in range(0, arrayItems):
-                                arrayproperty = self.generatestring(data[key]["items"])
-                                array.append(arrayproperty)
-                            outdict[key] = array
-                        elif data[key]["items"]["type"] == "integer":
-                            for n in range(0, arrayItems):
-                                arrayproperty = self.generateinteger(data[key]["items"])
-                                array.append(arrayproperty)
-                            outdict[key] = array
-                        elif data[key]["items"]["type"] == "number":
-                            for n in range(0, arrayItems):
-                                arrayproperty = self.generatenumber(data[key]["items"])
-                                array.append(arrayproperty)
-                            outdict[key] = array
-                        elif data[key]["items"]["type"] == "object":
-                            arraydict = {}
-                            arrayproperties = data[key]["items"]["properties"]
-                            outdict[key] = self.generatevalue(
-                                arrayproperties, arraydict
-                            )
-                        else:
-                            pass
-                    else:
-                        pass
-                else:
-                    pass
-        outlist.append(outdict)
-        return outlist
+        sampler = compile_sampler({"type": "object", "properties": data})
+        outdict.update(sampler())
+        return [outdict]
 
 
 class BaseModelNoDefs(BaseModel):
-    @classmethod
-    def model_json_schema(cls, *args, **kwargs) -> dict[str, Any]:
-        """Generate jsonschema of the model.
-
-        Returns:
-            dict[str,Any]: _description_
-        """
-        data = super().model_json_schema(*args, **kwargs)
-        defs: dict = cls.get_defs(data)
-        res = cls.replace_ref(defs=defs, schema=data)
-        res.pop("$defs", None)
-        return res
+    # BaseModel.model_json_schema already inlines every $ref
 
     def dict_plain(self) -> dict:
         return json.loads(self.model_dump_json())
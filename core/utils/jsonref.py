@@ -1,15 +1,48 @@
+import codecs
+import contextlib
 import functools
+import hashlib
+import itertools
 import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from collections.abc import MutableMapping
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from json.decoder import scanstring
 from logging import getLogger
-import warnings
-from collections.abc import Mapping, MutableMapping, Sequence
+from pathlib import Path
 from urllib import parse as urlparse
+from urllib.error import HTTPError
+from urllib.parse import quote
 from urllib.parse import unquote
+from urllib.request import Request
+from urllib.request import url2pathname
 from urllib.request import urlopen
 
+from core.utils.metrics import record_metric
 
 logger = getLogger(__file__)
 
+# Characters (or bytes) read at a time by load(stream=True)
+STREAM_CHUNK_SIZE = 2**20
+# Remote documents fetched at the same time by replace_refs(prefetch=True)
+PREFETCH_WORKERS = 8
+# Where dump(rereference=True) puts shared objects without a home
+DEFS_POINTER = "/$defs"
+# Characters buffered by dump(rereference=True) between writes
+DUMP_BUFFER_SIZE = 2**16
+# URI schemes JsonLoader(offline=True) still reads
+LOCAL_SCHEMES = ("file", "data")
+
 try:
     # If requests >=1.0 is available, we will use it
     import requests
@@ -92,6 +125,8 @@ class JsonRef(LazyProxy):
         merge_props=False,
         _path=(),
         _store=None,
+        *,
+        _trace=False,
     ):
         if not isinstance(refobj.get("$ref"), str):
             raise ValueError("Not a valid json reference object: %s" % refobj)
@@ -101,7 +136,8 @@ class JsonRef(LazyProxy):
         self.jsonschema = jsonschema
         self.load_on_repr = load_on_repr
         self.merge_props = merge_props
-        self.path = _path
+        self._path = _path
+        self._trace = _trace
         self.store = _store  # Use the same object to be shared with children
         if self.store is None:
             self.store = URIDict()
@@ -114,10 +150,15 @@ class JsonRef(LazyProxy):
             jsonschema=self.jsonschema,
             load_on_repr=self.load_on_repr,
             merge_props=self.merge_props,
-            path=self.path,
+            path=self._path,
             store=self.store,
+            trace=self._trace,
         )
 
+    @property
+    def path(self):
+        return _build_path(self._path)
+
     @property
     def full_uri(self):
         return urlparse.urljoin(self.base_uri, self.__reference__["$ref"])
@@ -139,7 +180,18 @@ class JsonRef(LazyProxy):
             )
         else:
             base_doc = self.store[uri]
-        result = self.resolve_pointer(base_doc, fragment)
+
+        # Refs to the same target share a single pointer walk, unless the
+        # document loaded above got stored under its "$id" instead of `uri`
+        resolved = {}
+        if self.store.get(uri) is base_doc:
+            resolved = self.store.resolved_pointers(uri)
+        try:
+            result = resolved[fragment]
+        except KeyError:
+            result, through_self = self._resolve_pointer(base_doc, fragment)
+            if not through_self:
+                resolved[fragment] = result
         if result is self:
             raise self._error("Reference refers directly to itself.")
         if hasattr(result, "__subject__"):
@@ -163,26 +215,27 @@ class JsonRef(LazyProxy):
         :argument str pointer: a json pointer URI fragment to resolve within it
 
         """
-        parts = unquote(pointer.lstrip("/")).split("/") if pointer else []
+        return self._resolve_pointer(document, pointer)[0]
 
-        for part in parts:
-            part = part.replace("~1", "/").replace("~0", "~")
-
-            if isinstance(document, Sequence):
-                # Try to turn an array index to an int
-                try:
-                    part = int(part)
-                except ValueError:
-                    pass
+    def _resolve_pointer(self, document, pointer):
+        """
+        Returns the target of ``pointer`` and whether the walk went through
+        this reference, in which case the target is specific to it.
+        """
+        through_self = False
+        for part, index in _pointer_parts(pointer):
+            is_index = index is not None and isinstance(document, Sequence)
+            key = index if is_index else part
             # If a reference points inside itself, it must mean inside reference object, not the referent data
             if document is self:
                 document = self.__reference__
+                through_self = True
             try:
-                document = document[part]
+                document = document[key]
             except (TypeError, LookupError):
                 # TODO: Add this to log in the long run
                 pass
-        return document
+        return document, through_self
 
     def _error(self, message, cause=None):
         message = "Error while resolving `{}`: {}".format(self.full_uri, message)
@@ -201,26 +254,64 @@ class JsonRef(LazyProxy):
         return "JsonRef(%r)" % self.__reference__
 
 
+@functools.lru_cache(maxsize=4096)
+def _normalize_uri(uri):
+    return urlparse.urlsplit(uri).geturl()
+
+
+@functools.lru_cache(maxsize=4096)
+def _pointer_parts(pointer):
+    """
+    Unescaped parts of a json pointer, each with its int value when it could
+    be an array index.
+    """
+    parts = unquote(pointer.lstrip("/")).split("/") if pointer else []
+    result = []
+    for escaped in parts:
+        part = escaped.replace("~1", "/").replace("~0", "~")
+        try:
+            index = int(part)
+        except ValueError:
+            index = None
+        result.append((part, index))
+    return tuple(result)
+
+
 class URIDict(MutableMapping):
     """
     Dictionary which uses normalized URIs as keys.
+
+    Also remembers the pointers already resolved within each document, so
+    all references to the same target are resolved once.
     """
 
     def normalize(self, uri):
-        return urlparse.urlsplit(uri).geturl()
+        return _normalize_uri(uri)
 
     def __init__(self, *args, **kwargs):
         self.store = {}
         self.store.update(*args, **kwargs)
+        self.pointers = {}
+
+    def resolved_pointers(self, uri):
+        """
+        Pointer -> target memo for the document stored under ``uri``,
+        dropped when the document is replaced.
+        """
+        return self.pointers.setdefault(self.normalize(uri), {})
 
     def __getitem__(self, uri):
         return self.store[self.normalize(uri)]
 
     def __setitem__(self, uri, value):
-        self.store[self.normalize(uri)] = value
+        uri = self.normalize(uri)
+        self.store[uri] = value
+        self.pointers.pop(uri, None)
 
     def __delitem__(self, uri):
-        del self.store[self.normalize(uri)]
+        uri = self.normalize(uri)
+        del self.store[uri]
+        self.pointers.pop(uri, None)
 
     def __iter__(self):
         return iter(self.store)
@@ -232,31 +323,215 @@ class URIDict(MutableMapping):
         return repr(self.store)
 
 
-def jsonloader(uri, **kwargs):
+class JsonLoaderOfflineError(LookupError):
+    """Raised by an offline :class:`JsonLoader` for a URI it has not cached"""
+
+
+class JsonLoader:
     """
-    Provides a callable which takes a URI, and returns the loaded JSON referred
-    to by that URI. Uses :mod:`requests` if available for HTTP URIs, and falls
-    back to :mod:`urllib`.
+    Callable which takes a URI, and returns the loaded JSON referred to by
+    that URI. Uses :mod:`requests` if available for HTTP URIs, and falls back
+    to :mod:`urllib`.
+
+    Parsed documents are kept in a bounded LRU shared by every
+    :func:`replace_refs` call using this loader for up to ``ttl`` seconds,
+    ``file:`` documents are reloaded as soon as the file changes. HTTP
+    requests go through one pooled :class:`requests.Session`. With
+    ``cache_dir`` HTTP documents are also written to disk together with their
+    ETag/Last-Modified and revalidated with a conditional request the next
+    time they are needed, and with ``offline`` they are only ever served from
+    the caches, local ``file:`` and ``data:`` URIs are still read.
+
+    Cached documents are shared, treat them as read only.
+
+    :param cache_size: number of parsed documents kept in memory
+    :param cache_dir: directory for the on-disk cache of HTTP documents
+    :param offline: never touch the network, raise
+        :class:`JsonLoaderOfflineError` for remote documents missing from the
+        caches
+    :param timeout: seconds before an HTTP request is abandoned
+    :param pool_size: connections kept open per host
+    :param ttl: seconds a document is served from memory, ``None`` for no
+        limit
+
     """
-    scheme = urlparse.urlsplit(uri).scheme
 
-    if scheme in ["http", "https"] and requests:
-        # Prefer requests, it has better encoding detection
-        resp = requests.get(uri)
-        # If the http server doesn't respond normally then raise exception
-        # e.g. 404, 500 error
-        resp.raise_for_status()
-        try:
-            result = resp.json(**kwargs)
-        except TypeError:
-            warnings.warn("requests >=1.2 required for custom kwargs to json.loads")
-            result = resp.json()
-    else:
+    def __init__(  # noqa: PLR0913
+        self,
+        cache_size=128,
+        cache_dir=None,
+        *,
+        offline=False,
+        timeout=30,
+        pool_size=10,
+        ttl=300,
+    ):
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+
+    def __call__(self, uri, **kwargs):
+        if kwargs:
+            # custom json.loads arguments change the result, don't share it
+            return self._parse(self._fetch(uri)[0], **kwargs)
+
+        mtime = self._mtime(uri)
+        with self._lock:
+            entry = self._documents.get(uri)
+            if entry is not None:
+                result, loaded_at, loaded_mtime = entry
+                fresh = self.ttl is None or time.monotonic() - loaded_at < self.ttl
+                if fresh and loaded_mtime == mtime:
+                    self._documents.move_to_end(uri)
+                    return result
+                del self._documents[uri]
+
+        loaded_at = time.monotonic()
+        result = self._load(uri)
+        with self._lock:
+            self._documents[uri] = (result, loaded_at, mtime)
+            self._documents.move_to_end(uri)
+            while len(self._documents) > self.cache_size:
+                self._documents.popitem(last=False)
+        return result
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None and requests:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+        return self._session
+
+    def clear(self):
+        """Forget the documents held in memory, the disk cache is kept"""
+        with self._lock:
+            self._documents.clear()
+
+    def _load(self, uri):
+        if not self._is_http(uri):
+            return self._parse(self._fetch(uri)[0])
+
+        entry = self._read_disk(uri)
+        if self.offline:
+            if entry is None:
+                msg = f"{uri} is not cached"
+                raise JsonLoaderOfflineError(msg)
+            return entry["document"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        text, response_headers = self._fetch(uri, headers)
+        if text is None:
+            # 304 Not Modified
+            return entry["document"]
+        result = self._parse(text)
+        self._write_disk(uri, result, response_headers)
+        return result
+
+    def _fetch(self, uri, headers=None):
+        """
+        Returns the response body and headers, the body is ``None`` when the
+        server answered 304 Not Modified.
+        """
+        if self.offline and not self._is_local(uri):
+            msg = f"{uri} is not cached"
+            raise JsonLoaderOfflineError(msg)
+
+        if self._is_http(uri) and requests:
+            # Prefer requests, it has better encoding detection
+            resp = self.session.get(uri, headers=headers, timeout=self.timeout)
+            if resp.status_code == HTTPStatus.NOT_MODIFIED:
+                return None, resp.headers
+            # If the http server doesn't respond normally then raise exception
+            # e.g. 404, 500 error
+            resp.raise_for_status()
+            return resp.text, resp.headers
+
         # Otherwise, pass off to urllib and assume utf-8
-        with urlopen(uri) as content:
-            result = json.loads(content.read().decode("utf-8"), **kwargs)
+        request = Request(uri, headers=headers or {})  # noqa: S310
+        try:
+            with urlopen(request, timeout=self.timeout) as content:  # noqa: S310
+                return content.read().decode("utf-8"), content.headers
+        except HTTPError as e:
+            if e.code == HTTPStatus.NOT_MODIFIED:
+                return None, e.headers
+            raise
+
+    def _parse(self, text, **kwargs):
+        return json.loads(text, **kwargs)
+
+    def _is_http(self, uri):
+        return urlparse.urlsplit(uri).scheme in ("http", "https")
+
+    def _is_local(self, uri):
+        return urlparse.urlsplit(uri).scheme in LOCAL_SCHEMES
+
+    def _mtime(self, uri):
+        """modification time of a ``file:`` document, ``None`` for other URIs"""
+        parts = urlparse.urlsplit(uri)
+        if parts.scheme != "file":
+            return None
+        try:
+            return Path(url2pathname(parts.path)).stat().st_mtime_ns
+        except OSError:
+            return None
 
-    return result
+    def _disk_path(self, uri):
+        digest = hashlib.sha256(uri.encode()).hexdigest()
+        return Path(self.cache_dir) / f"{digest}.json"
+
+    def _read_disk(self, uri):
+        if not self.cache_dir:
+            return None
+        try:
+            with self._disk_path(uri).open(encoding="utf-8") as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("uri") == uri else None
+
+    def _write_disk(self, uri, document, headers):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not self.cache_dir or not (etag or last_modified):
+            # nothing to revalidate with
+            return
+        entry = {
+            "uri": uri,
+            "etag": etag,
+            "last_modified": last_modified,
+            "document": document,
+        }
+        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(entry, fp)
+            Path(tmp).replace(self._disk_path(uri))
+        except OSError as e:
+            logger.warning("Could not cache %s: %s", uri, e)
+            with contextlib.suppress(OSError):
+                Path(tmp).unlink()
+
+
+jsonloader = JsonLoader()
 
 
 def _walk_refs(obj, func, replace=False, _processed=None):
@@ -291,6 +566,10 @@ def replace_refs(
     merge_props=False,
     proxies=True,
     lazy_load=True,
+    *,
+    trace=False,
+    prefetch=None,
+    max_workers=PREFETCH_WORKERS,
 ):
     """
     Returns a deep copy of `obj` with all contained JSON reference objects
@@ -321,28 +600,130 @@ def replace_refs(
     :param lazy_load: When proxy objects are used, and this is `True`, the
         references will not be resolved until that section of the JSON
         document is accessed. (defaults to ``True``)
+    :param trace: Log every container visited and every reference created
+        with its path at DEBUG level, including in documents loaded later by
+        the references. (defaults to ``False``)
+    :param prefetch: Fetch every remote document referenced, and the ones
+        they reference in turn, up front with ``max_workers`` threads instead
+        of one at a time when a reference is first resolved. Documents that
+        fail to load are left for their references to report. (defaults to
+        ``True`` when ``proxies`` or ``lazy_load`` are off, since every
+        reference gets resolved anyway)
 
     """
-    logger.info("Started .replace_refs")
+    start = time.perf_counter()
+    if prefetch is None:
+        prefetch = not proxies or not lazy_load
+    kwargs = {
+        "loader": loader,
+        "jsonschema": jsonschema,
+        "load_on_repr": load_on_repr,
+        "merge_props": merge_props,
+        "store": URIDict(),
+        "trace": trace,
+    }
+    external = {} if prefetch else None
     result = _replace_refs(
         obj,
         base_uri=base_uri,
-        loader=loader,
-        jsonschema=jsonschema,
-        load_on_repr=load_on_repr,
-        merge_props=merge_props,
-        store=URIDict(),
         path=(),
         recursing=False,
+        external=external,
+        **kwargs,
+    )
+    if external:
+        _prefetch(external, max_workers, **kwargs)
+    return _finish_refs(
+        result,
+        start,
+        proxies=proxies,
+        lazy_load=lazy_load,
+        prefetch=prefetch,
     )
+
+
+def _prefetch(external, max_workers, *, loader, store, **kwargs):
+    """
+    Loads the documents in ``external`` (URI -> path of the first reference
+    to it) with a thread pool and stores them, along with the documents they
+    refer to in turn, so their references don't load them one by one.
+    """
+    seen = set(external)
+    pending = [(uri, path) for uri, path in external.items() if uri not in store]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending:
+            futures = [(pool.submit(loader, uri), uri, path) for uri, path in pending]
+            pending = []
+            for future, uri, path in futures:
+                try:
+                    document = future.result()
+                except Exception as e:  # noqa: BLE001
+                    # JsonRef.callback loads it again and raises with context
+                    logger.debug("prefetching %s failed: %s", uri, e)
+                    continue
+                found = {}
+                _replace_refs(
+                    document,
+                    base_uri=uri,
+                    loader=loader,
+                    store=store,
+                    path=path,
+                    recursing=False,
+                    external=found,
+                    **kwargs,
+                )
+                for ref_uri, ref_path in found.items():
+                    if ref_uri not in seen and ref_uri not in store:
+                        seen.add(ref_uri)
+                        pending.append((ref_uri, ref_path))
+
+
+def _finish_refs(result, start, proxies, lazy_load, **tags):
+    """
+    Resolves or inlines the references of a freshly replaced document and
+    records the time spent since ``start``.
+    """
     if not proxies:
         _walk_refs(result, lambda r: r.__subject__, replace=True)
     elif not lazy_load:
         _walk_refs(result, lambda r: r.__subject__)
-    logger.info("Finished .replace_refs")
+    record_metric(
+        "jsonref.replace_refs.duration_ms",
+        (time.perf_counter() - start) * 1000,
+        proxies=proxies,
+        lazy_load=lazy_load,
+        **tags,
+    )
     return result
 
 
+class _PathLink:
+    """
+    One step of a node's path, pointing back at its parent's. Paths are only
+    turned into tuples by :func:`_build_path` when somebody asks for them.
+    """
+
+    __slots__ = ("key", "parent")
+
+    def __init__(self, parent, key):
+        self.parent = parent
+        self.key = key
+
+
+def _build_path(link):
+    keys = []
+    while isinstance(link, _PathLink):
+        keys.append(link.key)
+        link = link.parent
+    return tuple(link) + tuple(reversed(keys))
+
+
+_LEAF_TYPES = frozenset((str, int, float, bool, type(None)))
+
+# Stack marker for a document to store once all of its children are replaced
+_STORE = object()
+
+
 def _replace_refs(
     obj,
     *,
@@ -354,69 +735,589 @@ def _replace_refs(
     store,
     path,
     recursing,
+    trace=False,
+    copy=True,
+    external=None,
 ):
-    logger.info("Started ._replace_refs")
-    base_uri, frag = urlparse.urldefrag(base_uri)
-    store_uri = None  # If this does not get set, we won't store the result
-    if not frag and not recursing:
-        store_uri = base_uri
-    if jsonschema and isinstance(obj, Mapping):
-        # id changed to $id in later jsonschema versions
-        id_ = obj.get("$id") or obj.get("id")
-        if isinstance(id_, str):
-            base_uri = urlparse.urljoin(base_uri, id_)
+    """
+    Walks ``obj`` with an explicit stack, copying containers and replacing
+    reference objects with :class:`JsonRef` instances. ``path`` is the path
+    of ``obj``, a tuple or a :class:`_PathLink`. With ``copy=False`` dicts
+    and lists are updated in place. When ``external`` is a dict, the URI of
+    every document referenced is added to it with the path of the first
+    reference to it.
+    """
+    ref_kwargs = {
+        "loader": loader,
+        "jsonschema": jsonschema,
+        "load_on_repr": load_on_repr,
+        "merge_props": merge_props,
+        "_store": store,
+        "_trace": trace,
+    }
+    # The root is written to result[0]
+    result = [obj]
+    # (node, container holding it, key in that container, base uri, path)
+    stack = [(obj, result, 0, base_uri, path)]
+    nodes = 0
+    while stack:
+        item = stack.pop()
+        if item[0] is _STORE:
+            # Store the document with all references replaced in our cache
+            _, store_uri, obj = item
+            store[store_uri] = obj
+            continue
+        obj, parent, key, base_uri, path = item
+        nodes += 1
+        if "#" in base_uri:
+            base_uri, frag = urlparse.urldefrag(base_uri)
+        else:
+            frag = ""
+        store_uri = None  # If this does not get set, we won't store the result
+        if not frag and not recursing:
             store_uri = base_uri
+        recursing = True
+        if jsonschema and isinstance(obj, Mapping):
+            # id changed to $id in later jsonschema versions
+            id_ = obj.get("$id") or obj.get("id")
+            if isinstance(id_, str):
+                base_uri = urlparse.urljoin(base_uri, id_)
+                store_uri = base_uri
+        if trace:
+            logger.debug("replace_refs %s %s", base_uri, _build_path(path))
+
+        # Copy the container, children that are containers themselves are
+        # copied in place when they come off the stack
+        if isinstance(obj, Mapping):
+            if copy or type(obj) is not dict:
+                obj = dict(obj)
+            items = obj.items()
+        elif isinstance(obj, Sequence) and not isinstance(obj, str):
+            if copy or type(obj) is not list:
+                obj = list(obj)
+            items = enumerate(obj)
+        else:
+            items = ()
+        children = []
+        for k, v in items:
+            if type(v) in _LEAF_TYPES:
+                continue
+            if isinstance(v, Mapping) or (
+                isinstance(v, Sequence) and not isinstance(v, str)
+            ):
+                children.append((v, obj, k, base_uri, _PathLink(path, k)))
+
+        # If this object itself was a reference, replace it with a JsonRef
+        if isinstance(obj, dict) and isinstance(obj.get("$ref"), str):
+            if trace:
+                logger.debug("replace_refs %s -> %s", _build_path(path), obj["$ref"])
+            if external is not None:
+                uri = urlparse.urldefrag(urlparse.urljoin(base_uri, obj["$ref"]))[0]
+                external.setdefault(uri, path)
+            obj = JsonRef(obj, base_uri=base_uri, _path=path, **ref_kwargs)
+        parent[key] = obj
+
+        if store_uri is not None:
+            # Store the document once its children are done, like a
+            # recursive walk would, so the outermost of two equal ids wins
+            stack.append((_STORE, store_uri, obj))
+        # Pop in document order
+        stack.extend(reversed(children))
+
+    if trace:
+        logger.debug("replace_refs visited %s containers", nodes)
+    return result[0]
+
+
+class _Flattener:
+    """
+    Builds the plain dict/list graph of :func:`flatten_refs`.
 
-    # First recursively iterate through our object, replacing children with JsonRefs
-    if isinstance(obj, Mapping):
-        obj = {
-            k: _replace_refs(
-                v,
-                base_uri=base_uri,
-                loader=loader,
-                jsonschema=jsonschema,
-                load_on_repr=load_on_repr,
-                merge_props=merge_props,
-                store=store,
-                path=path + (k,),
-                recursing=True,
-            )
-            for k, v in obj.items()
-        }
-    elif isinstance(obj, Sequence) and not isinstance(obj, str):
-        obj = [
-            _replace_refs(
-                v,
-                base_uri=base_uri,
-                loader=loader,
-                jsonschema=jsonschema,
-                load_on_repr=load_on_repr,
-                merge_props=merge_props,
-                store=store,
-                path=path + (i,),
-                recursing=True,
-            )
-            for i, v in enumerate(obj)
-        ]
+    Outputs are memoized by the identity of the source node (and the base
+    URI it is seen with), so every reference to a target and every repeated
+    object in the input map to one output object. Containers are registered
+    before their children are filled in, which is what makes cycles work.
+    """
 
-    # If this object itself was a reference, replace it with a JsonRef
-    if isinstance(obj, Mapping) and isinstance(obj.get("$ref"), str):
-        obj = JsonRef(
-            obj,
+    def __init__(self, loader, jsonschema, merge_props):
+        self.loader = loader
+        self.jsonschema = jsonschema
+        self.merge_props = merge_props
+        # normalized URI -> (source node, base URI it inherits)
+        self.documents = {}
+        # (id(source node), inherited base URI) -> output
+        self.outputs = {}
+        # (uri, pointer) -> (source node, inherited base URI)
+        self.pointers = {}
+        # ids of the references being resolved, to catch loops
+        self.resolving = set()
+        # (source, output, base URI, path) waiting for their children
+        self.stack = []
+        # (merged, target, extras) dicts filled once everything else is
+        self.merges = []
+
+    def run(self, obj, base_uri):
+        root_uri, frag = urlparse.urldefrag(base_uri)
+        if not frag:
+            self.add_document(root_uri, obj, root_uri)
+        result = self.output(obj, base_uri, ())
+        stack = self.stack
+        while stack:
+            source, output, base_uri, path = stack.pop()
+            items = source.items() if type(output) is dict else enumerate(source)
+            for k, v in items:
+                if type(v) not in _LEAF_TYPES:
+                    output[k] = self.output(v, base_uri, _PathLink(path, k))
+        self.merge()
+        return result
+
+    def output(self, source, base_uri, path):
+        """The output object for ``source``, seen with the inherited
+        ``base_uri`` at ``path``"""
+        if type(source) in _LEAF_TYPES or not (
+            isinstance(source, Mapping)
+            or (isinstance(source, Sequence) and not isinstance(source, str))
+        ):
+            return source
+        key = (id(source), base_uri)
+        try:
+            return self.outputs[key]
+        except KeyError:
+            pass
+        base_uri = self.effective_uri(source, base_uri)
+        if isinstance(source, Mapping) and isinstance(source.get("$ref"), str):
+            return self.output_ref(source, base_uri, path, key)
+        output = dict(source) if isinstance(source, Mapping) else list(source)
+        self.outputs[key] = output
+        self.stack.append((source, output, base_uri, path))
+        return output
+
+    def output_ref(self, source, base_uri, path, key):
+        if id(source) in self.resolving:
+            raise self.error(source, base_uri, path, "Circular reference.")
+        self.resolving.add(id(source))
+        try:
+            target, target_uri = self.resolve(source, base_uri, path)
+            output = self.output(target, target_uri, path)
+        finally:
+            self.resolving.discard(id(source))
+        if self.merge_props and isinstance(output, dict) and len(source) > 1:
+            extras = {k: v for k, v in source.items() if k != "$ref"}
+            merged, extras_output = {}, dict(extras)
+            self.stack.append((extras, extras_output, base_uri, path))
+            self.merges.append((merged, output, extras_output))
+            output = merged
+        self.outputs[key] = output
+        return output
+
+    def resolve(self, ref, base_uri, path):
+        """Source node and inherited base URI the reference ``ref`` points at"""
+        full_uri = urlparse.urljoin(base_uri, ref["$ref"])
+        uri, fragment = urlparse.urldefrag(full_uri)
+        memo_key = (_normalize_uri(uri), fragment)
+        if memo_key in self.pointers:
+            return self.pointers[memo_key]
+        node, node_uri = self.document(uri, ref, base_uri, path)
+        through_self = False
+        for part, index in _pointer_parts(fragment):
+            if node is ref:
+                # Points inside the reference object itself
+                through_self = True
+            else:
+                # Step into what a reference on the way points at
+                while isinstance(node, Mapping) and isinstance(
+                    node.get("$ref"),
+                    str,
+                ):
+                    node_id = id(node)
+                    if node_id in self.resolving:
+                        raise self.error(ref, base_uri, path, "Circular reference.")
+                    self.resolving.add(node_id)
+                    try:
+                        node_base = self.effective_uri(node, node_uri)
+                        node, node_uri = self.resolve(node, node_base, path)
+                    finally:
+                        self.resolving.discard(node_id)
+            key = index if index is not None and isinstance(node, Sequence) else part
+            try:
+                child = node[key]
+            except (TypeError, LookupError):
+                continue
+            node_uri = self.effective_uri(node, node_uri)
+            node = child
+        if node is ref:
+            message = "Reference refers directly to itself."
+            raise self.error(ref, base_uri, path, message)
+        if not through_self:
+            self.pointers[memo_key] = (node, node_uri)
+        return node, node_uri
+
+    def document(self, uri, ref, base_uri, path):
+        try:
+            return self.documents[_normalize_uri(uri)]
+        except KeyError:
+            pass
+        try:
+            document = self.loader(uri)
+        except Exception as e:
+            raise self.error(
+                ref,
+                base_uri,
+                path,
+                f"{e.__class__.__name__}: {e}",
+                cause=e,
+            ) from e
+        self.add_document(uri, document, uri)
+        return self.documents[_normalize_uri(uri)]
+
+    def add_document(self, uri, document, base_uri):
+        self.documents.setdefault(_normalize_uri(uri), (document, base_uri))
+        if not self.jsonschema:
+            return
+        # Subschemas with an id can be referred to by it
+        stack = [(document, base_uri)]
+        while stack:
+            node, node_uri = stack.pop()
+            if isinstance(node, Mapping):
+                id_ = node.get("$id") or node.get("id")
+                children_uri = self.effective_uri(node, node_uri)
+                if isinstance(id_, str):
+                    self.documents.setdefault(
+                        _normalize_uri(children_uri),
+                        (node, node_uri),
+                    )
+                stack.extend((v, children_uri) for v in node.values())
+            elif isinstance(node, Sequence) and not isinstance(node, str):
+                stack.extend((v, node_uri) for v in node)
+
+    def effective_uri(self, node, base_uri):
+        """Base URI of the references in ``node`` and of its children"""
+        if "#" in base_uri:
+            base_uri = urlparse.urldefrag(base_uri)[0]
+        if self.jsonschema and isinstance(node, Mapping):
+            # id changed to $id in later jsonschema versions
+            id_ = node.get("$id") or node.get("id")
+            if isinstance(id_, str):
+                base_uri = urlparse.urljoin(base_uri, id_)
+        return base_uri
+
+    def merge(self):
+        pending = self.merges
+        while pending:
+            # A target that is merged itself has to be filled first
+            waiting = {id(merged) for merged, _, _ in pending}
+            ready = [m for m in pending if id(m[1]) not in waiting]
+            if not ready:
+                # Merges waiting on each other, fill them as they are
+                ready = pending
+            for merged, target, extras in ready:
+                merged.update(target)
+                merged.update(extras)
+            done = {id(merged) for merged, _, _ in ready}
+            pending = [m for m in pending if id(m[0]) not in done]
+
+    def error(self, ref, base_uri, path, message, cause=None):
+        full_uri = urlparse.urljoin(base_uri, ref["$ref"])
+        return JsonRefError(
+            f"Error while resolving `{full_uri}`: {message}",
+            ref,
+            uri=full_uri,
+            base_uri=base_uri,
+            path=_build_path(path),
+            cause=cause,
+        )
+
+
+def flatten_refs(
+    obj,
+    base_uri="",
+    loader=None,
+    *,
+    jsonschema=False,
+    merge_props=False,
+):
+    """
+    Returns `obj` with all contained JSON reference objects replaced by the
+    data they refer to, as plain dicts and lists built in a single pass.
+
+    Unlike ``replace_refs(proxies=False)`` no :class:`JsonRef` is created,
+    all references to the same target are the same object and so are
+    repeated objects of `obj`. Circular references become cycles in the
+    result, which can't be dumped as is. The result shares nodes, treat it
+    as read only. See :func:`memory_report` for its size.
+
+    :param obj: JSON document
+    :param base_uri: URI to resolve relative references against
+    :param loader: Callable that takes a URI and returns the parsed JSON
+        (defaults to global ``jsonloader``)
+    :param jsonschema: Flag to turn on JSON Schema mode, see
+        :func:`replace_refs`
+    :param merge_props: Merge the extra keys of reference objects into the
+        dictionary they refer to, see :func:`replace_refs`. Each such
+        reference gets its own dictionary.
+
+    """
+    start = time.perf_counter()
+    flattener = _Flattener(loader or jsonloader, jsonschema, merge_props)
+    result = flattener.run(obj, base_uri)
+    record_metric(
+        "jsonref.flatten_refs.duration_ms",
+        (time.perf_counter() - start) * 1000,
+    )
+    return result
+
+
+def memory_report(obj):
+    """
+    Size of the dicts and lists reachable from `obj`, counting each object
+    once no matter how many times it is referenced.
+
+    :returns: dict with the number of distinct ``containers``, the number
+        of ``shared`` references to a container already counted, and the
+        ``bytes`` used by the distinct containers and their scalars (as
+        measured by :func:`sys.getsizeof`)
+
+    """
+    seen = set()
+    report = {"containers": 0, "shared": 0, "bytes": 0}
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            if isinstance(node, (dict, list)):
+                report["shared"] += 1
+            continue
+        seen.add(id(node))
+        report["bytes"] += sys.getsizeof(node)
+        if isinstance(node, dict):
+            report["containers"] += 1
+            stack.extend(node.keys())
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            report["containers"] += 1
+            stack.extend(node)
+    return report
+
+
+_TOKEN = re.compile(
+    r"[ \t\n\r]*(?:"
+    r"([\[\]{},:])"
+    r'|(")'
+    r"|(-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?)"
+    r"|(true|false|null|NaN|Infinity|-Infinity)"
+    r")",
+)
+_CONSTANTS = {
+    "true": True,
+    "false": False,
+    "null": None,
+    "NaN": float("nan"),
+    "Infinity": float("inf"),
+    "-Infinity": float("-inf"),
+}
+# A shorter leftover may be the start of a constant cut by the chunk
+_LONGEST_CONSTANT = len("-Infinity")
+
+# What the stream parser expects next
+_VALUE, _VALUE_OR_END, _KEY, _KEY_OR_END, _COLON, _COMMA_OR_END, _DONE = range(7)
+_EXPECTING = {
+    _VALUE: "Expecting value",
+    _VALUE_OR_END: "Expecting value",
+    _KEY: "Expecting property name enclosed in double quotes",
+    _KEY_OR_END: "Expecting property name enclosed in double quotes",
+    _COLON: "Expecting ':' delimiter",
+    _COMMA_OR_END: "Expecting ',' delimiter",
+    _DONE: "Extra data",
+}
+
+
+def _stream_refs(  # noqa: C901, PLR0912, PLR0913, PLR0915
+    fp,
+    *,
+    chunk_size,
+    base_uri,
+    loader,
+    jsonschema,
+    load_on_repr,
+    merge_props,
+    store,
+    trace,
+):
+    """
+    Parses the JSON document read from ``fp`` in chunks of ``chunk_size``,
+    replacing reference objects with :class:`JsonRef` instances as soon as
+    they are complete. Only the current chunk is kept besides the result.
+
+    In JSON Schema mode an "$id" can come after the references it applies
+    to, the references are then replaced in place once the whole document
+    is read.
+    """
+    ref_kwargs = {
+        "loader": loader,
+        "jsonschema": jsonschema,
+        "load_on_repr": load_on_repr,
+        "merge_props": merge_props,
+        "_store": store,
+        "_trace": trace,
+    }
+    root_uri, frag = urlparse.urldefrag(base_uri)
+    read = fp.read
+    decode = None
+    buf = ""
+    pos = 0
+    # Characters of the document before `buf`, for error messages
+    offset = 0
+    eof = False
+
+    def refill():
+        nonlocal buf, pos, offset, eof, decode
+        chunk = read(chunk_size)
+        if decode is None and isinstance(chunk, bytes):
+            decode = codecs.getincrementaldecoder("utf-8-sig")().decode
+        eof = not chunk
+        text = decode(chunk, eof) if decode else chunk
+        offset += pos
+        buf = buf[pos:] + text
+        pos = 0
+
+    def error(message=None):
+        message = message or _EXPECTING[state]
+        error = json.JSONDecodeError(message, buf, pos)
+        # Only the current chunk is at hand, report the position in the
+        # whole document instead of a line and column within the chunk
+        error.pos += offset
+        error.lineno = error.colno = None
+        error.args = (f"{message}: char {error.pos}",)
+        return error
+
+    match_token = _TOKEN.match
+    keys = {}
+    # Open containers as [container, current key, path]
+    stack = []
+    state = _VALUE
+    result = None
+    refill()
+    while True:
+        match = match_token(buf, pos)
+        # "1" in "1.5e-7" ends up to two characters before the chunk does
+        if match is None or (not eof and match.end() + 2 >= len(buf)):
+            rest = buf[pos : pos + 16].lstrip(" \t\n\r")
+            if not eof and (match is not None or len(rest) <= _LONGEST_CONSTANT):
+                # The token may go on in the next chunk
+                refill()
+                continue
+            if match is None:
+                if state == _DONE and not rest:
+                    break
+                raise error()
+        if state == _DONE:
+            raise error()
+
+        punctuation, quote, number, frac, exp, constant = match.groups()
+        if quote:
+            try:
+                value, end = scanstring(buf, match.end())
+            except json.JSONDecodeError as e:
+                # Unterminated, or an escape cut in half by the chunk
+                if not eof and (
+                    e.msg.startswith("Unterminated") or e.pos + 6 >= len(buf)
+                ):
+                    refill()
+                    continue
+                raise error(e.msg) from None
+            if state in (_KEY, _KEY_OR_END):
+                # Share key strings like json.load does
+                stack[-1][1] = keys.setdefault(value, value)
+                state = _COLON
+                pos = end
+                continue
+            if state not in (_VALUE, _VALUE_OR_END):
+                raise error()
+            pos = end
+        elif punctuation:
+            if punctuation == ":":
+                if state != _COLON:
+                    raise error()
+                state = _VALUE
+                pos = match.end()
+                continue
+            if punctuation == ",":
+                if state != _COMMA_OR_END:
+                    raise error()
+                state = _KEY if type(stack[-1][0]) is dict else _VALUE
+                pos = match.end()
+                continue
+            if punctuation in ("{", "["):
+                if state not in (_VALUE, _VALUE_OR_END):
+                    raise error()
+                if stack:
+                    container, key, parent_path = stack[-1]
+                    if type(container) is list:
+                        key = len(container)
+                    path = _PathLink(parent_path, key)
+                else:
+                    path = ()
+                if punctuation == "{":
+                    stack.append([{}, None, path])
+                    state = _KEY_OR_END
+                else:
+                    stack.append([[], None, path])
+                    state = _VALUE_OR_END
+                pos = match.end()
+                continue
+            # closing "}" or "]"
+            closes = dict if punctuation == "}" else list
+            if not stack or type(stack[-1][0]) is not closes:
+                raise error()
+            if not (
+                state == _COMMA_OR_END
+                or (state == _KEY_OR_END and closes is dict)
+                or (state == _VALUE_OR_END and closes is list)
+            ):
+                raise error()
+            value, _, path = stack.pop()
+            if not jsonschema and closes is dict and isinstance(value.get("$ref"), str):
+                if trace:
+                    logger.debug("load %s -> %s", _build_path(path), value["$ref"])
+                value = JsonRef(value, base_uri=root_uri, _path=path, **ref_kwargs)
+            pos = match.end()
+        else:
+            if state not in (_VALUE, _VALUE_OR_END):
+                raise error()
+            if number:
+                value = float(number) if frac or exp else int(number)
+            else:
+                value = _CONSTANTS[constant]
+            pos = match.end()
+
+        if not stack:
+            result = value
+            state = _DONE
+            continue
+        container, key, _ = stack[-1]
+        if type(container) is dict:
+            container[key] = value
+        else:
+            container.append(value)
+        state = _COMMA_OR_END
+
+    if jsonschema:
+        return _replace_refs(
+            result,
             base_uri=base_uri,
             loader=loader,
             jsonschema=jsonschema,
             load_on_repr=load_on_repr,
             merge_props=merge_props,
-            _path=path,
-            _store=store,
+            store=store,
+            path=(),
+            recursing=False,
+            trace=trace,
+            copy=False,
         )
-
-    # Store the document with all references replaced in our cache
-    if store_uri is not None:
-        store[store_uri] = obj
-    logger.info("Finished ._replace_refs")
-    return obj
+    if not frag:
+        store[root_uri] = result
+    return result
 
 
 def load(
@@ -428,6 +1329,10 @@ def load(
     merge_props=False,
     proxies=True,
     lazy_load=True,
+    *,
+    trace=False,
+    stream=False,
+    chunk_size=STREAM_CHUNK_SIZE,
     **kwargs,
 ):
     """
@@ -435,12 +1340,43 @@ def load(
     proxied to their referent data.
 
     :param fp: File-like object containing JSON document
+    :param stream: Parse the document while reading it in chunks of
+        ``chunk_size`` characters (or bytes), creating the :class:`JsonRef`
+        instances on the way. Peak memory is then the resulting document
+        plus one chunk, instead of the whole text, its parsed copy and the
+        copy made by :func:`replace_refs`. Pure Python, so slower than
+        :func:`json.load`; does not take :func:`json.load` arguments.
+        (defaults to ``False``)
     :param **kwargs: This function takes any of the keyword arguments from
         :func:`replace_refs`. Any other keyword arguments will be passed to
         :func:`json.load`
 
     """
 
+    if stream:
+        if kwargs:
+            msg = f"stream=True does not take json.load arguments: {', '.join(kwargs)}"
+            raise TypeError(msg)
+        start = time.perf_counter()
+        result = _stream_refs(
+            fp,
+            chunk_size=chunk_size,
+            base_uri=base_uri,
+            loader=loader or jsonloader,
+            jsonschema=jsonschema,
+            load_on_repr=load_on_repr,
+            merge_props=merge_props,
+            store=URIDict(),
+            trace=trace,
+        )
+        return _finish_refs(
+            result,
+            start,
+            proxies=proxies,
+            lazy_load=lazy_load,
+            stream=True,
+        )
+
     if loader is None:
         loader = functools.partial(jsonloader, **kwargs)
 
@@ -453,9 +1389,34 @@ def load(
         merge_props=merge_props,
         proxies=proxies,
         lazy_load=lazy_load,
+        trace=trace,
     )
 
 
+def load_file(path, base_uri=None, *, use_mmap=True, **kwargs):
+    """
+    Streams the JSON document in the file at ``path`` through
+    :func:`load` with ``stream=True``, reading it from a memory map so the
+    file is paged in by the OS instead of being copied into buffers.
+
+    :param path: Path of the JSON file
+    :param base_uri: URI to resolve relative references against (defaults
+        to the ``file:`` URI of ``path``)
+    :param use_mmap: Read through :mod:`mmap` (defaults to ``True``)
+    :param **kwargs: This function takes any of the keyword arguments from
+        :func:`load`
+
+    """
+    path = Path(path)
+    if base_uri is None:
+        base_uri = path.absolute().as_uri()
+    with path.open("rb") as fp:
+        if use_mmap and os.fstat(fp.fileno()).st_size:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return load(mapped, base_uri=base_uri, stream=True, **kwargs)
+        return load(fp, base_uri=base_uri, stream=True, **kwargs)
+
+
 def loads(
     s,
     base_uri="",
@@ -502,6 +1463,7 @@ def load_uri(
     merge_props=False,
     proxies=True,
     lazy_load=True,
+    prefetch=None,
 ):
     """
     Load JSON data from ``uri`` with JSON references proxied to their referent
@@ -527,10 +1489,11 @@ def load_uri(
         merge_props=merge_props,
         proxies=proxies,
         lazy_load=lazy_load,
+        prefetch=prefetch,
     )
 
 
-def dump(obj, fp, **kwargs):
+def dump(obj, fp, *, rereference=False, defs=DEFS_POINTER, **kwargs):
     """
     Serialize `obj`, which may contain :class:`JsonRef` objects, as a JSON
     formatted stream to file-like `fp`. `JsonRef` objects will be dumped as the
@@ -538,36 +1501,267 @@ def dump(obj, fp, **kwargs):
 
     :param obj: Object to serialize
     :param fp: File-like to output JSON string
+    :param rereference: Write every dict or list found more than once in
+        `obj` (shared or circular, e.g. the output of :func:`flatten_refs`)
+        only once and refer to it with ``{"$ref": ...}`` everywhere else.
+        The output is streamed to `fp` chunk by chunk. (defaults to
+        ``False``)
+    :param defs: JSON pointer of the section, created when missing, holding
+        shared objects that are not already in ``$defs``, ``definitions``
+        or a ``components`` section, e.g. "/components/schemas" for OpenAPI
+        documents (defaults to "/$defs")
     :param kwargs: Keyword arguments are the same as to :func:`json.dump`
 
     """
-    # Strangely, json.dumps does not use the custom serialization from our
-    # encoder on python 2.7+. Instead, just write json.dumps output to a file.
-    fp.write(dumps(obj, **kwargs))
-
-
-def dumps(obj, **kwargs):
+    if not rereference:
+        # Strangely, json.dumps does not use the custom serialization from our
+        # encoder on python 2.7+. Instead, just write json.dumps output to a file.
+        fp.write(dumps(obj, **kwargs))
+        return
+    chunks = []
+    size = 0
+    for chunk in _iterencode_rereferenced(obj, defs, **kwargs):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= DUMP_BUFFER_SIZE:
+            fp.write("".join(chunks))
+            chunks.clear()
+            size = 0
+    fp.write("".join(chunks))
+
+
+def dumps(obj, *, rereference=False, defs=DEFS_POINTER, **kwargs):
     """
     Serialize `obj`, which may contain :class:`JsonRef` objects, to a JSON
     formatted string. `JsonRef` objects will be dumped as the original
     reference object they were created from.
 
     :param obj: Object to serialize
+    :param rereference: See :func:`dump`
+    :param defs: See :func:`dump`
     :param kwargs: Keyword arguments are the same as to :func:`json.dumps`
 
     """
-    logger.info("Started .dumps")
+    if rereference:
+        return "".join(_iterencode_rereferenced(obj, defs, **kwargs))
     kwargs["cls"] = _ref_encoder_factory(kwargs.get("cls", json.JSONEncoder))
-    logger.info("Finished .dumps")
     return json.dumps(replace_refs(obj), check_circular=False, **kwargs)
 
 
+def _escape_pointer_part(part):
+    part = str(part).replace("~", "~0").replace("/", "~1")
+    return quote(part, safe="$!&'()*+,;=:@~")
+
+
+class _Pending:
+    """A container for the encoder to expand through ``default()``"""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+
+class _Rereferencer:
+    """
+    Decides where each container found more than once in a document is
+    written, its home, and expands containers one at a time for the
+    encoder, replacing shared ones outside their home with a reference.
+    Containers with nothing to replace inside are left to the encoder.
+
+    Homes are, in order of preference, an entry of the ``$defs``,
+    ``definitions`` or ``components`` sections the container already sits
+    in, or a new entry in the ``defs`` section named after the key it was
+    first found under.
+    """
+
+    def __init__(self, root, defs):
+        if type(root) is JsonRef:
+            root = root.__reference__
+        self.root = root
+        # id(node) -> pointer to its home
+        self.pointers = {}
+        # id(node) -> (id(container), key) of its home
+        self.homes = {}
+        # id(container) -> {key: node} written at the end of the container
+        self.extras = {}
+        # ids of the containers expanded by us rather than the encoder
+        self.expanded = set()
+        # Containers created for the defs section, kept alive for their ids
+        self.created = []
+        if isinstance(self.root, (Mapping, list)):
+            order, shared, first_keys = self.walk()
+            if shared:
+                self.place(shared, first_keys, defs)
+            self.mark_expanded(order)
+
+    def walk(self):
+        """
+        Returns the containers in document order, the ones found more than
+        once by id, and the key each one was first found under.
+        """
+        order = []
+        shared = {}
+        first_keys = {}
+        stack = [(self.root, None)]
+        while stack:
+            node, key = stack.pop()
+            node_id = id(node)
+            if node_id in first_keys:
+                shared.setdefault(node_id, node)
+                continue
+            first_keys[node_id] = key
+            order.append(node)
+            items = node.items() if isinstance(node, Mapping) else enumerate(node)
+            children = [
+                (v, k)
+                for k, v in items
+                if type(v) is not JsonRef
+                and type(v) not in _LEAF_TYPES
+                and (
+                    isinstance(v, Mapping)
+                    or (isinstance(v, Sequence) and not isinstance(v, str))
+                )
+            ]
+            stack.extend(reversed(children))
+        return order, shared, first_keys
+
+    def place(self, shared, first_keys, defs):
+        root_id = id(self.root)
+        if root_id in shared:
+            self.pointers[root_id] = "#"
+            # See _iterencode_rereferenced
+            self.homes[root_id] = (None, None)
+            del shared[root_id]
+
+        root = self.root if isinstance(self.root, Mapping) else {}
+        sections = [
+            ("/$defs", root.get("$defs")),
+            ("/definitions", root.get("definitions")),
+        ]
+        components = root.get("components")
+        if isinstance(components, Mapping):
+            sections.extend(
+                ("/components/" + _escape_pointer_part(k), v)
+                for k, v in components.items()
+            )
+        for pointer, section in sections:
+            if not isinstance(section, Mapping):
+                continue
+            for key, value in section.items():
+                if id(value) in shared and id(value) not in self.homes:
+                    self.homes[id(value)] = (id(section), key)
+                    self.pointers[id(value)] = f"#{pointer}/{_escape_pointer_part(key)}"
+
+        remaining = [
+            node for node_id, node in shared.items() if node_id not in self.homes
+        ]
+        if not remaining:
+            return
+        section = self.defs_section(defs)
+        taken = set(section) | set(self.extras.setdefault(id(section), {}))
+        for node in remaining:
+            key = first_keys[id(node)]
+            name = key if isinstance(key, str) else "def"
+            unique, i = name, 1
+            while unique in taken:
+                i += 1
+                unique = f"{name}{i}"
+            taken.add(unique)
+            self.extras[id(section)][unique] = node
+            self.homes[id(node)] = (id(section), unique)
+            self.pointers[id(node)] = (
+                f"#{defs.rstrip('/')}/{_escape_pointer_part(unique)}"
+            )
+
+    def mark_expanded(self, order):
+        """
+        Marks the containers holding something to replace: a JsonRef, a
+        shared container, extra entries or a marked container.
+        """
+        expanded = self.expanded
+        expanded.update(self.extras)
+        pointers = self.pointers
+        # Children come after their parents in document order
+        for node in reversed(order):
+            values = node.values() if isinstance(node, Mapping) else node
+            for value in values:
+                if (
+                    type(value) is JsonRef
+                    or id(value) in pointers
+                    or id(value) in expanded
+                ):
+                    expanded.add(id(node))
+                    break
+
+    def defs_section(self, defs):
+        """The ``defs`` container, created along with its parents if missing"""
+        if not isinstance(self.root, Mapping):
+            msg = "Shared objects need a dict at the root to go in"
+            raise ValueError(msg)  # noqa: TRY004
+        container = self.root
+        for part, _ in _pointer_parts(defs):
+            extras = self.extras.setdefault(id(container), {})
+            if part in container:
+                child = container[part]
+            elif part in extras:
+                child = extras[part]
+            else:
+                child = {}
+                self.created.append(child)
+                extras[part] = child
+            if not isinstance(child, Mapping):
+                msg = f"{defs} is not an object"
+                raise ValueError(msg)  # noqa: TRY004
+            container = child
+        return container
+
+    def expand(self, node):
+        node_id = id(node)
+        if isinstance(node, Mapping):
+            extras = self.extras.get(node_id)
+            items = node.items()
+            if extras:
+                items = itertools.chain(items, extras.items())
+            return {k: self.child(node_id, k, v) for k, v in items}
+        return [self.child(node_id, i, v) for i, v in enumerate(node)]
+
+    def child(self, parent_id, key, value):
+        if type(value) is JsonRef:
+            # Written as the reference it was created from
+            return _Pending(value.__reference__)
+        if type(value) in _LEAF_TYPES or not (
+            isinstance(value, Mapping)
+            or (isinstance(value, Sequence) and not isinstance(value, str))
+        ):
+            return value
+        pointer = self.pointers.get(id(value))
+        if pointer is not None and self.homes[id(value)] != (parent_id, key):
+            return {"$ref": pointer}
+        if id(value) in self.expanded:
+            return _Pending(value)
+        return value
+
+
+def _iterencode_rereferenced(obj, defs, cls=json.JSONEncoder, **kwargs):
+    rereferencer = _Rereferencer(obj, defs)
+
+    class RereferencingEncoder(_ref_encoder_factory(cls)):
+        def default(self, o):
+            if type(o) is _Pending:
+                return rereferencer.expand(o.node)
+            return super().default(o)
+
+    encoder = RereferencingEncoder(check_circular=False, **kwargs)
+    return encoder.iterencode(rereferencer.child(None, None, rereferencer.root))
+
+
 def _ref_encoder_factory(cls):
     class JSONRefEncoder(cls):
         def default(self, o):
             if hasattr(o, "__reference__"):
                 return o.__reference__
-            return super(JSONRefEncoder, cls).default(o)
+            return super().default(o)
 
         # Python 2.6 doesn't work with the default method
         def _iterencode(self, o, *args, **kwargs):
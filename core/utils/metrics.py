@@ -0,0 +1,39 @@
+from logging import getLogger
+
+from django.dispatch import Signal
+from django.dispatch import receiver
+
+logger = getLogger("metrics")
+
+# sent with name=<str>, value=<float>, tags=<dict>; connect a receiver to
+# forward measurements to statsd/prometheus/etc.
+metric_recorded = Signal()
+
+
+def record_metric(name: str, value: float, **tags) -> None:
+    """Record a single measurement
+
+    Args:
+        name (str): dotted metric name e.g. "http.request.queries"
+        value (float): measured value
+        **tags: extra dimensions attached to the measurement
+    """
+    metric_recorded.send(sender=None, name=name, value=value, tags=tags)
+
+
+@receiver(metric_recorded)
+def log_metric(sender, name: str, value: float, tags: dict, **kwargs) -> None:
+    """Default sink, one INFO line per measurement on the "metrics" logger
+
+    The values are also attached as ``metric``/``value``/``tags`` record
+    attributes so a structured log handler can ship them as is. Raise the
+    logger's level to silence it once another receiver forwards the metrics.
+    """
+    tag_string = " ".join(f"{key}={tag}" for key, tag in tags.items())
+    logger.info(
+        "%s=%s %s",
+        name,
+        value,
+        tag_string,
+        extra={"metric": name, "value": value, "tags": tags},
+    )
@@ -0,0 +1,205 @@
+import hashlib
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+from logging import getLogger
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from core.utils.metrics import record_metric
+
+logger = getLogger(__file__)
+
+DEFAULT_QUERY_BUDGET = {
+    "MAX_QUERIES": 50,
+    "MAX_DURATION_MS": 500,
+    # how many times the same SQL shape may run before it is an N+1 candidate
+    "N_PLUS_ONE_THRESHOLD": 5,
+    # raise QueryBudgetExceededError instead of logging a warning (tests/CI)
+    "RAISE": False,
+    # per view overrides keyed by url name e.g. {"api:user-list": {"MAX_QUERIES": 5}}
+    "VIEWS": {},
+}
+
+_IN_CLAUSE = re.compile(r"\((?:%s, )+%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceededError(Exception):
+    pass
+
+
+def get_query_budget() -> dict:
+    return {**DEFAULT_QUERY_BUDGET, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    """Reduce a statement to its shape so queries differing only by
+    parameters (including IN list length and inlined LIMIT/OFFSET) compare equal
+    """
+    sql = _IN_CLAUSE.sub("(...)", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def stack_fingerprint(limit: int = 8) -> str:
+    """Short fingerprint of the project frames that issued the current query
+
+    Returns:
+        str: "<file>:<line> (<function>)#<hash>" of the innermost project frame
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ][-limit:]
+    if not frames:
+        return "unknown"
+    digest = hashlib.sha1(  # noqa: S324
+        "|".join(f"{f.filename}:{f.lineno}" for f in frames).encode(),
+    ).hexdigest()[:8]
+    top = frames[-1]
+    filename = top.filename.removeprefix(base_dir).lstrip("/")
+    return f"{filename}:{top.lineno} ({top.name})#{digest}"
+
+
+class QueryCollector:
+    """``connection.execute_wrapper`` callable counting queries, DB time and
+    repeated SQL shapes for a single request"""
+
+    def __init__(self, n_plus_one_threshold: int):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.fingerprints: dict[str, str] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            shape = normalize_sql(sql)
+            self.shapes[shape] += 1
+            # only pay for the stack walk once per suspicious shape
+            if self.shapes[shape] == self.n_plus_one_threshold:
+                self.fingerprints[shape] = stack_fingerprint()
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    @property
+    def n_plus_one(self) -> dict[str, int]:
+        """fingerprint -> number of times the repeated shape ran"""
+        return {
+            fingerprint: self.shapes[shape]
+            for shape, fingerprint in self.fingerprints.items()
+        }
+
+
+class QueryBudgetMiddleware:
+    """Count queries and DB time per request and flag N+1 candidates.
+
+    Budgets come from ``settings.QUERY_BUDGET`` (see ``DEFAULT_QUERY_BUDGET``),
+    ``QUERY_BUDGET["VIEWS"][<url name>]`` or a ``query_budget`` dict on the
+    view class. Going over budget logs a warning, or raises
+    :class:`QueryBudgetExceededError` when ``QUERY_BUDGET["RAISE"]`` is set so the
+    test suite fails. Results are sent as ``X-Query-*`` response headers when
+    DEBUG is on and as metrics otherwise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        budget = get_query_budget()
+        collector = QueryCollector(budget["N_PLUS_ONE_THRESHOLD"])
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+
+        view_name = self.get_view_name(request)
+        budget = self.get_view_budget(request, view_name, budget)
+        self.report(response, collector, view_name)
+        self.enforce(collector, view_name, budget)
+        return response
+
+    def get_view_name(self, request) -> str:
+        match = getattr(request, "resolver_match", None)
+        return (match and match.view_name) or request.path
+
+    def get_view_budget(self, request, view_name: str, budget: dict) -> dict:
+        match = getattr(request, "resolver_match", None)
+        func = match.func if match else None
+        view_class = getattr(func, "cls", None) or getattr(func, "view_class", None)
+        return {
+            **budget,
+            **budget["VIEWS"].get(view_name, {}),
+            **getattr(view_class, "query_budget", {}),
+        }
+
+    def report(self, response, collector: QueryCollector, view_name: str):
+        if settings.DEBUG:
+            response["X-Query-Count"] = str(collector.count)
+            response["X-Query-Duration-Ms"] = f"{collector.duration_ms:.1f}"
+            if collector.n_plus_one:
+                response["X-Query-N-Plus-One"] = ", ".join(
+                    f"{fingerprint} x{count}"
+                    for fingerprint, count in collector.n_plus_one.items()
+                )
+            return
+
+        record_metric("http.request.queries", collector.count, view=view_name)
+        record_metric(
+            "http.request.query_duration_ms",
+            collector.duration_ms,
+            view=view_name,
+        )
+        for fingerprint, count in collector.n_plus_one.items():
+            record_metric(
+                "http.request.n_plus_one",
+                count,
+                view=view_name,
+                stack=fingerprint,
+            )
+
+    def enforce(self, collector: QueryCollector, view_name: str, budget: dict):
+        errors = []
+        if (
+            budget["MAX_QUERIES"] is not None
+            and collector.count > budget["MAX_QUERIES"]
+        ):
+            errors.append(f"{collector.count} queries > {budget['MAX_QUERIES']}")
+        if (
+            budget["MAX_DURATION_MS"] is not None
+            and collector.duration_ms > budget["MAX_DURATION_MS"]
+        ):
+            errors.append(
+                f"{collector.duration_ms:.1f}ms in db > {budget['MAX_DURATION_MS']}ms",
+            )
+        for fingerprint, count in collector.n_plus_one.items():
+            logger.warning(
+                "%s: possible N+1 at %s (x%s)",
+                view_name,
+                fingerprint,
+                count,
+            )
+
+        if not errors:
+            return
+        message = f"query budget exceeded for {view_name}: {'; '.join(errors)}"
+        if budget["RAISE"]:
+            raise QueryBudgetExceededError(message)
+        logger.warning(message)
@@ -0,0 +1,186 @@
+import json
+from logging import getLogger
+
+from django.conf import settings
+from django.core.paginator import EmptyPage
+from django.core.paginator import Page
+from django.core.paginator import PageNotAnInteger
+from django.core.paginator import Paginator
+from django.db import DatabaseError
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+logger = getLogger(__file__)
+
+
+def get_estimate_threshold() -> int:
+    return getattr(settings, "PAGINATION_ESTIMATE_THRESHOLD", 10_000)
+
+
+class EstimatedPage(Page):
+    """Page whose ``has_next`` comes from a one row look-ahead instead of the
+    (possibly estimated) total count."""
+
+    def __init__(self, object_list, number, paginator, has_more=None):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids ``COUNT(*)`` on large tables.
+
+    For PostgreSQL querysets rows are counted up to ``threshold`` first,
+    which is the exact count on small tables and narrow filters and stops
+    early on large ones. Only past ``threshold`` is the count estimated, from
+    ``pg_class.reltuples`` when the queryset is unfiltered and from the
+    ``EXPLAIN`` row estimate otherwise. The Unfold admin changelist labels
+    estimated totals through ``template_name``.
+
+    Usage
+
+    paginator = EstimatedCountPaginator(queryset, per_page=25) \n
+    paginator.count, paginator.count_is_estimated
+    """
+
+    template_name = "admin/pagination_estimated.html"
+
+    def __init__(self, *args, threshold: int | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = get_estimate_threshold() if threshold is None else threshold
+        self.count_is_estimated = False
+
+    @cached_property
+    def count(self):
+        if not self.can_estimate():
+            return super().count
+        counted = self.object_list[: self.threshold].count()
+        if counted < self.threshold:
+            return counted
+        estimate = self.estimate_count()
+        if estimate is None:
+            return super().count
+        self.count_is_estimated = True
+        # the planner can guess lower than the rows already counted
+        return max(estimate, counted)
+
+    def can_estimate(self) -> bool:
+        return (
+            isinstance(self.object_list, QuerySet)
+            and connections[self.object_list.db].vendor == "postgresql"
+        )
+
+    def estimate_count(self) -> int | None:
+        """Return the planner's row estimate, or None when it is not available.
+
+        Returns:
+            int | None: estimated number of rows
+        """
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        query = queryset.query
+        try:
+            with connection.cursor() as cursor:
+                if (
+                    not query.where
+                    and not query.distinct
+                    and not query.is_sliced
+                    and not query.combinator
+                ):
+                    table = queryset.model._meta.db_table  # noqa: SLF001
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class"
+                        " WHERE oid = %s::regclass",
+                        [connection.ops.quote_name(table)],
+                    )
+                    row = cursor.fetchone()
+                    # reltuples is -1 until the table has been analyzed
+                    return row[0] if row and row[0] >= 0 else None
+
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.warning("count estimate failed: %s", e)
+            return None
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        # an estimate can be lower than the real count so only the lower
+        # bound is enforced, an empty page is caught after fetching it
+        if isinstance(number, float) and not number.is_integer():
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"]) from None
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        # make sure count (and count_is_estimated) is resolved first
+        if not self.count or not self.count_is_estimated:
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return self._get_page(
+            rows[: self.per_page],
+            number,
+            self,
+            has_more=len(rows) > self.per_page,
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page number pagination backed by :class:`EstimatedCountPaginator`.
+
+    The response carries ``count_is_estimated`` so clients can render
+    "about N results" instead of an exact figure. It is not the default
+    pagination class, paginating changes the response shape so views opt in:
+
+    pagination_class = EstimatedCountPagination
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_estimated": self.page.paginator.count_is_estimated,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            },
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_estimated"] = {
+            "type": "boolean",
+            "example": False,
+        }
+        return response_schema
@@ -0,0 +1,139 @@
+"""Fast JSON rendering and parsing for DRF and JSON model fields.
+
+Encoding and parsing happen in Rust with orjson. Pydantic models and unloaded
+lazy PydanticModelField values are spliced in as pre-encoded fragments, every
+other type orjson doesn't support natively is encoded the way DRF's
+``JSONEncoder`` encodes it.
+
+Enable it with ``DJANGO_FAST_JSON=True``, see ``REST_FRAMEWORK`` in
+config/settings/base.py. Pass ``encoder=FastJSONFieldEncoder`` to a
+JSONField/PydanticModelField to use it for the column too.
+"""
+
+import json
+from decimal import Decimal
+from logging import getLogger
+
+import orjson
+from pydantic import BaseModel
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.utils.utils import LazyPydanticValue
+from core.utils.utils import load_raw_json
+
+logger = getLogger(__file__)
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types orjson doesn't encode natively"""
+    if type(obj) is Decimal:
+        # no native Decimal in orjson, DRF's encoder gives a float
+        return float(obj)
+    if isinstance(obj, LazyPydanticValue):
+        raw = obj.get_raw_json()
+        if raw is None:
+            # validated, or stored under an older schema version
+            return obj.get_value()
+        if isinstance(raw, (str, bytes)) and raw[:1] not in (b'"', '"'):
+            # stored JSON is spliced in as is, never parsed
+            return orjson.Fragment(raw)
+        return load_raw_json(raw)
+    if isinstance(obj, BaseModel):
+        return orjson.Fragment(
+            obj.__pydantic_serializer__.to_json(obj, by_alias=True),
+        )
+    # timedelta, bytes, QuerySet, numpy... exactly like DRF
+    return _drf_encoder.default(obj)
+
+
+class _JSONEncoder(json.JSONEncoder):
+    """Fallback for what orjson can't encode, fragments can't be spliced in"""
+
+    def default(self, o):
+        if isinstance(o, LazyPydanticValue):
+            raw = o.get_raw_json()
+            return o.get_value() if raw is None else load_raw_json(raw)
+        if isinstance(o, BaseModel):
+            return o.__pydantic_serializer__.to_python(o, mode="json", by_alias=True)
+        return _default(o)
+
+
+def dumps(data, *, indent: bool = False) -> bytes:
+    """Encode ``data`` to UTF-8 JSON
+
+    Args:
+        data (_type_): anything DRF's JSONEncoder accepts, pydantic models included
+        indent (bool, optional): pretty print with two spaces. Defaults to False.
+
+    Raises:
+        TypeError: ``data`` holds a type neither orjson nor DRF can encode
+
+    Returns:
+        bytes:
+    """
+    option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    try:
+        return orjson.dumps(data, default=_default, option=option)
+    except orjson.JSONEncodeError as exc:
+        if "64-bit" not in str(exc):
+            raise
+    # orjson only has 64 bit integers, the standard library encodes the
+    # rest like DRF does
+    logger.warning("Integer past 64 bits, encoding with the json module")
+    return json.dumps(
+        data,
+        cls=_JSONEncoder,
+        indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+        ensure_ascii=False,
+        allow_nan=False,
+    ).encode()
+
+
+def loads(data: bytes | str):
+    return orjson.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Drop in replacement for ``rest_framework.renderers.JSONRenderer``
+
+    Output is always compact UTF-8, ``indent`` in the accept header or
+    renderer context switches to two space indentation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        ret = dumps(data, indent=bool(indent))
+        # valid JSON but not valid JavaScript, escaped like DRF does for
+        # clients that embed the response in a script
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9",
+            b"\\u2029",
+        )
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            msg = f"JSON parse error - {exc}"
+            raise ParseError(msg) from exc
+
+
+class FastJSONFieldEncoder(json.JSONEncoder):
+    """``encoder`` for JSONField/PydanticModelField columns"""
+
+    def encode(self, o):
+        return dumps(o).decode()
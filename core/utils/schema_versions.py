@@ -0,0 +1,207 @@
+"""Versioned payloads for PydanticModelField.
+
+A model opting in stores its ``schema_version`` with every payload written
+to the database. When its shape changes, bump ``__schema_version__`` and
+register a function turning the previous version's dict into the new one:
+
+    class Operation(VersionedModel, BaseModel):
+        __schema_version__ = 2
+        summary: str = ""
+
+    @register_upgrade(Operation, from_version=1)
+    def rename_title(data: dict) -> dict:
+        data["summary"] = data.pop("title", "")
+        return data
+
+Rows are upgraded in memory every time they are read, so old rows keep
+validating. ``migrate_payloads`` rewrites them in the background until no
+row is left behind. Payloads without ``schema_version`` are version 1.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable
+from logging import getLogger
+from typing import Any
+from typing import ClassVar
+
+from django.db import models
+from django.db import transaction
+from django.db.models.functions import Cast
+from pydantic import BaseModel
+from pydantic import SerializationInfo
+from pydantic import ValidationError as PydanticValidationError
+from pydantic import ValidationInfo
+from pydantic import model_serializer
+from pydantic import model_validator
+
+from core.utils.cache import bump_model_version
+from core.utils.metrics import record_metric
+from core.utils.utils import STORED_PAYLOAD_CONTEXT
+from core.utils.utils import UPGRADED_MODELS_CONTEXT
+
+logger = getLogger(__file__)
+
+SCHEMA_VERSION_FIELD = "schema_version"
+
+_upgrades: dict[type[BaseModel], dict[int, Callable[[dict], dict]]] = defaultdict(dict)
+
+
+class SchemaUpgradeError(Exception):
+    pass
+
+
+def register_upgrade(model_class: type[BaseModel], from_version: int):
+    """Register ``func(data: dict) -> dict`` upgrading ``model_class`` payloads
+    from ``from_version`` to ``from_version + 1``"""
+
+    def decorator(func: Callable[[dict], dict]):
+        _upgrades[model_class][from_version] = func
+        return func
+
+    return decorator
+
+
+def upgrade_payload(model_class: type[BaseModel], data: dict) -> dict:
+    """Run every upgrade between the payload's version and the current one
+
+    Raises:
+        SchemaUpgradeError: an intermediate upgrade is not registered
+
+    Returns:
+        dict: payload in the current shape, stamped with the current version
+    """
+    version = data.get(SCHEMA_VERSION_FIELD) or 1
+    current = model_class.__schema_version__
+    while version < current:
+        upgrade = _upgrades[model_class].get(version)
+        if upgrade is None:
+            msg = f"no upgrade registered for {model_class.__name__} v{version}"
+            raise SchemaUpgradeError(msg)
+        data = upgrade(dict(data))
+        version += 1
+    return {**data, SCHEMA_VERSION_FIELD: current}
+
+
+class VersionedModel(BaseModel):
+    """Mixin storing ``__schema_version__`` with each dump and upgrading
+    stored payloads of older versions while they are validated.
+
+    ``schema_version`` only exists in the stored JSON: it is stamped when
+    PydanticModelField dumps a value for the database and dropped again on
+    validation, so API responses and the OpenAPI schema never show it.
+    """
+
+    __schema_version__: ClassVar[int] = 1
+
+    @model_validator(mode="before")
+    @classmethod
+    def _upgrade_stored_payload(cls, data: Any, info: ValidationInfo):
+        if not isinstance(data, dict):
+            return data
+        context = info.context or {}
+        # anything not read from the database is already in the current shape
+        if (
+            context.get(STORED_PAYLOAD_CONTEXT)
+            and (data.get(SCHEMA_VERSION_FIELD) or 1) < cls.__schema_version__
+        ):
+            upgraded = context.get(UPGRADED_MODELS_CONTEXT)
+            if upgraded is not None:
+                upgraded.append(cls)
+            data = upgrade_payload(cls, data)
+        if SCHEMA_VERSION_FIELD in data:
+            data = {
+                key: value for key, value in data.items() if key != SCHEMA_VERSION_FIELD
+            }
+        return data
+
+    @model_serializer(mode="wrap")
+    def _stamp_schema_version(self, handler, info: SerializationInfo):
+        data = handler(self)
+        if isinstance(data, dict) and (info.context or {}).get(STORED_PAYLOAD_CONTEXT):
+            data[SCHEMA_VERSION_FIELD] = type(self).__schema_version__
+        return data
+
+
+def migrate_payloads(
+    model: type[models.Model],
+    field_name: str,
+    chunk_size: int = 500,
+    queryset: models.QuerySet | None = None,
+) -> dict[str, int]:
+    """Rewrite rows whose ``field_name`` payload is older than the current
+    schema version.
+
+    Rows are streamed through a server-side cursor and written back with
+    ``bulk_update`` one chunk at a time, so it can run next to live traffic
+    (from a data migration, task or shell) and be restarted at any point.
+
+    Args:
+        model (type[models.Model]): model holding the PydanticModelField
+        field_name (str): name of the PydanticModelField
+        chunk_size (int, optional): rows fetched and written per batch.
+            Defaults to 500.
+        queryset (models.QuerySet | None, optional): limit the rows to migrate.
+
+    Returns:
+        dict[str, int]: number of rows "checked", "upgraded" and "failed"
+    """
+    opts = model._meta  # noqa: SLF001
+    manager = model._default_manager  # noqa: SLF001
+    field = opts.get_field(field_name)
+    queryset = manager.all() if queryset is None else queryset
+    rows = (
+        queryset.order_by()
+        .annotate(_stored=Cast(field_name, models.JSONField()))
+        .values_list("pk", "_stored")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    stats = {"checked": 0, "upgraded": 0, "failed": 0}
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        with transaction.atomic(using=queryset.db):
+            manager.using(queryset.db).bulk_update(pending, [field_name])
+        stats["upgraded"] += len(pending)
+        logger.info(
+            "%s.%s: upgraded %s rows",
+            opts.label,
+            field_name,
+            stats["upgraded"],
+        )
+        pending.clear()
+
+    for pk, stored in rows:
+        stats["checked"] += 1
+        if stored is None:
+            continue
+        try:
+            value, upgraded = field.upgrade_stored(stored)
+        except (PydanticValidationError, SchemaUpgradeError) as e:
+            stats["failed"] += 1
+            logger.warning(
+                "%s pk=%s: cannot upgrade %s: %s",
+                opts.label,
+                pk,
+                field_name,
+                e,
+            )
+            continue
+        if upgraded:
+            pending.append(model(**{opts.pk.attname: pk, field.attname: value}))
+        if len(pending) >= chunk_size:
+            flush()
+    flush()
+
+    if stats["upgraded"]:
+        bump_model_version(model)
+    for name, value in stats.items():
+        record_metric(
+            f"schema_versions.{name}",
+            value,
+            model=opts.label,
+            field=field_name,
+        )
+    return stats
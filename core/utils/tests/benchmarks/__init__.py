@@ -0,0 +1,76 @@
+"""Micro benchmarks, not collected by pytest.
+
+Run one with e.g. ``python -m core.utils.tests.benchmarks.bench_pydantic_field``
+(needs the same environment as the test suite, DATABASE_URL included).
+"""
+
+import os
+import timeit
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+    django.setup()
+
+
+def build_openapi_spec(n_paths: int = 100) -> dict:
+    """OpenAPI document with ``n_paths`` paths, each with a GET and a POST
+    operation sharing a handful of component schemas"""
+    schema = {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer", "format": "int64", "minimum": 1},
+            "name": {"type": "string", "maxLength": 120},
+            "tags": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["id", "name"],
+    }
+    paths = {}
+    for i in range(n_paths):
+        response = {
+            "description": f"response {i}",
+            "content": {
+                "application/json": {"schema": {"$ref": "#/components/schemas/Item"}},
+            },
+        }
+        paths[f"/items{i}/{{id}}"] = {
+            "get": {
+                "tags": ["items"],
+                "summary": f"Retrieve item {i}",
+                "operationId": f"items{i}_retrieve",
+                "parameters": [
+                    {
+                        "name": "id",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "integer"},
+                    },
+                ],
+                "responses": {"200": response},
+            },
+            "post": {
+                "tags": ["items"],
+                "summary": f"Update item {i}",
+                "operationId": f"items{i}_update",
+                "requestBody": {
+                    "content": {"application/json": {"schema": schema}},
+                    "required": True,
+                },
+                "responses": {"200": response, "400": {"description": "bad request"}},
+            },
+        }
+    return {
+        "openapi": "3.1.0",
+        "info": {"title": "Benchmark", "version": "1.0.0"},
+        "paths": paths,
+        "components": {"schemas": {"Item": schema}},
+    }
+
+
+def report(name: str, statement, number: int = 5, repeat: int = 3) -> float:
+    """print and return the best time per call in milliseconds"""
+    best = min(timeit.repeat(statement, number=number, repeat=repeat)) / number * 1000
+    print(f"{name:<45} {best:10.2f} ms")  # noqa: T201
+    return best
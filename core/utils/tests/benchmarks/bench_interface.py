@@ -0,0 +1,43 @@
+"""core.utils.interface.BaseModel schema generation and dumps"""
+
+# Django is set up in main() before anything touching models is imported
+# ruff: noqa: PLC0415
+
+from core.utils.tests.benchmarks import report
+from core.utils.tests.benchmarks import setup_django
+
+
+def main():
+    setup_django()
+    from core.utils import interface
+    from core.utils.pydantic_schemas import OpenAPISpecSchema
+    from core.utils.tests.benchmarks import build_openapi_spec
+
+    def uncached():
+        interface._json_schema_cache.clear()  # noqa: SLF001
+        return OpenAPISpecSchema.model_json_schema()
+
+    report("model_json_schema: uncached", uncached)
+    report("model_json_schema: cached", OpenAPISpecSchema.model_json_schema)
+
+    spec = OpenAPISpecSchema(**build_openapi_spec(2000))
+    print(f"spec: {len(spec.model_dump_json(by_alias=True)) / 2**20:.1f} MiB")  # noqa: T201
+    report(
+        "model_dump: with ref walk",
+        lambda: spec.model_dump(by_alias=True, resolve_refs=True),
+    )
+    report("model_dump", lambda: spec.model_dump(by_alias=True))
+    report("model_dump: mode=json", lambda: spec.model_dump(by_alias=True, mode="json"))
+    report("dict_plain", spec.dict_plain)
+
+    def compile_sampler():
+        interface._sampler_cache.clear()  # noqa: SLF001
+        return OpenAPISpecSchema.example_sampler()
+
+    report("example_sampler: compile", compile_sampler)
+    sampler = OpenAPISpecSchema.example_sampler()
+    report("example_sampler: 1000 examples", lambda: [sampler() for _ in range(1000)])
+
+
+if __name__ == "__main__":
+    main()
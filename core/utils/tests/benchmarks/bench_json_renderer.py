@@ -0,0 +1,68 @@
+"""DRF JSONRenderer/JSONParser vs FastJSONRenderer/FastJSONParser on large
+OpenAPI payloads"""
+
+# Django is set up in main() before anything touching models is imported
+# ruff: noqa: PLC0415
+
+import io
+
+from core.utils.tests.benchmarks import build_openapi_spec
+from core.utils.tests.benchmarks import report
+from core.utils.tests.benchmarks import setup_django
+
+
+def main():
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.utils.pydantic_schemas import OpenAPISpecSchema
+    from core.utils.renderers import FastJSONParser
+    from core.utils.renderers import FastJSONRenderer
+    from core.utils.utils import PydanticModelField
+    from core.utils.utils import PydanticModelSerializerField
+
+    specs = [OpenAPISpecSchema(**build_openapi_spec(50)) for _ in range(20)]
+    serializer_field = PydanticModelSerializerField(pydantic_model=OpenAPISpecSchema)
+    data = {
+        "results": [
+            {"id": i, "spec": serializer_field.to_representation(spec)}
+            for i, spec in enumerate(specs)
+        ],
+    }
+    models = {"results": [{"id": i, "spec": spec} for i, spec in enumerate(specs)]}
+    lazy_field = PydanticModelField(pydantic_model=OpenAPISpecSchema, lazy=True)
+    raws = [lazy_field.get_prep_value(spec) for spec in specs]
+
+    body = JSONRenderer().render(data)
+    print(f"payload: {len(body) / 1024:.0f} KiB")  # noqa: T201
+
+    report("render: JSONRenderer", lambda: JSONRenderer().render(data))
+    report("render: FastJSONRenderer", lambda: FastJSONRenderer().render(data))
+    report(
+        "render: to_representation + JSONRenderer",
+        lambda: JSONRenderer().render(
+            {
+                "results": [
+                    {"id": i, "spec": serializer_field.to_representation(spec)}
+                    for i, spec in enumerate(specs)
+                ],
+            },
+        ),
+    )
+    report(
+        "render: FastJSONRenderer with models",
+        lambda: FastJSONRenderer().render(models),
+    )
+    report(
+        "render: FastJSONRenderer with lazy values",
+        lambda: FastJSONRenderer().render(
+            {"results": [lazy_field.from_db_value(raw, None, None) for raw in raws]},
+        ),
+    )
+    report("parse: JSONParser", lambda: JSONParser().parse(io.BytesIO(body)))
+    report("parse: FastJSONParser", lambda: FastJSONParser().parse(io.BytesIO(body)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""core.utils.jsonref reference replacement and loading"""
+
+# Django is set up in main() before anything touching models is imported
+# ruff: noqa: PLC0415
+
+import io
+import json
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from core.utils.tests.benchmarks import build_openapi_spec
+from core.utils.tests.benchmarks import report
+from core.utils.tests.benchmarks import setup_django
+
+
+def peak_memory(name, statement):
+    tracemalloc.start()
+    statement()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<45} {peak / 2**20:10.1f} MiB peak")  # noqa: T201
+
+
+def main():
+    setup_django()
+    from core.utils import jsonref
+
+    spec = build_openapi_spec(2000)
+    report("replace_refs", lambda: jsonref.replace_refs(spec), number=1)
+    report(
+        "replace_refs: proxies=False",
+        lambda: jsonref.replace_refs(spec, proxies=False),
+        number=1,
+    )
+    report(
+        "replace_refs: lazy_load=False",
+        lambda: jsonref.replace_refs(spec, lazy_load=False),
+        number=1,
+    )
+    report("flatten_refs", lambda: jsonref.flatten_refs(spec), number=1)
+    peak_memory(
+        "replace_refs: proxies=False",
+        lambda: jsonref.replace_refs(spec, proxies=False),
+    )
+    peak_memory("flatten_refs", lambda: jsonref.flatten_refs(spec))
+
+    spec = json.loads(json.dumps(spec))
+    flat = jsonref.flatten_refs(spec)
+    defs = "/components/schemas"
+    rereferenced = jsonref.dumps(flat, rereference=True, defs=defs)
+    print(  # noqa: T201
+        f"dump sizes: original {len(json.dumps(spec))}, "
+        f"expanded {len(json.dumps(flat))}, rereferenced {len(rereferenced)}",
+    )
+    report("json.dump: original spec", lambda: json.dump(spec, io.StringIO()), number=1)
+    report("json.dump: expanded", lambda: json.dump(flat, io.StringIO()), number=1)
+    report(
+        "dump: rereference",
+        lambda: jsonref.dump(flat, io.StringIO(), rereference=True, defs=defs),
+        number=1,
+    )
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json") as fp:
+        json.dump(spec, fp, indent=2)
+        fp.flush()
+
+        def load():
+            with Path(fp.name).open() as f:
+                return jsonref.load(f)
+
+        def load_file():
+            return jsonref.load_file(fp.name)
+
+        report("load", load, number=1)
+        report("load_file: streamed from mmap", load_file, number=1)
+        peak_memory("load", load)
+        peak_memory("load_file: streamed from mmap", load_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""PydanticModelField: dict round trip vs TypeAdapter validate_json/dump_json,
+and PydanticModelSerializerField.to_representation"""
+
+# Django is set up in main() before anything touching models is imported
+# ruff: noqa: PLC0415
+
+import json
+
+from core.utils.tests.benchmarks import build_openapi_spec
+from core.utils.tests.benchmarks import report
+from core.utils.tests.benchmarks import setup_django
+
+
+def main():
+    setup_django()
+    from core.utils.pydantic_schemas import OpenAPISpecSchema
+    from core.utils.utils import PydanticModelField
+    from core.utils.utils import PydanticModelSerializerField
+
+    field = PydanticModelField(pydantic_model=[OpenAPISpecSchema])
+    specs = [OpenAPISpecSchema(**build_openapi_spec(50)) for _ in range(20)]
+    raw = field.get_prep_value(specs)
+    print(f"payload: {len(raw) / 1024:.0f} KiB")  # noqa: T201
+
+    report(
+        "load: json.loads + Model(**x)",
+        lambda: [OpenAPISpecSchema(**x) for x in json.loads(raw)],
+    )
+    report("load: TypeAdapter.validate_json", lambda: field.to_python(raw))
+    report(
+        "dump: model_dump + json.dumps",
+        lambda: json.dumps([x.model_dump(mode="json", by_alias=True) for x in specs]),
+    )
+    report("dump: TypeAdapter.dump_json", lambda: field.get_prep_value(specs))
+
+    serializer_field = PydanticModelSerializerField(pydantic_model=[OpenAPISpecSchema])
+    lazy = PydanticModelField(pydantic_model=[OpenAPISpecSchema], lazy=True)
+    report(
+        "representation: get_prep_value + json.loads",
+        lambda: json.loads(field.get_prep_value(specs)),
+    )
+    report(
+        "representation: to_json_python",
+        lambda: serializer_field.to_representation(specs),
+    )
+    report(
+        "representation: unloaded lazy value",
+        lambda: serializer_field.to_representation(lazy.from_db_value(raw, None, None)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import pytest
+from django.db import connection
+from django.db import models
+from django.test.utils import isolate_apps
+
+from core.utils.pydantic_schemas import InfoSchema
+from core.utils.utils import PydanticModelField
+
+
+@pytest.fixture
+def document_model(transactional_db):
+    """Throwaway table with PydanticModelFields for tests running real jsonb
+    SQL, ``info`` in the legacy jsonb string format"""
+    with isolate_apps("core.utils"):
+
+        class Document(models.Model):  # noqa: DJ008
+            info = PydanticModelField(pydantic_model=InfoSchema)
+            infos = PydanticModelField(pydantic_model=[InfoSchema], store_objects=True)
+
+            class Meta:
+                app_label = "utils"
+
+    with connection.schema_editor() as editor:
+        editor.create_model(Document)
+    yield Document
+    with connection.schema_editor() as editor:
+        editor.delete_model(Document)
@@ -0,0 +1,136 @@
+import pytest
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from rest_framework import serializers
+from rest_framework.mixins import ListModelMixin
+from rest_framework.permissions import AllowAny
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import GenericViewSet
+
+from core.utils.cache import bump_model_version
+from core.utils.cache import get_model_versions
+from core.utils.cache import get_or_compute
+from core.utils.cache import track_model_versions
+from core.utils.view_utils import CachedListMixin
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ["name"]
+
+
+class GroupViewSet(CachedListMixin, ListModelMixin, GenericViewSet):
+    queryset = Group.objects.order_by("name")
+    serializer_class = GroupSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+def test_bump_model_version():
+    before = get_model_versions([Group])["auth.group"]
+    bump_model_version(Group)
+
+    assert get_model_versions([Group])["auth.group"] == before + 1
+
+
+def test_get_or_compute_only_computes_once():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert get_or_compute("key", compute) == "value"
+    assert get_or_compute("key", compute) == "value"
+    assert len(calls) == 1
+
+
+@pytest.mark.django_db
+def test_cached_list_invalidated_on_save(django_assert_num_queries):
+    view = GroupViewSet.as_view({"get": "list"})
+    request = APIRequestFactory()
+    Group.objects.create(name="a")
+
+    assert view(request.get("/")).data == [{"name": "a"}]
+    with django_assert_num_queries(0):
+        assert view(request.get("/")).data == [{"name": "a"}]
+    # different query params are cached separately
+    with django_assert_num_queries(1):
+        view(request.get("/", {"page": 2}))
+
+    Group.objects.create(name="b")
+    assert view(request.get("/")).data == [{"name": "a"}, {"name": "b"}]
+
+
+class CountHeaderMixin:
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response["X-Total-Count"] = len(response.data)
+        return response
+
+
+class NestedGroupViewSet(
+    CachedListMixin,
+    CountHeaderMixin,
+    ListModelMixin,
+    GenericViewSet,
+):
+    """lists groups under ``/parents/<parent_pk>/groups/``"""
+
+    serializer_class = GroupSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    cache_models = [Group]
+
+    def get_queryset(self):
+        return Group.objects.filter(name__startswith=self.kwargs["parent_pk"])
+
+
+@pytest.mark.django_db
+def test_cached_list_per_url_kwargs():
+    view = NestedGroupViewSet.as_view({"get": "list"})
+    request = APIRequestFactory()
+    Group.objects.create(name="a1")
+    Group.objects.create(name="b1")
+
+    assert view(request.get("/"), parent_pk="a").data == [{"name": "a1"}]
+    assert view(request.get("/"), parent_pk="b").data == [{"name": "b1"}]
+
+
+@pytest.mark.django_db
+def test_cached_list_keeps_headers(django_assert_num_queries):
+    view = NestedGroupViewSet.as_view({"get": "list"})
+    request = APIRequestFactory()
+    Group.objects.create(name="a1")
+
+    view(request.get("/"), parent_pk="a")
+    with django_assert_num_queries(0):
+        response = view(request.get("/"), parent_pk="a")
+
+    assert response["X-Total-Count"] == "1"
+
+
+@pytest.mark.django_db
+def test_only_tracked_models_bump_versions():
+    track_model_versions(Group)
+    group = Group.objects.create(name="a")
+    before = get_model_versions([Group, Permission])
+
+    Permission.objects.create(
+        name="p",
+        codename="p",
+        content_type=ContentType.objects.get_for_model(Group),
+    )
+    assert get_model_versions([Group, Permission]) == before
+
+    # reverse many to many relations are tracked through their through model
+    group.permissions.add(Permission.objects.get(codename="p"))
+    assert get_model_versions([Group])["auth.group"] > before["auth.group"]
@@ -0,0 +1,262 @@
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel as PydanticBaseModel
+from pydantic import Field
+
+from core.utils import interface
+from core.utils.interface import BaseModel
+from core.utils.interface import compile_sampler
+from core.utils.interface import inline_refs
+from core.utils.interface import remove_circular_refs
+from core.utils.pydantic_schemas import InfoSchema
+from core.utils.pydantic_schemas import OpenAPISpecSchema
+from core.utils.tests.benchmarks import build_openapi_spec
+
+
+class Node(BaseModel):
+    name: str = ""
+    child: Optional["Leaf"] = None
+
+
+@pytest.fixture
+def schema_cache():
+    return interface._json_schema_cache  # noqa: SLF001
+
+
+class TestModelJsonSchema:
+    def test_memoized_per_arguments(self, schema_cache):
+        OpenAPISpecSchema.model_json_schema()
+        OpenAPISpecSchema.model_json_schema(mode="serialization")
+
+        assert (OpenAPISpecSchema, (), ()) in schema_cache
+        assert (OpenAPISpecSchema, (), (("mode", "serialization"),)) in schema_cache
+
+    def test_callers_get_copies(self):
+        schema = OpenAPISpecSchema.model_json_schema()
+        schema["properties"].clear()
+
+        assert OpenAPISpecSchema.model_json_schema()["properties"]
+
+    def test_cleared_on_model_rebuild(self, schema_cache):
+        OpenAPISpecSchema.model_json_schema()
+
+        Node.model_rebuild(force=True)
+
+        assert not schema_cache
+        child = Node.model_json_schema()["properties"]["child"]
+        assert child["anyOf"][0]["properties"] == {
+            "value": {"default": 0, "title": "Value", "type": "integer"},
+        }
+
+
+class Leaf(BaseModel):
+    value: int = 0
+
+
+class TestInlineRefs:
+    defs = {
+        "#/A": {
+            "type": "object",
+            "properties": {"a": {"$ref": "#/A"}, "b": {"$ref": "#/B"}},
+        },
+        "#/B": {"type": "object", "properties": {"c": {"$ref": "#/C"}}},
+        "#/C": {"type": "string"},
+    }
+
+    def test_cycles_become_stubs(self):
+        cycles = []
+
+        resolved = inline_refs({"$ref": "#/A"}, self.defs, cycles=cycles)
+
+        assert resolved["properties"]["a"] == {"$ref": "#/A"}
+        assert resolved["properties"]["b"]["properties"]["c"] == {"type": "string"}
+        assert cycles == ["#/A"]
+
+    def test_definitions_are_shared(self):
+        resolved = inline_refs([{"$ref": "#/B"}, {"$ref": "#/B"}], self.defs)
+
+        assert resolved[0] is resolved[1]
+
+    def test_max_depth(self):
+        resolved = inline_refs({"$ref": "#/B"}, self.defs, max_depth=1)
+
+        assert resolved is self.defs["#/B"]
+
+    def test_deep_tree(self):
+        levels = 10_000
+        tree = leaf = {}
+        for _ in range(levels):
+            leaf["items"] = leaf = {}
+
+        resolved, depth = inline_refs(tree, {}), 0
+        while resolved:
+            resolved, depth = resolved["items"], depth + 1
+
+        assert depth == levels
+
+
+class Document(BaseModel):
+    defs: dict = Field(default_factory=dict, alias="$defs")
+    root: dict = Field(default_factory=dict)
+
+
+class TestModelDump:
+    def test_matches_pydantic(self):
+        spec = OpenAPISpecSchema(**build_openapi_spec(3))
+        expected = PydanticBaseModel.model_dump(spec, by_alias=True)
+
+        assert spec.model_dump(by_alias=True) == expected
+
+    def test_resolve_refs(self):
+        document = Document(
+            **{"$defs": {"A": {"type": "string"}}, "root": {"$ref": "#/$defs/A"}},
+        )
+
+        assert document.model_dump(by_alias=True)["root"] == {"$ref": "#/$defs/A"}
+        resolved = document.model_dump(by_alias=True, resolve_refs=True)
+        assert resolved == {"root": {"type": "string"}}
+
+    def test_dict_plain(self):
+        spec = OpenAPISpecSchema(**build_openapi_spec(1))
+
+        assert spec.dict_plain() == spec.model_dump(by_alias=True, mode="json")
+
+
+class TestRemoveCircularRefs:
+    def test_cycles_are_cut_and_reported(self):
+        shared = {"type": "string"}
+        document = {"paths": [{"schema": shared}], "components": {"a": shared}}
+        document["paths"][0]["parent"] = document
+        cycles = []
+
+        result = remove_circular_refs(document, cycles=cycles)
+
+        assert result == {
+            "paths": [{"schema": shared, "parent": None}],
+            "components": {"a": shared},
+        }
+        assert cycles == [("paths", 0, "parent")]
+        assert result["components"] is document["components"]
+        assert document["paths"][0]["parent"] is document
+
+    def test_nothing_is_copied_without_cycles(self):
+        document = {"paths": [{"a": 1}], "tags": ("x", ["y"])}
+
+        assert remove_circular_refs(document) is document
+
+    def test_deep_tree(self):
+        levels = 10_000
+        tree = leaf = {}
+        for _ in range(levels):
+            leaf["items"] = leaf = {}
+        leaf["items"] = tree
+        cycles = []
+
+        remove_circular_refs(tree, cycles=cycles)
+
+        assert len(cycles[0]) == levels + 1
+
+
+class TestCompileSampler:
+    def test_constraints(self):
+        min_length, max_length, max_items = 2, 4, 5
+        sampler = compile_sampler(
+            {
+                "type": "object",
+                "properties": {
+                    "status": {"type": "string", "enum": ["a", "b"]},
+                    "code": {
+                        "type": "string",
+                        "minLength": min_length,
+                        "maxLength": max_length,
+                    },
+                    "count": {
+                        "type": "integer",
+                        "minimum": 3,
+                        "maximum": 9,
+                        "multipleOf": 3,
+                    },
+                    "tags": {
+                        "type": "array",
+                        "items": {"type": "boolean"},
+                        "maxItems": max_items,
+                    },
+                    "unknown": {"$ref": "#/$defs/Missing"},
+                },
+            },
+        )
+
+        for _ in range(50):
+            example = sampler()
+            assert example["status"] in ("a", "b")
+            assert min_length <= len(example["code"]) <= max_length
+            assert example["count"] in (3, 6, 9)
+            assert 1 <= len(example["tags"]) <= max_items
+            assert "unknown" not in example
+
+    @pytest.mark.parametrize(
+        ("schema", "low", "high"),
+        [
+            ({"maximum": 100}, 0, 100),
+            ({"maximum": -5}, None, -5),
+            ({"minimum": 10**13}, 10**13, None),
+            ({"minimum": 3, "format": "int32"}, 3, None),
+            ({"exclusiveMinimum": 1, "exclusiveMaximum": 4}, 2, 3),
+            ({"exclusiveMaximum": 0}, None, -1),
+            (
+                {
+                    "minimum": 1,
+                    "maximum": 3,
+                    "exclusiveMinimum": True,
+                    "exclusiveMaximum": True,
+                },
+                2,
+                2,
+            ),
+            ({"maximum": 10, "multipleOf": 5}, 0, 10),
+        ],
+    )
+    def test_integer_bounds(self, schema, low, high):
+        sampler = compile_sampler({"type": "integer", **schema})
+
+        for _ in range(50):
+            value = sampler()
+            assert low is None or value >= low
+            assert high is None or value <= high
+            assert value % schema.get("multipleOf", 1) == 0
+
+    @pytest.mark.parametrize(
+        ("schema", "lengths"),
+        [
+            ({"minItems": 2, "maxItems": 2}, {2}),
+            ({"maxItems": 0}, {0}),
+            ({"minItems": 5}, {5}),
+            ({}, {1, 2, 3}),
+        ],
+    )
+    def test_array_length(self, schema, lengths):
+        sampler = compile_sampler(
+            {"type": "array", "items": {"type": "boolean"}, **schema},
+        )
+
+        for _ in range(50):
+            assert len(sampler()) in lengths
+
+    def test_examples_validate(self):
+        sampler = InfoSchema.example_sampler()
+
+        assert sampler is InfoSchema.example_sampler()
+        for _ in range(20):
+            InfoSchema(**sampler())
+
+    def test_legacy_generators(self):
+        model = InfoSchema()
+        bound = 2
+        items = {"type": "object", "properties": {"n": {"type": "number"}}}
+
+        date_time = model.generatestring({"format": "date-time"})
+        assert len(date_time) == len("YYYY-mm-dd HH:MM:SS")
+        assert model.generateinteger({"minimum": bound, "maximum": bound}) == bound
+        value = model.generate_value({"items": {"type": "array", "items": items}}, {})
+        assert value[0]["items"][0].keys() == {"n"}
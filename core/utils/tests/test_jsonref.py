@@ -0,0 +1,477 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from core.utils import jsonref
+from core.utils.jsonref import JsonLoader
+from core.utils.jsonref import JsonLoaderOfflineError
+from core.utils.jsonref import JsonRef
+from core.utils.jsonref import JsonRefError
+
+
+class SpecServer(ThreadingHTTPServer):
+    """Serves ``documents`` by path with an ETag after ``latency`` seconds,
+    counting the requests and how many were in flight at once"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SpecHandler)
+        self.documents = {}
+        self.requests = []
+        self.not_modified = 0
+        self.latency = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class SpecHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            self.respond()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def respond(self):
+        if self.path not in self.server.documents:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = json.dumps(self.server.documents[self.path]).encode()
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.not_modified += 1
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = SpecServer()
+    thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.01},
+        daemon=True,
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestJsonLoader:
+    def test_memory_cache(self, server):
+        server.documents["/a.json"] = {"a": 1}
+        loader = JsonLoader()
+
+        assert loader(server.url("/a.json")) == {"a": 1}
+        assert loader(server.url("/a.json")) == {"a": 1}
+        assert server.requests == ["/a.json"]
+
+    def test_lru_bound(self, server):
+        server.documents.update({"/a.json": {"a": 1}, "/b.json": {"b": 1}})
+        loader = JsonLoader(cache_size=1)
+
+        loader(server.url("/a.json"))
+        loader(server.url("/b.json"))
+        loader(server.url("/a.json"))
+
+        assert server.requests == ["/a.json", "/b.json", "/a.json"]
+
+    def test_disk_cache_revalidates(self, server, tmp_path):
+        server.documents["/a.json"] = {"a": 1}
+        JsonLoader(cache_dir=tmp_path)(server.url("/a.json"))
+
+        assert JsonLoader(cache_dir=tmp_path)(server.url("/a.json")) == {"a": 1}
+        assert server.not_modified == 1
+
+        server.documents["/a.json"] = {"a": 2}
+        assert JsonLoader(cache_dir=tmp_path)(server.url("/a.json")) == {"a": 2}
+
+    def test_offline(self, server, tmp_path):
+        server.documents["/a.json"] = {"a": 1}
+        JsonLoader(cache_dir=tmp_path)(server.url("/a.json"))
+        loader = JsonLoader(cache_dir=tmp_path, offline=True)
+
+        assert loader(server.url("/a.json")) == {"a": 1}
+        with pytest.raises(JsonLoaderOfflineError):
+            loader(server.url("/b.json"))
+        assert server.requests == ["/a.json"]
+
+    def test_ttl(self, server):
+        server.documents["/a.json"] = {"a": 1}
+        loader = JsonLoader(ttl=0)
+
+        loader(server.url("/a.json"))
+        server.documents["/a.json"] = {"a": 2}
+
+        assert loader(server.url("/a.json")) == {"a": 2}
+        assert server.requests == ["/a.json", "/a.json"]
+
+    def test_edited_file_is_reloaded(self, tmp_path):
+        path = tmp_path / "a.json"
+        path.write_text('{"a": 1}')
+        loader = JsonLoader()
+
+        assert loader(path.as_uri()) == {"a": 1}
+        path.write_text('{"a": 2}')
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+
+        assert loader(path.as_uri()) == {"a": 2}
+
+    def test_offline_reads_files(self, tmp_path):
+        path = tmp_path / "a.json"
+        path.write_text('{"a": 1}')
+
+        assert JsonLoader(offline=True)(path.as_uri()) == {"a": 1}
+
+    def test_http_error(self, server):
+        with pytest.raises(Exception, match="404"):
+            JsonLoader()(server.url("/missing.json"))
+
+    def test_replace_refs_shares_documents(self, server):
+        server.documents["/defs.json"] = {"Pet": {"type": "object"}}
+        loader = JsonLoader()
+        doc = {"$ref": server.url("/defs.json#/Pet")}
+
+        assert jsonref.replace_refs(doc, loader=loader) == {"type": "object"}
+        assert jsonref.replace_refs(doc, loader=loader) == {"type": "object"}
+        assert server.requests == ["/defs.json"]
+
+
+class TestReplaceRefs:
+    def test_replaces_refs(self):
+        doc = {"a": {"x": 1}, "b": [{"$ref": "#/a"}, {"c": {"$ref": "#/a/x"}}]}
+
+        result = jsonref.replace_refs(doc)
+
+        assert type(result["b"][0]) is JsonRef
+        assert result["b"] == [{"x": 1}, {"c": 1}]
+        assert result["a"] is not doc["a"]
+
+    def test_deep_document(self):
+        doc = leaf = {}
+        for _ in range(5000):
+            leaf["child"] = leaf = {}
+        leaf["$ref"] = "#/missing"
+
+        result = jsonref.replace_refs(doc)
+
+        for _ in range(5000):
+            result = result["child"]
+        assert type(result) is JsonRef
+
+    def test_error_path(self):
+        doc = {"paths": [{"$ref": "missing.json"}]}
+        loader = JsonLoader(offline=True)
+
+        result = jsonref.replace_refs(doc, loader=loader)
+
+        with pytest.raises(JsonRefError) as error:
+            result["paths"][0]["a"]
+        assert error.value.path == ("paths", 0)
+
+    def test_records_one_metric(self):
+        with patch("core.utils.jsonref.record_metric") as record_metric:
+            jsonref.replace_refs({"a": [{"b": {"$ref": "#/a"}}]})
+
+        record_metric.assert_called_once()
+        assert record_metric.call_args.args[0] == "jsonref.replace_refs.duration_ms"
+
+    def test_trace(self, caplog):
+        with caplog.at_level(logging.DEBUG):
+            jsonref.replace_refs({"a": [{"$ref": "#/b"}], "b": 1}, trace=True)
+
+        assert "('a', 0) -> #/b" in caplog.text
+
+    def test_pointer_resolved_once(self):
+        doc = {
+            "components": {"schemas": {"Item": {"type": "object"}}},
+            "paths": [{"$ref": "#/components/schemas/Item"} for _ in range(100)],
+        }
+
+        pointer_parts = jsonref._pointer_parts  # noqa: SLF001
+        with patch.object(jsonref, "_pointer_parts", wraps=pointer_parts) as parts:
+            result = jsonref.replace_refs(doc, lazy_load=False)
+
+        assert parts.call_count == 1
+        assert all(ref == {"type": "object"} for ref in result["paths"])
+
+    def test_pointer_into_itself(self):
+        a, c = 1, 2
+        result = jsonref.replace_refs(
+            {"a": {"$ref": "#/a/b", "b": a}, "c": {"$ref": "#/c/b", "b": c}},
+        )
+
+        assert result["a"] == a
+        assert result["c"] == c
+
+
+class TestStreamLoad:
+    document = {
+        "a": {"x": [1, -2.5e-3, True, None, 'é😀"\\']},
+        "b": [{"$ref": "#/a"}, {"c": {"$ref": "#/a/x/4", "d": {}}}],
+    }
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+    @pytest.mark.parametrize("binary", [True, False])
+    def test_same_as_load(self, chunk_size, binary):
+        text = json.dumps(self.document, indent=2, ensure_ascii=False)
+        fp = io.BytesIO(text.encode()) if binary else io.StringIO(text)
+
+        result = jsonref.load(fp, stream=True, chunk_size=chunk_size)
+
+        assert result == jsonref.loads(text)
+        assert type(result["b"][0]) is JsonRef
+        assert result["b"][1]["c"] == 'é😀"\\'
+
+    def test_jsonschema_id_after_ref(self):
+        text = '{"a": {"b": {"$ref": "#/x"}, "$id": "http://other/doc.json"}}'
+
+        result = jsonref.load(io.StringIO(text), jsonschema=True, stream=True)
+
+        assert (
+            object.__getattribute__(result["a"]["b"], "full_uri")
+            == "http://other/doc.json#/x"
+        )
+
+    @pytest.mark.parametrize("text", ["[1,]", '{"a" 1}', "[1] 2", '"abc', "{"])
+    def test_syntax_error(self, text):
+        with pytest.raises(json.JSONDecodeError):
+            jsonref.load(io.StringIO(text), stream=True, chunk_size=2)
+
+    @pytest.mark.parametrize("use_mmap", [True, False])
+    def test_load_file(self, tmp_path, use_mmap):
+        (tmp_path / "defs.json").write_text('{"Item": {"type": "object"}}')
+        (tmp_path / "spec.json").write_text('{"item": {"$ref": "defs.json#/Item"}}')
+
+        result = jsonref.load_file(tmp_path / "spec.json", use_mmap=use_mmap)
+
+        assert result == {"item": {"type": "object"}}
+
+    def test_json_arguments_rejected(self):
+        with pytest.raises(TypeError):
+            jsonref.load(io.StringIO("{}"), stream=True, parse_float=float)
+
+
+class TestPrefetch:
+    def build(self, server, n=8):
+        for i in range(n):
+            server.documents[f"/defs{i}.json"] = {"Item": {"$ref": "common.json#/Id"}}
+        server.documents["/common.json"] = {"Id": {"type": "integer"}}
+        return {
+            "items": [{"$ref": server.url(f"/defs{i}.json#/Item")} for i in range(n)],
+        }
+
+    def test_prefetches_concurrently(self, server):
+        server.latency = 0.1
+        doc = self.build(server)
+        # 8 documents in parallel then common.json
+        documents = 9
+
+        result = jsonref.replace_refs(doc, loader=JsonLoader(), prefetch=True)
+
+        assert len(server.requests) == documents
+        assert server.max_in_flight > 1
+        assert result["items"][0] == {"type": "integer"}
+        # resolving didn't fetch anything again
+        assert len(server.requests) == documents
+
+    def test_concurrency_limit(self, server):
+        server.latency = 0.05
+        doc = self.build(server)
+        max_workers = 3
+
+        jsonref.replace_refs(
+            doc,
+            loader=JsonLoader(),
+            prefetch=True,
+            max_workers=max_workers,
+        )
+
+        assert server.max_in_flight <= max_workers
+
+    def test_default(self, server):
+        doc = self.build(server, n=1)
+
+        jsonref.replace_refs(doc, loader=JsonLoader())
+        assert server.requests == []
+
+        jsonref.replace_refs(doc, loader=JsonLoader(), proxies=False)
+        assert sorted(server.requests) == ["/common.json", "/defs0.json"]
+
+    def test_failures_raise_on_access(self, server):
+        doc = {"a": {"$ref": server.url("/missing.json")}}
+
+        result = jsonref.replace_refs(doc, loader=JsonLoader(), prefetch=True)
+
+        with pytest.raises(JsonRefError):
+            result["a"]["b"]
+
+
+class TestFlattenRefs:
+    document = {
+        "components": {
+            "schemas": {
+                "Item": {"type": "object", "properties": {"id": {"type": "integer"}}},
+            },
+        },
+        "paths": [
+            {"$ref": "#/components/schemas/Item"},
+            {"schema": {"$ref": "#/components/schemas/Item/properties/id"}},
+            {"$ref": "defs.json#/Name"},
+        ],
+    }
+
+    def loader(self, uri):
+        assert uri == "defs.json"
+        return {"Name": {"type": "string"}}
+
+    def test_same_as_replace_refs(self):
+        result = jsonref.flatten_refs(self.document, loader=self.loader)
+
+        assert json.dumps(result) == json.dumps(
+            jsonref.replace_refs(self.document, loader=self.loader, proxies=False),
+        )
+        assert type(result["paths"][0]) is dict
+
+    def test_shares_targets(self):
+        document = {"a": {"b": 1}, "refs": [{"$ref": "#/a"}, {"$ref": "#/a"}]}
+
+        result = jsonref.flatten_refs(document)
+
+        assert result["refs"][0] is result["refs"][1] is result["a"]
+
+    def test_cycles(self):
+        document = {"node": {"children": [{"$ref": "#/node"}]}}
+
+        result = jsonref.flatten_refs(document)
+
+        assert result["node"]["children"][0] is result["node"]
+
+    def test_circular_refs(self):
+        with pytest.raises(JsonRefError) as error:
+            jsonref.flatten_refs({"a": {"$ref": "#/b"}, "b": {"$ref": "#/a"}})
+        assert error.value.path == ("a",)
+
+    def test_merge_props(self):
+        document = {"a": {"b": 1}, "c": {"$ref": "#/a", "d": 2}}
+
+        result = jsonref.flatten_refs(document, merge_props=True)
+
+        assert result["c"] == {"b": 1, "d": 2}
+        assert result["a"] == {"b": 1}
+
+    def test_memory_report(self):
+        result = jsonref.flatten_refs({"a": {"b": [1]}, "c": {"$ref": "#/a"}})
+        # the root, {"b": [1]} and [1], "c" is the same dict as "a"
+        containers = 3
+
+        report = jsonref.memory_report(result)
+
+        assert report["containers"] == containers
+        assert report["shared"] == 1
+        assert report["bytes"] > 0
+
+
+class TestRereferenceDump:
+    def test_roundtrip(self):
+        document = {
+            "paths": {"/a": {"schema": {"$ref": "#/components/schemas/A"}}},
+            "components": {
+                "schemas": {
+                    "A": {"properties": {"b": {"$ref": "#/components/schemas/B"}}},
+                    "B": {"type": "string"},
+                },
+            },
+        }
+
+        result = jsonref.dumps(jsonref.flatten_refs(document), rereference=True)
+
+        assert json.loads(result) == document
+
+    def test_cycles(self):
+        result = jsonref.flatten_refs(
+            {"node": {"children": [{"$ref": "#/node"}], "root": {"$ref": "#"}}},
+        )
+
+        assert json.loads(jsonref.dumps(result, rereference=True)) == {
+            "node": {"$ref": "#/$defs/node"},
+            "$defs": {
+                "node": {"children": [{"$ref": "#/$defs/node"}], "root": {"$ref": "#"}},
+            },
+        }
+
+    def test_generated_names(self):
+        shared, other = {"x": 1}, {"y": 2}
+        document = {"a": {"item": shared}, "b": {"item": other}, "c": [shared, other]}
+
+        result = json.loads(
+            jsonref.dumps(document, rereference=True, defs="/definitions"),
+        )
+
+        assert result["definitions"] == {"item": {"x": 1}, "item2": {"y": 2}}
+        assert result["c"] == [
+            {"$ref": "#/definitions/item"},
+            {"$ref": "#/definitions/item2"},
+        ]
+
+    def test_proxies(self):
+        document = jsonref.replace_refs({"a": {"b": 1}, "c": [{"$ref": "#/a"}]})
+
+        assert json.loads(jsonref.dumps(document, rereference=True)) == {
+            "a": {"b": 1},
+            "c": [{"$ref": "#/a"}],
+        }
+
+    def test_non_dict_root(self):
+        shared = {"x": 1}
+        with pytest.raises(ValueError, match="dict at the root"):
+            jsonref.dumps([shared, shared], rereference=True)
+        assert jsonref.dumps([1, "a"], rereference=True) == json.dumps([1, "a"])
+
+    def test_no_sharing(self):
+        document = {"a": [{"b": 1}, {"b": 1}], "c": None}
+
+        assert jsonref.dumps(document, rereference=True) == json.dumps(document)
+
+    def test_dump(self):
+        shared = {"x": 1}
+        fp = io.StringIO()
+
+        jsonref.dump({"a": shared, "b": shared}, fp, rereference=True)
+
+        assert json.loads(fp.getvalue()) == {
+            "a": {"$ref": "#/$defs/a"},
+            "b": {"$ref": "#/$defs/a"},
+            "$defs": {"a": {"x": 1}},
+        }
@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core.utils.middleware import QueryBudgetExceededError
+from core.utils.middleware import QueryBudgetMiddleware
+from core.utils.middleware import normalize_sql
+
+
+def run_queries(count: int):
+    def view(request):
+        with connection.cursor() as cursor:
+            for i in range(count):
+                cursor.execute("SELECT %s", [i])
+        return HttpResponse()
+
+    return view
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21") == (
+        normalize_sql("SELECT *  FROM t WHERE id IN (%s, %s) LIMIT 5")
+    )
+
+
+@pytest.mark.django_db
+class TestQueryBudgetMiddleware:
+    def test_debug_headers(self, settings):
+        settings.DEBUG = True
+        settings.QUERY_BUDGET = {"MAX_QUERIES": 10, "N_PLUS_ONE_THRESHOLD": 3}
+        response = QueryBudgetMiddleware(run_queries(4))(RequestFactory().get("/"))
+
+        assert response["X-Query-Count"] == "4"
+        assert "X-Query-Duration-Ms" in response
+        assert response["X-Query-N-Plus-One"].endswith("x4")
+
+    def test_budget_exceeded_raises(self, settings):
+        settings.QUERY_BUDGET = {"MAX_QUERIES": 2, "RAISE": True}
+
+        with pytest.raises(QueryBudgetExceededError):
+            QueryBudgetMiddleware(run_queries(3))(RequestFactory().get("/"))
+
+    def test_budget_exceeded_warns(self, settings, caplog):
+        settings.QUERY_BUDGET = {"MAX_QUERIES": 2, "RAISE": False}
+        QueryBudgetMiddleware(run_queries(3))(RequestFactory().get("/"))
+
+        assert "query budget exceeded" in caplog.text
+
+    def test_metrics_are_logged(self, settings, caplog):
+        settings.DEBUG = False
+        caplog.set_level(logging.INFO, logger="metrics")
+        queries = 3
+        QueryBudgetMiddleware(run_queries(queries))(RequestFactory().get("/"))
+
+        record = next(
+            record
+            for record in caplog.records
+            if getattr(record, "metric", None) == "http.request.queries"
+        )
+        assert record.value == queries
+        assert record.tags == {"view": "/"}
+        assert "http.request.queries=3 view=/" in caplog.text
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import Group
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.utils.pagination import EstimatedCountPagination
+from core.utils.pagination import EstimatedCountPaginator
+
+ROWS = 30
+
+
+@pytest.fixture
+def groups():
+    Group.objects.bulk_create(Group(name=f"group {i:02}") for i in range(ROWS))
+    return Group.objects.order_by("name")
+
+
+@pytest.fixture
+def estimating():
+    with patch.object(EstimatedCountPaginator, "can_estimate", return_value=True):
+        yield
+
+
+class TestEstimatedCountPaginator:
+    def test_falls_back_to_exact_count(self):
+        paginator = EstimatedCountPaginator(list(range(ROWS)), per_page=10)
+
+        assert paginator.count == ROWS
+        assert not paginator.count_is_estimated
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("estimating")
+    def test_exact_count_below_threshold(self, groups, django_assert_num_queries):
+        paginator = EstimatedCountPaginator(groups, per_page=10, threshold=100)
+
+        with (
+            patch.object(EstimatedCountPaginator, "estimate_count") as estimate_count,
+            django_assert_num_queries(1),
+        ):
+            assert paginator.count == ROWS
+        estimate_count.assert_not_called()
+        assert not paginator.count_is_estimated
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("estimating")
+    def test_estimate_above_threshold(self, groups):
+        paginator = EstimatedCountPaginator(groups, per_page=10, threshold=5)
+        estimate = 20
+
+        with patch.object(
+            EstimatedCountPaginator,
+            "estimate_count",
+            return_value=estimate,
+        ):
+            assert paginator.count == estimate
+        assert paginator.count_is_estimated
+
+        # pages past the estimate are still served
+        page = paginator.page(3)
+        assert [group.name for group in page] == [
+            f"group {i:02}" for i in range(20, ROWS)
+        ]
+        assert not page.has_next()
+        assert paginator.page(2).has_next()
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("estimating")
+    def test_estimate_below_counted_rows(self, groups):
+        threshold = 10
+        paginator = EstimatedCountPaginator(groups, per_page=10, threshold=threshold)
+
+        with patch.object(EstimatedCountPaginator, "estimate_count", return_value=2):
+            assert paginator.count == threshold
+        assert paginator.count_is_estimated
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("estimating")
+    def test_estimate_unavailable(self, groups):
+        paginator = EstimatedCountPaginator(groups, per_page=10, threshold=5)
+
+        with patch.object(EstimatedCountPaginator, "estimate_count", return_value=None):
+            assert paginator.count == ROWS
+        assert not paginator.count_is_estimated
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("estimating")
+def test_paginated_response_marks_estimate(groups, settings):
+    settings.PAGINATION_ESTIMATE_THRESHOLD = 5
+    request = Request(APIRequestFactory().get("/fake-url/"))
+    pagination = EstimatedCountPagination()
+    pagination.page_size = 10
+    estimate = 20_000
+
+    with patch.object(
+        EstimatedCountPaginator,
+        "estimate_count",
+        return_value=estimate,
+    ):
+        page = pagination.paginate_queryset(groups, request)
+        response = pagination.get_paginated_response(page)
+
+    assert response.data["count"] == estimate
+    assert response.data["count_is_estimated"] is True
+    assert response.data["results"] == list(groups[:10])
+
+
+def test_default_page_size():
+    request = Request(APIRequestFactory().get("/fake-url/"))
+
+    page = EstimatedCountPagination().paginate_queryset(list(range(ROWS)), request)
+
+    assert page == list(range(25))
@@ -0,0 +1,412 @@
+import json
+from typing import Literal
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import FieldError
+from django.db import connection
+from django.db import models
+from django.db.models import Func
+from django.db.models import TextField
+from django.test.utils import isolate_apps
+from pydantic import ValidationError as PydanticValidationError
+
+from core.utils.interface import BaseTypeModel
+from core.utils.pydantic_schemas import InfoSchema
+from core.utils.pydantic_schemas import OpenAPISpecSchema
+from core.utils.utils import LazyPydanticValue
+from core.utils.utils import PydanticModelField
+from core.utils.utils import PydanticModelSerializerField
+from core.utils.utils import json_path_index
+from core.utils.utils import only_raw_json
+from core.utils.utils import unwrap_legacy_json
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="runs jsonb SQL",
+)
+
+
+class WordPlay(BaseTypeModel):
+    type: Literal["WORD_PLAY"] = "WORD_PLAY"
+    word: str = ""
+
+
+class Riddle(BaseTypeModel):
+    type: Literal["RIDDLE"] = "RIDDLE"
+    answer: str = ""
+
+
+def stored(field: PydanticModelField, value) -> str:
+    """the text postgres hands back for a saved value"""
+    return field.get_db_prep_value(value, connection)
+
+
+def get_field(model, field_name: str):
+    return model._meta.get_field(field_name)  # noqa: SLF001
+
+
+def json_types(model, field_name: str) -> list[str]:
+    return list(
+        model.objects.values_list(
+            Func(field_name, function="jsonb_typeof", output_field=TextField()),
+            flat=True,
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    ("pydantic_model", "value"),
+    [
+        (InfoSchema, InfoSchema(title="t")),
+        ([InfoSchema], [InfoSchema(title="a"), InfoSchema(title="b")]),
+        ({"WORD_PLAY": WordPlay, "RIDDLE": Riddle}, Riddle(answer="42")),
+    ],
+)
+@pytest.mark.parametrize("store_objects", [False, True])
+def test_round_trip(pydantic_model, value, store_objects):
+    field = PydanticModelField(
+        pydantic_model=pydantic_model,
+        store_objects=store_objects,
+    )
+    raw = stored(field, value)
+
+    assert field.from_db_value(raw, None, None) == value
+
+
+def test_storage_format():
+    value = InfoSchema(title="t")
+    legacy = stored(PydanticModelField(pydantic_model=InfoSchema), value)
+    objects = stored(
+        PydanticModelField(pydantic_model=InfoSchema, store_objects=True),
+        value,
+    )
+
+    # a jsonb string holding the document until store_objects is turned on
+    assert json.loads(legacy) == objects
+    assert json.loads(objects)["title"] == "t"
+
+
+@postgres_only
+def test_unwrap_legacy_json(document_model):
+    document = document_model.objects.create(info=InfoSchema(title="t"), infos=[])
+    assert json_types(document_model, "info") == ["string"]
+
+    assert unwrap_legacy_json(document_model, "info", chunk_size=1) == 1
+
+    assert json_types(document_model, "info") == ["object"]
+    document.refresh_from_db()
+    assert document.info == InfoSchema(title="t")
+    assert unwrap_legacy_json(document_model, "info") == 0
+
+
+def test_store_objects_is_deconstructed():
+    field = PydanticModelField(pydantic_model=InfoSchema, store_objects=True)
+
+    assert field.deconstruct()[3]["store_objects"] is True
+
+
+def test_invalid_data_returns_none():
+    field = PydanticModelField(pydantic_model=[InfoSchema])
+
+    assert field.to_python('[{"title": 1}]') is None
+
+
+class TestLazyPydanticModelField:
+    def test_validates_on_first_access(self):
+        field = PydanticModelField(pydantic_model=InfoSchema, lazy=True)
+        value = field.from_db_value(stored(field, InfoSchema(title="t")), None, None)
+
+        assert isinstance(value, LazyPydanticValue)
+        assert not value.is_loaded
+        assert value.title == "t"
+        assert value.is_loaded
+        assert value == InfoSchema(title="t")
+
+    def test_unloaded_value_is_written_back_untouched(self):
+        field = PydanticModelField(pydantic_model=InfoSchema, lazy=True)
+        raw = stored(field, InfoSchema(title="t"))
+        value = field.from_db_value(raw, None, None)
+
+        assert stored(field, value) == raw
+        assert not value.is_loaded
+
+    @pytest.mark.parametrize(
+        ("pydantic_model", "value"),
+        [
+            (InfoSchema, InfoSchema(title="t")),
+            ([InfoSchema], [InfoSchema(title="a"), InfoSchema(title="b")]),
+        ],
+    )
+    def test_clean_round_trip(self, pydantic_model, value):
+        # what Model.full_clean(), ModelForm and the admin run on every field
+        field = PydanticModelField(pydantic_model=pydantic_model, lazy=True)
+        raw = stored(field, value)
+
+        cleaned = field.clean(field.from_db_value(raw, None, None), None)
+
+        assert stored(field, cleaned) == raw
+        assert cleaned == value
+
+        loaded = field.from_db_value(raw, None, None)
+        loaded.get_value()
+        assert field.clean(loaded, None) == value
+
+    def test_list_model(self):
+        field = PydanticModelField(pydantic_model=[InfoSchema], lazy=True)
+        raw = json.dumps([{"title": "a"}, {"title": "b"}])
+        value = field.from_db_value(raw, None, None)
+
+        assert [info.title for info in value] == ["a", "b"]
+
+    def test_unhashable(self):
+        field = PydanticModelField(pydantic_model=InfoSchema, lazy=True)
+        value = field.from_db_value(stored(field, InfoSchema(title="t")), None, None)
+
+        with pytest.raises(TypeError):
+            hash(value)
+
+
+def test_only_raw_json(document_model):
+    info = InfoSchema(title="a")
+    document_model.objects.create(info=info, infos=[info])
+
+    document = only_raw_json(document_model.objects.all(), "info", "infos").get()
+
+    # the legacy jsonb string row comes back as the document it holds
+    assert document.info_json == info.model_dump(mode="json", by_alias=True)
+    assert document.infos_json == [document.info_json]
+    assert {"info", "infos"} <= document.get_deferred_fields()
+
+
+class TestJsonPathLookups:
+    def test_attribute_path_uses_aliases(self):
+        field = PydanticModelField(pydantic_model=OpenAPISpecSchema)
+
+        path = field.json_path("paths", "/users", "get", "parameters", 0, "in_")
+
+        assert path == ["paths", "/users", "get", "parameters", "0", "in"]
+
+    def test_unknown_attribute(self):
+        field = PydanticModelField(pydantic_model=OpenAPISpecSchema)
+
+        with pytest.raises(FieldError):
+            field.json_path("info", "nope")
+
+    def test_dict_model_path_is_under_data(self):
+        field = PydanticModelField(
+            pydantic_model={"WORD_PLAY": WordPlay, "RIDDLE": Riddle},
+        )
+
+        assert field.json_path("type") == ["type"]
+        assert field.json_path("answer") == ["data", "answer"]
+
+    def test_scalar_exact_compiles_to_containment(self):
+        field = PydanticModelField(pydantic_model=[InfoSchema], store_objects=True)
+        field.name = "infos"
+
+        ((lookup, value),) = field.q(title="a").children
+
+        assert lookup == "infos__contains"
+        assert value.value == [{"title": "a"}]
+
+    def test_other_lookups_use_key_transforms(self):
+        field = PydanticModelField(pydantic_model=OpenAPISpecSchema, store_objects=True)
+        field.name = "spec"
+
+        q = field.q(paths__has_key="/users", info__version__startswith="1")
+
+        assert q.children == [
+            ("spec__paths__has_key", "/users"),
+            ("spec__info__version__startswith", "1"),
+        ]
+
+    def test_lookups_need_object_storage(self, document_model):
+        with pytest.raises(FieldError):
+            get_field(document_model, "info").q(title="a")
+        with pytest.raises(FieldError):
+            document_model.objects.filter(info__title="a")
+        with pytest.raises(FieldError):
+            document_model.objects.filter(info__contains={"title": "a"})
+
+    def test_index_on_legacy_field_fails_the_check(self):
+        with isolate_apps("core.utils"):
+
+            class Indexed(models.Model):  # noqa: DJ008
+                info = PydanticModelField(pydantic_model=InfoSchema)
+                infos = PydanticModelField(
+                    pydantic_model=[InfoSchema],
+                    store_objects=True,
+                )
+
+                class Meta:
+                    app_label = "utils"
+                    indexes = [
+                        json_path_index("info", "title", name="info_title_idx"),
+                        json_path_index("info", name="info_gin", gin=True),
+                        json_path_index("infos", name="infos_gin", gin=True),
+                    ]
+
+        errors = [
+            *get_field(Indexed, "info").check(),
+            *get_field(Indexed, "infos").check(),
+        ]
+
+        assert [error.id for error in errors] == ["utils.E001", "utils.E001"]
+
+
+@postgres_only
+class TestJsonPathLookupsSQL:
+    def test_lookups_match_rows(self, document_model):
+        field = get_field(document_model, "infos")
+        a = document_model.objects.create(infos=[InfoSchema(title="a", version="1")])
+        document_model.objects.create(infos=[InfoSchema(title="b", version="2")])
+
+        assert list(document_model.objects.filter(field.q(title="a"))) == [a]
+        assert list(
+            document_model.objects.filter(field.q(**{"0__version__startswith": "1"})),
+        ) == [a]
+        assert list(document_model.objects.filter(infos__0__title="a")) == [a]
+
+    def test_unwrapped_rows_match(self, document_model):
+        field = get_field(document_model, "info")
+        document = document_model.objects.create(info=InfoSchema(title="a"), infos=[])
+        unwrap_legacy_json(document_model, "info")
+
+        with patch.object(field, "store_objects", new=True):
+            assert list(document_model.objects.filter(field.q(title="a"))) == [document]
+            assert list(document_model.objects.filter(info__title="a")) == [document]
+
+
+class TestJsonPathUpdates:
+    def test_set_path_sends_only_the_fragment(self):
+        field = PydanticModelField(pydantic_model=OpenAPISpecSchema, store_objects=True)
+        field.name = "spec"
+
+        expression = field.set_path(("info", "title"), "Pets")
+        _, path, value, create_missing = expression.get_source_expressions()
+
+        assert expression.function == "jsonb_set"
+        assert path.value == ["info", "title"]
+        assert value.value == "Pets"
+        assert create_missing.value is True
+
+    def test_value_is_validated_against_the_path_type(self):
+        field = PydanticModelField(pydantic_model=[InfoSchema], store_objects=True)
+        field.name = "infos"
+
+        expression = field.insert_path((0,), {"title": "a"})
+
+        assert expression.get_source_expressions()[2].value["title"] == "a"
+        with pytest.raises(PydanticValidationError):
+            field.insert_path((0,), {"title": 1})
+
+    def test_paths_need_object_storage(self):
+        field = PydanticModelField(pydantic_model=InfoSchema)
+        field.name = "info"
+
+        for build in (
+            lambda: field.set_path(("title",), "a"),
+            lambda: field.insert_path(("title",), "a"),
+            lambda: field.path("title"),
+        ):
+            with pytest.raises(FieldError):
+                build()
+
+
+@postgres_only
+class TestJsonPathUpdatesSQL:
+    def test_set_and_insert_path(self, document_model):
+        field = get_field(document_model, "infos")
+        document = document_model.objects.create(infos=[InfoSchema(title="a")])
+        queryset = document_model.objects.filter(pk=document.pk)
+
+        queryset.update(infos=field.set_path((0, "title"), "b"))
+        queryset.update(infos=field.insert_path((0,), InfoSchema(title="c")))
+
+        document.refresh_from_db()
+        assert [info.title for info in document.infos] == ["c", "b"]
+
+    def test_read_path(self, document_model):
+        field = get_field(document_model, "infos")
+        document_model.objects.create(infos=[InfoSchema(title="a")])
+        document_model.objects.create(infos=[])
+
+        assert field.read_path(document_model.objects.order_by("pk"), 0) == [
+            InfoSchema(title="a"),
+            None,
+        ]
+
+
+class TestPydanticModelSerializerField:
+    @pytest.mark.parametrize(
+        ("pydantic_model", "value"),
+        [
+            (InfoSchema, InfoSchema(title="t")),
+            ([InfoSchema], [InfoSchema(title="a"), InfoSchema(title="b")]),
+            ({"WORD_PLAY": WordPlay, "RIDDLE": Riddle}, Riddle(answer="42")),
+        ],
+    )
+    def test_representation_matches_stored_json(self, pydantic_model, value):
+        field = PydanticModelSerializerField(pydantic_model=pydantic_model)
+        model_field = PydanticModelField(
+            pydantic_model=pydantic_model,
+            store_objects=True,
+        )
+
+        assert field.to_representation(value) == json.loads(stored(model_field, value))
+
+    def test_unloaded_lazy_value_is_not_validated(self):
+        model_field = PydanticModelField(pydantic_model=[InfoSchema], lazy=True)
+        value = model_field.from_db_value('[{"title": "a"}]', None, None)
+
+        representation = PydanticModelSerializerField(
+            pydantic_model=[InfoSchema],
+        ).to_representation(value)
+
+        assert representation == [{"title": "a"}]
+        assert not value.is_loaded
+
+
+class TestTypedPayloads:
+    field = PydanticModelField(
+        pydantic_model={"WORD_PLAY": WordPlay, "RIDDLE": Riddle},
+        store_objects=True,
+    )
+
+    def test_validate_many_mixed_types(self):
+        payloads = [
+            stored(self.field, Riddle(answer="42")),
+            stored(self.field, WordPlay(word="w")),
+        ]
+
+        assert self.field.validate_many(payloads) == [
+            Riddle(answer="42"),
+            WordPlay(word="w"),
+        ]
+
+    def test_validate_many_legacy_rows(self):
+        field = PydanticModelField(pydantic_model=self.field.pydantic_model)
+        payloads = [
+            stored(field, Riddle(answer="42")),
+            stored(field, WordPlay(word="w")),
+        ]
+
+        assert payloads[0].startswith('"')
+        assert field.validate_many(payloads) == [
+            Riddle(answer="42"),
+            WordPlay(word="w"),
+        ]
+        assert field.validate_many(
+            [*payloads, {"type": "RIDDLE", "data": {"answer": "1"}}],
+        )[2] == Riddle(answer="1")
+
+    def test_unknown_type(self):
+        assert self.field.to_python('{"type": "QUIZ", "data": {}}') is None
+
+    def test_serializer_field_picks_the_model_from_type(self):
+        field = PydanticModelSerializerField(pydantic_model=self.field.pydantic_model)
+
+        assert field.to_internal_value({"type": "RIDDLE", "answer": "42"}) == Riddle(
+            answer="42",
+        )
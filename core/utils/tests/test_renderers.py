@@ -0,0 +1,120 @@
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.utils.interface import BaseModel
+from core.utils.pydantic_schemas import InfoSchema
+from core.utils.renderers import FastJSONFieldEncoder
+from core.utils.renderers import FastJSONParser
+from core.utils.renderers import FastJSONRenderer
+from core.utils.schema_versions import VersionedModel
+from core.utils.schema_versions import register_upgrade
+from core.utils.utils import PydanticModelField
+
+
+class Operation(VersionedModel, BaseModel):
+    __schema_version__ = 2
+
+    summary: str = ""
+
+
+@register_upgrade(Operation, from_version=1)
+def _rename_title(data: dict) -> dict:
+    data["summary"] = data.pop("title", "")
+    return data
+
+
+class TestFastJSONRenderer:
+    def test_native_types(self):
+        data = {
+            "at": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.UTC),
+            "id": uuid.UUID(int=1),
+            "info": InfoSchema(title="t"),
+        }
+
+        rendered = json.loads(FastJSONRenderer().render(data))
+
+        assert rendered == {
+            "at": "2024-01-02T03:04:05Z",
+            "id": "00000000-0000-0000-0000-000000000001",
+            "info": InfoSchema(title="t").model_dump(mode="json", by_alias=True),
+        }
+
+    def test_matches_drf(self):
+        data = {
+            "at": datetime.datetime(2024, 1, 2, 3, 4, 5, 6),  # noqa: DTZ001
+            "on": datetime.date(2024, 1, 2),
+            "took": datetime.timedelta(minutes=1, seconds=30),
+            "price": Decimal("1.50"),
+            "blob": b"abc",
+            "tags": {"a"},
+            "big": 2**70,
+            "text": "\u00e9",
+        }
+
+        assert json.loads(FastJSONRenderer().render(data)) == json.loads(
+            JSONRenderer().render(data),
+        )
+
+    def test_line_separators_are_escaped(self):
+        data = {"text": "a\u2028b\u2029c"}
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_big_integers_with_models(self, caplog):
+        data = {"big": 2**70, "info": InfoSchema(title="t")}
+
+        rendered = json.loads(FastJSONRenderer().render(data))
+
+        assert rendered["big"] == 2**70
+        assert rendered["info"]["title"] == "t"
+        assert "64 bits" in caplog.text
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            FastJSONRenderer().render({"a": object()})
+
+    def test_unloaded_lazy_value(self):
+        field = PydanticModelField(pydantic_model=[InfoSchema], lazy=True)
+        value = field.from_db_value('[{"title": "a"}]', None, None)
+
+        rendered = json.loads(FastJSONRenderer().render({"infos": value}))
+
+        assert rendered == {"infos": [{"title": "a"}]}
+        assert not value.is_loaded
+
+    def test_lazy_value_with_schema_upgrades(self):
+        field = PydanticModelField(pydantic_model=[Operation], lazy=True)
+        value = field.from_db_value('[{"title": "a"}]', None, None)
+
+        rendered = json.loads(FastJSONRenderer().render({"operations": value}))
+
+        assert rendered["operations"][0]["summary"] == "a"
+
+    def test_indent(self):
+        rendered = FastJSONRenderer().render({"a": 1}, "application/json; indent=4")
+
+        assert rendered == b'{\n  "a": 1\n}'
+
+
+class TestFastJSONParser:
+    def test_parse(self):
+        assert FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5]}')) == {"a": [1, 2.5]}
+
+    def test_parse_error(self):
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": '))
+
+
+def test_field_encoder():
+    value = {"id": uuid.UUID(int=1), "info": InfoSchema(title="t")}
+
+    encoded = json.dumps(value, cls=FastJSONFieldEncoder)
+
+    assert json.loads(encoded)["info"]["title"] == "t"
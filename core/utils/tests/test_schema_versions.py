@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from pydantic import ConfigDict
+
+from core.utils.interface import BaseModel
+from core.utils.schema_versions import SchemaUpgradeError
+from core.utils.schema_versions import VersionedModel
+from core.utils.schema_versions import register_upgrade
+from core.utils.schema_versions import upgrade_payload
+from core.utils.utils import PydanticModelField
+
+
+class Operation(VersionedModel, BaseModel):
+    __schema_version__ = 3
+
+    summary: str = ""
+    deprecated: bool = False
+
+
+@register_upgrade(Operation, from_version=1)
+def _rename_title(data: dict) -> dict:
+    data["summary"] = data.pop("title", "")
+    return data
+
+
+@register_upgrade(Operation, from_version=2)
+def _deprecated_flag(data: dict) -> dict:
+    data["deprecated"] = data.pop("status", "") == "deprecated"
+    return data
+
+
+class Unreachable(VersionedModel, BaseModel):
+    __schema_version__ = 2
+
+
+class FrozenOperation(VersionedModel, BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    summary: str = ""
+
+
+def test_version_is_only_in_stored_payloads():
+    field = PydanticModelField(pydantic_model=Operation)
+
+    assert (
+        json.loads(field.get_prep_value(Operation()))["schema_version"]
+        == Operation.__schema_version__
+    )
+    assert "schema_version" not in Operation().model_dump()
+    assert "schema_version" not in field.to_json_python(Operation())
+    assert "schema_version" not in Operation.model_json_schema()["properties"]
+    schema = Operation.model_json_schema(mode="serialization")
+    assert "schema_version" not in schema["properties"]
+
+
+def test_frozen_models():
+    field = PydanticModelField(pydantic_model=FrozenOperation)
+    stored = field.get_prep_value(FrozenOperation(summary="s"))
+
+    assert json.loads(stored)["schema_version"] == 1
+    assert field.from_db_value(stored, None, None) == FrozenOperation(summary="s")
+
+
+def test_upgrade_chain():
+    assert upgrade_payload(Operation, {"title": "t", "status": "deprecated"}) == {
+        "summary": "t",
+        "deprecated": True,
+        "schema_version": 3,
+    }
+
+
+def test_missing_upgrade():
+    with pytest.raises(SchemaUpgradeError):
+        upgrade_payload(Unreachable, {})
+
+
+class TestPydanticModelField:
+    def test_old_rows_are_upgraded_on_read(self):
+        field = PydanticModelField(pydantic_model=[Operation])
+
+        value = field.from_db_value(
+            json.dumps([{"title": "a"}, {"summary": "b", "schema_version": 3}]),
+            None,
+            None,
+        )
+
+        assert value == [Operation(summary="a"), Operation(summary="b")]
+
+    def test_new_input_is_the_current_version(self):
+        field = PydanticModelField(pydantic_model=Operation)
+
+        assert field.clean({"summary": "new text"}, None).summary == "new text"
+        assert field.to_python('{"summary": "new text"}').summary == "new text"
+
+    def test_upgrade_stored_reports_upgrades(self):
+        field = PydanticModelField(pydantic_model=Operation)
+
+        assert field.upgrade_stored('{"title": "a", "schema_version": 2}')[1]
+        assert not field.upgrade_stored('{"summary": "a", "schema_version": 3}')[1]
+
+    def test_nested_models_are_stamped(self):
+        field = PydanticModelField(pydantic_model=[Operation], store_objects=True)
+
+        stored = json.loads(field.get_prep_value([Operation()]))
+
+        assert stored[0]["schema_version"] == Operation.__schema_version__
@@ -0,0 +1,245 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import Group
+from rest_framework import serializers
+from rest_framework.mixins import ListModelMixin
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.permissions import AllowAny
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import GenericViewSet
+from rest_framework.viewsets import ModelViewSet
+
+from core.utils.pagination import EstimatedCountPagination
+from core.utils.view_utils import BulkModelViewSetMixin
+from core.utils.view_utils import ConditionalGetMixin
+from core.utils.view_utils import ModelViewSetExcludeActionMixin
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ["id", "name"]
+
+
+class GroupViewSet(
+    ConditionalGetMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+    GenericViewSet,
+):
+    queryset = Group.objects.order_by("name")
+    serializer_class = GroupSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    # Group has no updated_at, the primary key is enough to exercise the mixin
+    conditional_field = "id"
+
+
+class PaginatedGroupViewSet(GroupViewSet):
+    pagination_class = EstimatedCountPagination
+
+
+class BulkGroupViewSet(BulkModelViewSetMixin, ModelViewSet):
+    queryset = Group.objects.order_by("name")
+    serializer_class = GroupSerializer
+    permission_classes = [AllowAny]
+
+
+@pytest.mark.django_db
+class TestConditionalGetMixin:
+    def test_list_not_modified(self):
+        view = GroupViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+        Group.objects.create(name="a")
+
+        response = view(factory.get("/"))
+        etag = response["ETag"]
+        assert response.status_code == HTTPStatus.OK
+
+        with patch.object(GroupSerializer, "to_representation") as to_representation:
+            response = view(factory.get("/", HTTP_IF_NONE_MATCH=etag))
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        to_representation.assert_not_called()
+
+        Group.objects.create(name="b")
+        response = view(factory.get("/", HTTP_IF_NONE_MATCH=etag))
+        assert response.status_code == HTTPStatus.OK
+        assert response["ETag"] != etag
+
+    def test_paginated_list_reuses_the_page(self, django_assert_num_queries):
+        view = PaginatedGroupViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+        Group.objects.bulk_create([Group(name="a"), Group(name="b")])
+
+        etag = view(factory.get("/"))["ETag"]
+        # the paginator's COUNT(*) and the page, no extra aggregate
+        with django_assert_num_queries(2):
+            response = view(factory.get("/", HTTP_IF_NONE_MATCH=etag))
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        Group.objects.filter(name="b").delete()
+        assert (
+            view(factory.get("/", HTTP_IF_NONE_MATCH=etag)).status_code == HTTPStatus.OK
+        )
+
+    def test_retrieve_not_modified(self):
+        view = GroupViewSet.as_view({"get": "retrieve"})
+        factory = APIRequestFactory()
+        group = Group.objects.create(name="a")
+
+        etag = view(factory.get("/"), pk=group.pk)["ETag"]
+        response = view(factory.get("/", HTTP_IF_NONE_MATCH=etag), pk=group.pk)
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.django_db
+class TestBulkActions:
+    def test_bulk_create(self):
+        view = BulkGroupViewSet.as_view({"post": "bulk_create"})
+        body = [{"name": "a"}, {"name": "b"}]
+
+        response = view(APIRequestFactory().post("/", body, format="json"))
+
+        assert response.status_code == HTTPStatus.CREATED
+        assert [item["status"] for item in response.data] == ["created", "created"]
+        assert Group.objects.count() == len(body)
+
+    def test_bulk_update_reports_errors_per_item(self):
+        group = Group.objects.create(name="a")
+        view = BulkGroupViewSet.as_view({"patch": "bulk_update"})
+        request = APIRequestFactory().patch(
+            "/",
+            [{"id": group.pk, "name": "b"}, {"id": 0, "name": "c"}],
+            format="json",
+        )
+
+        response = view(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.data[0] == {}
+        assert "id" in response.data[1]
+        group.refresh_from_db()
+        assert group.name == "a"
+
+        request = APIRequestFactory().patch(
+            "/",
+            [{"id": group.pk, "name": "b"}],
+            format="json",
+        )
+        assert view(request).status_code == HTTPStatus.OK
+        group.refresh_from_db()
+        assert group.name == "b"
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            [{"id": "abc", "name": "b"}],
+            [{"id": {"a": 1}, "name": "b"}],
+            {"id": 1},
+        ],
+    )
+    def test_bulk_update_rejects_malformed_keys(self, body):
+        view = BulkGroupViewSet.as_view({"patch": "bulk_update"})
+
+        response = view(APIRequestFactory().patch("/", body, format="json"))
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_bulk_update_checks_the_size_first(self, django_assert_num_queries):
+        class SmallBatchViewSet(BulkGroupViewSet):
+            bulk_max_items = 1
+
+        view = SmallBatchViewSet.as_view({"patch": "bulk_update"})
+        body = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+        with django_assert_num_queries(0):
+            response = view(APIRequestFactory().patch("/", body, format="json"))
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_bulk_destroy(self):
+        group = Group.objects.create(name="a")
+        view = BulkGroupViewSet.as_view({"delete": "bulk_destroy"})
+        request = APIRequestFactory().delete("/", [group.pk, 0], format="json")
+
+        response = view(request)
+
+        assert [item["status"] for item in response.data] == ["deleted", "not_found"]
+        assert not Group.objects.exists()
+
+    def test_bulk_destroy_rejects_malformed_keys(self):
+        view = BulkGroupViewSet.as_view({"delete": "bulk_destroy"})
+        request = APIRequestFactory().delete("/", ["abc"], format="json")
+
+        assert view(request).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_bulk_actions_respect_allow_actions(self):
+        class ListOnlyViewSet(BulkGroupViewSet):
+            allow_actions = ["list"]
+
+        view = ListOnlyViewSet.as_view({"post": "bulk_create"})
+        request = APIRequestFactory().post("/", [{"name": "a"}], format="json")
+
+        assert view(request).status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+    def test_bulk_rejects_duplicate_keys(self):
+        group = Group.objects.create(name="a")
+        factory = APIRequestFactory()
+
+        view = BulkGroupViewSet.as_view({"patch": "bulk_update"})
+        request = factory.patch(
+            "/",
+            [{"id": group.pk, "name": "b"}, {"id": group.pk, "name": "c"}],
+            format="json",
+        )
+        response = view(request)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert "id" in response.data
+
+        view = BulkGroupViewSet.as_view({"delete": "bulk_destroy"})
+        request = factory.delete("/", [group.pk, group.pk], format="json")
+        assert view(request).status_code == HTTPStatus.BAD_REQUEST
+        assert Group.objects.filter(name="a").exists()
+
+    def test_bulk_writes_go_through_hooks(self):
+        calls = []
+
+        class Serializer(GroupSerializer):
+            def create(self, validated_data):
+                calls.append("create")
+                return super().create(validated_data)
+
+        class HookViewSet(BulkGroupViewSet):
+            serializer_class = Serializer
+
+            def perform_create(self, serializer):
+                calls.append("perform_create")
+                super().perform_create(serializer)
+
+            def perform_destroy(self, instance):
+                calls.append("destroy")
+                super().perform_destroy(instance)
+
+        factory = APIRequestFactory()
+        view = HookViewSet.as_view({"post": "bulk_create"})
+        request = factory.post("/", [{"name": "a"}, {"name": "b"}], format="json")
+        assert view(request).status_code == HTTPStatus.CREATED
+        assert calls == ["perform_create", "create", "create"]
+
+        view = HookViewSet.as_view({"delete": "bulk_destroy"})
+        keys = list(Group.objects.values_list("pk", flat=True))
+        view(factory.delete("/", keys, format="json"))
+        assert calls[3:] == ["destroy", "destroy"]
+        assert not Group.objects.exists()
+
+
+def test_bulk_actions_are_opt_in():
+    class PlainGroupViewSet(ModelViewSetExcludeActionMixin, ModelViewSet):
+        queryset = Group.objects.all()
+        serializer_class = GroupSerializer
+
+    actions = PlainGroupViewSet.get_extra_actions()
+    assert not any(action.url_path == "bulk" for action in actions)
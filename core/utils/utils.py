@@ -1,30 +1,58 @@
+import functools
 import json
 import logging
-from os import getenv
 import re
 import secrets
 import urllib.parse
 from collections import OrderedDict
 from collections.abc import Callable
 from operator import itemgetter
-from typing import Any, Literal
+from os import getenv
+from typing import Annotated
+from typing import Any
+from typing import Literal
+from typing import Union
+from typing import get_args
+from typing import get_origin
 from unittest.mock import MagicMock
 from uuid import uuid4
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import OpClass
+from django.core import checks
+from django.core.exceptions import FieldError
 from django.db import models
-from django.db.models import Q, QuerySet, Subquery
-from django.http import HttpRequest, QueryDict
+from django.db import transaction
+from django.db.models import Func
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models.fields.json import KeyTransform
+from django.db.models.fields.json import KeyTransformFactory
+from django.db.models.functions import Cast
+from django.http import HttpRequest
+from django.http import QueryDict
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from pydantic import BaseModel
+from pydantic import Discriminator
+from pydantic import Tag
+from pydantic import TypeAdapter
 from pydantic import ValidationError as PydanticValidationError
-from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.serializers import JSONField, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.filters import SearchFilter
+from rest_framework.serializers import JSONField
+from rest_framework.serializers import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
+from typing_extensions import TypedDict
 
+from core.utils.cache import bump_model_version
 from core.utils.custom_exceptions import CustomError
 from core.utils.interface import BaseTypeModel
 
@@ -781,8 +809,69 @@ def duration_to_timedelta(value):
         return None
 
 
+# pydantic validation context keys set when PydanticModelField reads a row
+STORED_PAYLOAD_CONTEXT = "stored_payload"
+UPGRADED_MODELS_CONTEXT = "upgraded_models"
+
+_EMPTY_JSON = ("", "{}", "[]", "null", b"", b"{}", b"[]", b"null")
+
+
+@functools.cache
+def get_type_adapter(type_) -> TypeAdapter:
+    """one TypeAdapter per type, building them is expensive"""
+    return TypeAdapter(type_)
+
+
+def _type_tag(value) -> str | None:
+    if isinstance(value, dict):
+        return value.get("type")
+    return getattr(value, "type", None)
+
+
+@functools.cache
+def get_tagged_union(mapping: tuple[tuple[str, type], ...]) -> tuple[Any, Any]:
+    """Discriminated unions for the dict[type, BaseTypeModel] variant of
+    :class:`PydanticModelField`, tagged by ``type``
+
+    Args:
+        mapping (tuple[tuple[str, type], ...]): ``pydantic_model.items()``
+
+    Returns:
+        tuple[Any, Any]: union of the models, union of the stored
+        ``{"type": ..., "data": ...}`` envelopes
+    """
+    models_ = [Annotated[model, Tag(key)] for key, model in mapping]
+    envelopes = [
+        Annotated[
+            TypedDict(
+                f"{model.__name__}Payload",
+                {"type": Literal[key], "data": model},
+            ),
+            Tag(key),
+        ]
+        for key, model in mapping
+    ]
+    return (
+        Annotated[Union[tuple(models_)], Discriminator(_type_tag)],  # noqa: UP007
+        Annotated[Union[tuple(envelopes)], Discriminator(_type_tag)],  # noqa: UP007
+    )
+
+
+class PassthroughJSONEncoder(json.JSONEncoder):
+    """Encoder for values that are already JSON text"""
+
+    def encode(self, o):
+        if isinstance(o, str):
+            return o
+        return super().encode(o)
+
+
 class PydanticModelFieldEncoder(json.JSONEncoder):
     def default(self, obj):
+        if isinstance(obj, LazyPydanticValue):
+            if not obj.is_loaded:
+                return load_raw_json(obj.raw)
+            return obj.get_value()
         if isinstance(obj, BaseModel):
             return obj.model_dump(mode="json")
         elif isinstance(obj, list) and isinstance(obj[0], BaseModel):
@@ -792,11 +881,396 @@ class PydanticModelFieldEncoder(json.JSONEncoder):
             return super().default(obj)
 
 
+def load_raw_json(raw: str | bytes | dict | list):
+    if not isinstance(raw, (str, bytes)):
+        return raw
+    value = json.loads(raw)
+    if isinstance(value, str):
+        # rows written before values were stored as JSON objects
+        value = json.loads(value)
+    return value
+
+
+class LazyPydanticValue:
+    """Raw JSON loaded by a lazy :class:`PydanticModelField`.
+
+    Validation into the pydantic model(s) only happens on the first attribute,
+    item or iteration access; until then saving the row writes the original
+    JSON back untouched.
+    """
+
+    __slots__ = ("_field", "_loaded", "_raw", "_value")
+
+    def __init__(self, raw: str | bytes | dict | list, field: "PydanticModelField"):
+        self._raw = raw
+        self._field = field
+        self._value = None
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def raw(self) -> str | bytes | dict | list:
+        return self._raw
+
+    def get_raw_json(self) -> str | bytes | dict | list | None:
+        """the stored JSON when it can be sent as is: not validated yet and
+        no schema upgrade could change it, otherwise None"""
+        if self._loaded or self._field.has_upgrades:
+            return None
+        return self._raw
+
+    def get_value(self):
+        """validate the raw JSON (once) and return the model(s)"""
+        if not self._loaded:
+            self._value = self._field.from_stored(self._raw)
+            self._loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            # protocol probes (copy, pickle, serializers) must not load the value
+            raise AttributeError(name)
+        return getattr(self.get_value(), name)
+
+    def __getitem__(self, key):
+        return self.get_value()[key]
+
+    def __iter__(self):
+        return iter(self.get_value())
+
+    def __len__(self):
+        return len(self.get_value())
+
+    def __bool__(self):
+        return bool(self.get_value())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyPydanticValue):
+            other = other.get_value()
+        return self.get_value() == other
+
+    # compared by value like the (mutable) models it wraps, so unhashable
+    __hash__ = None
+
+    def __repr__(self):
+        if self._loaded:
+            return repr(self._value)
+        return f"<LazyPydanticValue: {self._field.pydantic_model}>"
+
+
+class RawJSONField(models.JSONField):
+    """JSONField reading rows stored in the legacy jsonb string format as the
+    JSON document they hold"""
+
+    def from_db_value(self, value, expression, connection):
+        value = super().from_db_value(value, expression, connection)
+        if isinstance(value, str):
+            # rows written before values were stored as JSON objects
+            value = json.loads(value)
+        return value
+
+
+class RawJSON(Cast):
+    """Select a JSON column as plain JSON so no pydantic validation runs,
+    legacy jsonb string rows come back as the dict/list they hold too"""
+
+    def __init__(self, expression):
+        super().__init__(expression, output_field=RawJSONField())
+
+
+def only_raw_json(queryset: QuerySet, *field_names: str) -> QuerySet:
+    """``.only()`` style helper for list views: defer ``field_names`` and
+    annotate their unvalidated JSON as ``<field_name>_json``
+
+    Args:
+        queryset (QuerySet): queryset of a model with PydanticModelField(s)
+        *field_names (str): PydanticModelField names
+
+    Returns:
+        QuerySet:
+    """
+    return queryset.defer(*field_names).annotate(
+        **{f"{name}_json": RawJSON(name) for name in field_names},
+    )
+
+
+JSON_LOOKUPS = {
+    "exact",
+    "iexact",
+    "contains",
+    "contained_by",
+    "icontains",
+    "has_key",
+    "has_keys",
+    "has_any_keys",
+    "in",
+    "gt",
+    "gte",
+    "lt",
+    "lte",
+    "isnull",
+    "startswith",
+    "istartswith",
+    "endswith",
+    "iendswith",
+    "regex",
+    "iregex",
+}
+
+
+# lookups on the jsonb structure, they never match a row stored as a jsonb string
+STRUCTURE_LOOKUPS = {"contains", "contained_by", "has_key", "has_keys", "has_any_keys"}
+
+
+def _flatten_annotation(annotation) -> list:
+    """unwrap Optional/Union/Annotated into the concrete member types"""
+    origin = get_origin(annotation)
+    if origin is Union or (origin is not None and origin.__name__ == "UnionType"):
+        return [t for arg in get_args(annotation) for t in _flatten_annotation(arg)]
+    if origin is not None and getattr(origin, "__name__", "") == "Annotated":
+        return _flatten_annotation(get_args(annotation)[0])
+    return [annotation]
+
+
+def annotations_have_upgrades(annotations: list) -> bool:
+    """Whether payloads of ``annotations`` can hold a versioned model, which
+    validation upgrades and strips of its stored ``schema_version``, see
+    core.utils.schema_versions"""
+    seen = set()
+    stack = list(annotations)
+    while stack:
+        for member in _flatten_annotation(stack.pop()):
+            if isinstance(member, type) and issubclass(member, BaseModel):
+                if member in seen:
+                    continue
+                seen.add(member)
+                if hasattr(member, "__schema_version__"):
+                    return True
+                stack.extend(field.annotation for field in member.model_fields.values())
+            else:
+                stack.extend(get_args(member))
+    return False
+
+
+def _find_model_field(model_class: type[BaseModel], attr: str):
+    for name, field_info in model_class.model_fields.items():
+        key = field_info.serialization_alias or field_info.alias or name
+        if attr in (name, key):
+            return key, field_info.annotation
+    return None, None
+
+
+def walk_json_path(annotations: list, attrs: list[str | int]) -> tuple[list[str], list]:
+    """Translate pydantic attribute names into the JSON keys they are stored
+    under (aliases included), checking every step against the model(s).
+
+    Args:
+        annotations (list): types the path starts from
+        attrs (list[str | int]): attribute names, dict keys or list indexes
+
+    Raises:
+        FieldError: an attribute is not a field of any of the candidate models
+
+    Returns:
+        tuple[list[str], list]: JSON keys, possible types of the value at the end
+        of the path
+    """
+    keys = []
+    candidates = annotations
+    for attr in attrs:
+        key, free, next_candidates, models_seen = None, False, [], []
+        for annotation in candidates:
+            for member in _flatten_annotation(annotation):
+                origin = get_origin(member)
+                args = get_args(member)
+                if isinstance(member, type) and issubclass(member, BaseModel):
+                    models_seen.append(member.__name__)
+                    found_key, found_annotation = _find_model_field(member, str(attr))
+                    if found_key is not None:
+                        key = found_key
+                        next_candidates.append(found_annotation)
+                elif origin in (dict, list, tuple) or member in (dict, list, tuple):
+                    free = True
+                    next_candidates.append(args[-1] if args else Any)
+                elif member is Any:
+                    free = True
+                    next_candidates.append(Any)
+        if key is None and not free:
+            seen = " | ".join(models_seen) or "value"
+            msg = f"{attr} is not a field of {seen}"
+            raise FieldError(msg)
+        keys.append(str(key if key is not None else attr))
+        candidates = next_candidates
+    return keys, candidates
+
+
+def resolve_json_path(annotations: list, attrs: list[str | int]) -> list[str]:
+    return walk_json_path(annotations, attrs)[0]
+
+
+def _json_value(value):
+    if isinstance(value, BaseModel):
+        adapter = get_type_adapter(type(value))
+        return adapter.dump_python(value, mode="json", by_alias=True)
+    if isinstance(value, (list, tuple)):
+        return [_json_value(x) for x in value]
+    return value
+
+
+def _flatten(expression):
+    """``expression`` and the expressions nested in it, F() has no flatten()"""
+    return expression.flatten() if hasattr(expression, "flatten") else [expression]
+
+
+class PydanticKeyTransform(KeyTransform):
+    """``->`` on a PydanticModelField, what it selects is a plain JSON fragment
+    so lookups and ``values()`` on it skip the pydantic model"""
+
+    @cached_property
+    def output_field(self):
+        return models.JSONField()
+
+
+class JSONBSet(Func):
+    function = "jsonb_set"
+    arity = 4
+
+
+class JSONBInsert(Func):
+    function = "jsonb_insert"
+    arity = 4
+
+
+class JSONBUnwrapString(Func):
+    """the document held by a jsonb string, ``(col #>> '{}')::jsonb``"""
+
+    template = "(%(expressions)s #>> '{}')::jsonb"
+    arity = 1
+
+
+def unwrap_legacy_json(
+    model: type[models.Model],
+    field_name: str,
+    chunk_size: int = 1000,
+) -> int:
+    """Rewrite rows holding the document as a jsonb string, what
+    PydanticModelField writes without ``store_objects``, into the document
+    itself. Run it from the migration turning ``store_objects`` on:
+
+        def unwrap(apps, schema_editor):
+            unwrap_legacy_json(apps.get_model("posts", "Post"), "data")
+
+        operations = [
+            migrations.AlterField(
+                "post", "data", PydanticModelField(..., store_objects=True)
+            ),
+            migrations.RunPython(unwrap, migrations.RunPython.noop),
+        ]
+
+    Args:
+        model (type[models.Model]): model holding the PydanticModelField
+        field_name (str): name of the PydanticModelField
+        chunk_size (int, optional): rows rewritten per UPDATE. Defaults to 1000.
+
+    Returns:
+        int: number of rows rewritten
+    """
+    manager = model._default_manager  # noqa: SLF001
+    label = model._meta.label  # noqa: SLF001
+    legacy = manager.annotate(
+        _json_type=Func(
+            field_name,
+            function="jsonb_typeof",
+            output_field=models.TextField(),
+        ),
+    ).filter(_json_type="string")
+    total = 0
+    while pks := list(legacy.values_list("pk", flat=True)[:chunk_size]):
+        with transaction.atomic(using=manager.db):
+            total += manager.filter(pk__in=pks).update(
+                **{field_name: JSONBUnwrapString(field_name)},
+            )
+        logging.info("%s.%s: unwrapped %s rows", label, field_name, total)
+    if total:
+        bump_model_version(model)
+    return total
+
+
+def _path_type_adapter(annotations: list) -> TypeAdapter:
+    annotations = [a for a in annotations if a is not Any]
+    if not annotations:
+        return get_type_adapter(Any)
+    if len(annotations) == 1:
+        return get_type_adapter(annotations[0])
+    return get_type_adapter(Union[tuple(annotations)])  # noqa: UP007
+
+
+def _dump_path_value(annotations: list, value: Any):
+    """``value`` as stored under a sub-path, versioned models stamped"""
+    adapter = _path_type_adapter(annotations)
+    return adapter.dump_python(
+        adapter.validate_python(value),
+        mode="json",
+        by_alias=True,
+        context={STORED_PAYLOAD_CONTEXT: True},
+    )
+
+
+def json_path_index(
+    field_name: str,
+    *attrs: str,
+    name: str,
+    pydantic_model=None,
+    gin: bool = False,
+    opclass: str | None = None,
+) -> models.Index:
+    """Index a PydanticModelField, or a path inside it, for ``Meta.indexes``.
+    The field needs ``store_objects``, rows stored as jsonb strings are never
+    matched through these indexes (checked by ``manage.py check``).
+
+    json_path_index("spec", name="spec_gin", gin=True, opclass="jsonb_path_ops") \n
+    json_path_index(
+        "spec", "info", "title", name="spec_title_idx", pydantic_model=OpenAPISpecSchema
+    )
+
+    Args:
+        field_name (str): name of the PydanticModelField
+        *attrs (str): pydantic attribute path, empty for the whole document
+        name (str): index name
+        pydantic_model (optional): model used to check ``attrs`` and map aliases
+        gin (bool, optional): GIN instead of btree, for ``@>`` and ``?``.
+            Defaults to False.
+        opclass (str | None, optional): e.g. "jsonb_path_ops" for smaller
+            @>-only GIN indexes.
+
+    Returns:
+        models.Index: btree expression index matching ``<field>__<path>`` lookups
+        or a GIN index matching ``PydanticModelField.q`` containment lookups
+    """
+    keys = list(attrs)
+    if pydantic_model is not None:
+        keys = resolve_json_path([pydantic_model], keys)
+
+    expression = models.F(field_name)
+    for key in keys:
+        expression = KeyTransform(key, expression)
+    if not gin:
+        return models.Index(expression, name=name)
+    if opclass:
+        expression = OpClass(expression, name=opclass)
+    return GinIndex(expression, name=name)
+
+
 class PydanticModelField(models.JSONField):
     """Usage
 
     data = PydanticModelField(pydantic_model=OpenAPISpecSchema) \n
-    data = PydanticModelField(pydantic_model=[OpenAPISpecSchema])
+    data = PydanticModelField(pydantic_model=[OpenAPISpecSchema]) \n
+    data = PydanticModelField(pydantic_model=OpenAPISpecSchema, lazy=True) \n
+    data = PydanticModelField(pydantic_model=OpenAPISpecSchema, store_objects=True)
     """
 
     def __init__(
@@ -805,12 +1279,19 @@ class PydanticModelField(models.JSONField):
         null=True,
         blank=True,
         *args,
+        lazy: bool = False,
+        store_objects: bool = False,
         **kwargs,
     ):
         """Pydantic Model field
 
         Args:
             pydantic_model (BaseModel | Tuple[BaseModel] | dict[str,BaseModel], optional): _description_. Defaults to None. # noqa
+            lazy (bool, optional): load rows as :class:`LazyPydanticValue` and
+                only validate them on first access. Defaults to False.
+            store_objects (bool, optional): write values as jsonb objects/arrays
+                instead of a jsonb string holding the JSON text. Turn it on
+                together with :func:`unwrap_legacy_json`. Defaults to False.
 
         Raises:
             ValueError: _description_
@@ -836,6 +1317,8 @@ class PydanticModelField(models.JSONField):
                         )
             elif not issubclass(pydantic_model, (BaseModel, BaseTypeModel)):
                 raise ValueError("pydantic_model must be a subclass of BaseModel")
+        self.lazy = lazy
+        self.store_objects = store_objects
         self.pydantic_model: (
             BaseModel
             | BaseTypeModel
@@ -847,32 +1330,128 @@ class PydanticModelField(models.JSONField):
         kwargs["encoder"] = kwargs.get("encoder", PydanticModelFieldEncoder)
         super().__init__(null=null, blank=blank, *args, **kwargs)
 
+    @property
+    def type_adapter(self) -> TypeAdapter:
+        """cached adapter, a discriminated union on ``type`` for the dict variant"""
+        if isinstance(self.pydantic_model, (list, tuple)):
+            return get_type_adapter(list[self.pydantic_model[0]])
+        if isinstance(self.pydantic_model, dict):
+            union, _ = get_tagged_union(tuple(self.pydantic_model.items()))
+            return get_type_adapter(union)
+        return get_type_adapter(self.pydantic_model)
+
+    @cached_property
+    def has_upgrades(self) -> bool:
+        """stored payloads may change when validated, see
+        :func:`annotations_have_upgrades`"""
+        if isinstance(self.pydantic_model, dict):
+            return annotations_have_upgrades(list(self.pydantic_model.values()))
+        if isinstance(self.pydantic_model, (list, tuple)):
+            return annotations_have_upgrades(list(self.pydantic_model))
+        return annotations_have_upgrades([self.pydantic_model])
+
+    @property
+    def payload_adapter(self) -> TypeAdapter:
+        """cached adapter for a list of stored payloads, see :meth:`validate_many`"""
+        if isinstance(self.pydantic_model, dict):
+            payload = get_tagged_union(tuple(self.pydantic_model.items()))[1]
+        elif isinstance(self.pydantic_model, (list, tuple)):
+            payload = list[self.pydantic_model[0]]
+        else:
+            payload = self.pydantic_model
+        return get_type_adapter(list[payload])
+
+    def validate_many(self, values: list[str | dict | list]) -> list:
+        """Validate many stored payloads, with mixed types for the dict variant,
+        in a single validator call
+
+        Raises:
+            PydanticValidationError: any payload is invalid
+
+        Returns:
+            list: value of each payload
+        """
+        # rows written before values were stored as JSON objects hold the
+        # document as a JSON string
+        values = [
+            json.loads(value) if isinstance(value, str) and value[:1] == '"' else value
+            for value in values
+        ]
+        context = {STORED_PAYLOAD_CONTEXT: True}
+        if values and all(isinstance(value, str) for value in values):
+            result = self.payload_adapter.validate_json(
+                f"[{','.join(values)}]",
+                context=context,
+            )
+        else:
+            result = self.payload_adapter.validate_python(
+                [load_raw_json(value) for value in values],
+                context=context,
+            )
+        if isinstance(self.pydantic_model, dict):
+            return [payload["data"] for payload in result]
+        return result
+
+    def _validate(self, value: str | bytes | dict | list, context: dict | None = None):
+        # STORED_PAYLOAD_CONTEXT lets versioned models upgrade old payloads, only
+        # set for rows read from the database, see core.utils.schema_versions
+        if isinstance(self.pydantic_model, dict):
+            _, payload = get_tagged_union(tuple(self.pydantic_model.items()))
+            adapter = get_type_adapter(payload)
+            if isinstance(value, (str, bytes)):
+                return adapter.validate_json(value, context=context)["data"]
+            return adapter.validate_python(value, context=context)["data"]
+        if isinstance(value, (str, bytes)):
+            return self.type_adapter.validate_json(value, context=context)
+        return self.type_adapter.validate_python(value, context=context)
+
+    def upgrade_stored(self, value: str | bytes | dict | list) -> tuple[Any, bool]:
+        """Validate a stored payload, running registered schema upgrades
+
+        Raises:
+            PydanticValidationError: the payload is invalid even after upgrading
+
+        Returns:
+            tuple[Any, bool]: the value and whether any part of it was upgraded
+        """
+        if isinstance(value, (str, bytes)) and value[:1] in (b'"', '"'):
+            value = json.loads(value)
+        upgraded = []
+        context = {STORED_PAYLOAD_CONTEXT: True, UPGRADED_MODELS_CONTEXT: upgraded}
+        return self._validate(value, context), bool(upgraded)
+
     def to_python(self, value):
-        if isinstance(value, str):
+        """value from forms, admin and API input, validated as the current
+        schema version"""
+        return self._load(value)
+
+    def from_stored(self, value):
+        """value read from the database, older schema versions are upgraded"""
+        return self._load(value, {STORED_PAYLOAD_CONTEXT: True})
+
+    def _load(self, value, context: dict | None = None):
+        if isinstance(value, LazyPydanticValue):
+            # full_clean()/forms pass back what from_db_value returned, keep it
+            # lazy so an untouched row is still written back as stored
+            return value
+        if isinstance(value, (str, bytes)):
             try:
-                value = json.loads(value)
+                if value[:1] in (b'"', '"'):
+                    # rows written before values were stored as JSON objects
+                    # hold the document as a JSON string
+                    value = json.loads(value)
+                if not self.pydantic_model or value.strip() in _EMPTY_JSON:
+                    value = json.loads(value)
             except (TypeError, ValueError):
                 pass
 
         if value and self.pydantic_model:
+            if isinstance(value, (BaseModel, BaseTypeModel)) or (
+                isinstance(value, list) and value and isinstance(value[0], BaseModel)
+            ):
+                return value
             try:
-                if isinstance(self.pydantic_model, (list, tuple)):
-                    data = []
-                    ModelClass = self.pydantic_model[0]
-                    value: list[dict]
-                    for x in value:
-                        data.append(ModelClass(**x))
-                    return data
-                elif isinstance(self.pydantic_model, dict):
-                    value: dict
-                    ModelClass = self.pydantic_model.get(value.get("type"))
-                    return ModelClass(**value.get("data"))
-                elif issubclass(self.pydantic_model, (BaseModel, BaseTypeModel)):
-                    if isinstance(value, str):
-                        return self.pydantic_model(**json.loads(value))
-                    return self.pydantic_model(value)
-                else:
-                    raise ValueError("Invalid data")
+                return self._validate(value, context)
             except Exception as e:
                 log("invalid data ", "\n", e)
                 return
@@ -880,27 +1459,305 @@ class PydanticModelField(models.JSONField):
 
         return value
 
+    def walk_path(self, *attrs: str | int) -> tuple[list[str], list]:
+        """JSON keys a pydantic attribute path is stored under and the type(s)
+        found there, keys are prefixed with "data" for the dict[type, model]
+        variant
+        """
+        if isinstance(self.pydantic_model, dict):
+            if list(attrs[:1]) == ["type"]:
+                keys, annotations = walk_json_path([Any], attrs[1:])
+                return ["type", *keys], annotations
+            models_ = list(self.pydantic_model.values())
+            keys, annotations = walk_json_path(models_, attrs)
+            return ["data", *keys], annotations
+        if isinstance(self.pydantic_model, (list, tuple)):
+            return walk_json_path([list[self.pydantic_model[0]]], attrs)
+        return walk_json_path([self.pydantic_model or Any], attrs)
+
+    def json_path(self, *attrs: str | int) -> list[str]:
+        return self.walk_path(*attrs)[0]
+
+    def path(self, *attrs: str | int) -> KeyTransform:
+        """Expression selecting a sub-path (``spec -> 'paths' -> '/users'``),
+        use it in ``values_list``/``annotate`` to read a fragment without
+        loading the whole document
+
+        Raises:
+            FieldError: ``store_objects`` is off
+
+        Returns:
+            KeyTransform: the fragment as plain JSON
+        """
+        self.check_object_storage("paths")
+        keys = self.json_path(*attrs)
+        if not keys:
+            msg = "path() needs at least one attribute"
+            raise ValueError(msg)
+        expression = PydanticKeyTransform(keys[0], self.name)
+        for key in keys[1:]:
+            expression = KeyTransform(key, expression)
+        return expression
+
+    def read_path(self, queryset: QuerySet, *attrs: str | int) -> list:
+        """Fetch and validate one sub-path from every row of ``queryset``
+
+        field = Spec._meta.get_field("spec")
+        field.read_path(Spec.objects.filter(pk=1), "paths", "/users")
+
+        Returns:
+            list: fragments validated against the type at the path, None where
+            missing
+        """
+        _, annotations = self.walk_path(*attrs)
+        adapter = _path_type_adapter(annotations)
+        return [
+            None if value is None else adapter.validate_python(value)
+            for value in queryset.values_list(self.path(*attrs), flat=True)
+        ]
+
+    def _writable_path(self, attrs: tuple | list) -> tuple[list[str], list]:
+        # jsonb_set/jsonb_insert fail with "cannot set path in scalar" on rows
+        # stored as jsonb strings
+        self.check_object_storage("path updates")
+        keys, annotations = self.walk_path(*attrs)
+        if not keys:
+            msg = "use save() to replace the whole document"
+            raise ValueError(msg)
+        return keys, annotations
+
+    def set_path(
+        self,
+        attrs: tuple | list,
+        value: Any,
+        *,
+        create_missing: bool = True,
+    ) -> "JSONBSet":
+        """``jsonb_set`` expression replacing the value at a pydantic attribute
+        path, only the changed fragment is sent to the database
+
+        operation_path = field.set_path(("paths", "/users", "get"), operation)
+        Spec.objects.filter(pk=1).update(spec=operation_path)
+
+        ``QuerySet.update`` sends no signals, call ``bump_model_version`` when
+        the model is response cached. Only the last key is created when
+        missing, like ``jsonb_set`` itself. Needs ``store_objects``.
+
+        Args:
+            attrs (tuple | list): pydantic attribute path
+            value (Any): new value, validated against the type at the path
+            create_missing (bool, optional): add the last key if absent.
+                Defaults to True.
+
+        Returns:
+            JSONBSet:
+        """
+        keys, annotations = self._writable_path(attrs)
+        return JSONBSet(
+            models.F(self.name),
+            Value(keys, ArrayField(models.TextField())),
+            Value(_dump_path_value(annotations, value), models.JSONField()),
+            Value(create_missing),
+            output_field=self,
+        )
+
+    def insert_path(
+        self,
+        attrs: tuple | list,
+        value: Any,
+        *,
+        insert_after: bool = False,
+    ) -> "JSONBInsert":
+        """``jsonb_insert`` expression, inserts into an array before (or after)
+        the index at the end of ``attrs`` or adds a key that must not exist
+        yet. Needs ``store_objects``.
+
+        Args:
+            attrs (tuple | list): pydantic attribute path, ending in an index for
+                arrays
+            value (Any): value to insert, validated against the type at the path
+            insert_after (bool, optional): insert after the index. Defaults to False.
+
+        Returns:
+            JSONBInsert:
+        """
+        keys, annotations = self._writable_path(attrs)
+        return JSONBInsert(
+            models.F(self.name),
+            Value(keys, ArrayField(models.TextField())),
+            Value(_dump_path_value(annotations, value), models.JSONField()),
+            Value(insert_after),
+            output_field=self,
+        )
+
+    def lookup(self, attrs: tuple | list, value: Any, lookup: str = "exact") -> Q:
+        """Build a Q for a pydantic attribute path.
+
+        Scalar ``exact`` lookups compile to ``@>`` containment (served by a GIN
+        index on the column), for the list variant matching any item;
+        ``has_key`` compiles to ``?`` and everything else to ``->`` key
+        transforms.
+
+        Args:
+            attrs (tuple | list): pydantic attribute path
+            value (Any): value to compare with, pydantic models are dumped
+            lookup (str, optional): django lookup name. Defaults to "exact".
+
+        Returns:
+            Q:
+        """
+        self.check_object_storage("lookups")
+        value = _json_value(value)
+        is_list = isinstance(self.pydantic_model, (list, tuple))
+        if is_list and attrs and not str(attrs[0]).isdigit() and lookup == "exact":
+            keys = resolve_json_path([self.pydantic_model[0]], attrs)
+        else:
+            keys = self.json_path(*attrs)
+
+        if lookup == "exact" and keys and not isinstance(value, (dict, list)):
+            contained = value
+            for key in reversed(keys):
+                contained = {key: contained}
+            if is_list and not str(attrs[0]).isdigit():
+                contained = [contained]
+            return Q(
+                **{f"{self.name}__contains": Value(contained, models.JSONField())},
+            )
+        return Q(**{"__".join([self.name, *keys, lookup]): value})
+
+    def check_object_storage(self, what: str):
+        """``->``, ``@>`` and ``?`` only see rows stored as jsonb objects
+
+        Raises:
+            FieldError: ``store_objects`` is off, rows may be jsonb strings
+        """
+        if not self.store_objects:
+            msg = (
+                f"{what} on {self.name} need store_objects=True, rows stored as "
+                "jsonb strings never match (see unwrap_legacy_json)"
+            )
+            raise FieldError(msg)
+
+    def get_transform(self, name):
+        transform = super().get_transform(name)
+        if isinstance(transform, KeyTransformFactory):
+            self.check_object_storage(f"key transforms ({name})")
+            return functools.partial(PydanticKeyTransform, name)
+        return transform
+
+    def get_lookup(self, lookup_name):
+        if lookup_name in STRUCTURE_LOOKUPS:
+            self.check_object_storage(f"{lookup_name} lookups")
+        return super().get_lookup(lookup_name)
+
+    def check(self, **kwargs):
+        return [*super().check(**kwargs), *self._check_json_indexes()]
+
+    def _check_json_indexes(self):
+        if self.store_objects:
+            return []
+        opts = self.model._meta  # noqa: SLF001
+        return [
+            checks.Error(
+                f"{index.name} indexes a path inside {self.name}, rows stored as "
+                "jsonb strings never use it.",
+                hint="Set store_objects=True and run unwrap_legacy_json.",
+                obj=self,
+                id="utils.E001",
+            )
+            for index in opts.indexes
+            if any(
+                isinstance(node, models.F) and node.name == self.name
+                for expression in index.expressions
+                for node in _flatten(expression)
+            )
+        ]
+
+    def q(self, **lookups) -> Q:
+        """Django style keyword lookups on pydantic attributes
+
+        Spec._meta.get_field("spec").q(info__title="Pets", paths__has_key="/users")
+
+        Returns:
+            Q: all lookups ANDed together
+        """
+        result = Q()
+        for key, value in lookups.items():
+            attrs = key.split("__")
+            lookup = "exact"
+            if len(attrs) > 1 and attrs[-1] in JSON_LOOKUPS:
+                lookup = attrs.pop()
+            result &= self.lookup(attrs, value, lookup)
+        return result
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.lazy:
+            kwargs["lazy"] = True
+        if self.store_objects:
+            kwargs["store_objects"] = True
+        return name, path, args, kwargs
+
     def from_db_value(self, value, expression, connection):
-        return self.to_python(value)
+        if self.lazy and value is not None and self.pydantic_model:
+            return LazyPydanticValue(value, self)
+        return self.from_stored(value)
 
     def get_prep_value(self, value: BaseModel | BaseTypeModel | list[BaseModel] | None):
+        if isinstance(value, LazyPydanticValue):
+            if not value.is_loaded:
+                # never validated so never changed, write the stored JSON back
+                return value.raw
+            value = value.get_value()
+        # stamps versioned models with their schema version
+        return self._dump(value, as_json=True, context={STORED_PAYLOAD_CONTEXT: True})
+
+    def to_json_python(self, value: BaseModel | BaseTypeModel | list[BaseModel] | None):
+        """Dump ``value`` straight to JSON compatible dicts/lists, what API
+        responses need, without going through a JSON string. An unloaded lazy
+        value is decoded as stored and never validated, unless its models
+        have schema upgrades.
+        """
+        if isinstance(value, LazyPydanticValue):
+            raw = value.get_raw_json()
+            if raw is not None:
+                return load_raw_json(raw)
+            value = value.get_value()
+        return self._dump(value, as_json=False)
+
+    def _dump(  # noqa: C901, PLR0911, PLR0912
+        self,
+        value,
+        *,
+        as_json: bool,
+        context: dict | None = None,
+    ):
         if value is None:
             return [] if isinstance(self.pydantic_model, (list, tuple)) else {}
-        data = {}
 
         if not self.pydantic_model:
             return
 
+        def dump(adapter: TypeAdapter, value):
+            if as_json:
+                return adapter.dump_json(value, by_alias=True, context=context).decode()
+            return adapter.dump_python(
+                value,
+                mode="json",
+                by_alias=True,
+                context=context,
+            )
+
         if isinstance(self.pydantic_model, (list, tuple)):
             if not isinstance(value, (list, tuple)):
                 raise ValueError("Value must be a list or tuple")
-            data = []
             ModelClass = self.pydantic_model[0]
             for model_instance in value:
                 model_instance: BaseModel | BaseTypeModel
                 if not isinstance(model_instance, ModelClass):
-                    raise ValueError("Value must be a list %s" % str(ModelClass))
-                data.append(model_instance.model_dump(mode="json", by_alias=True))
+                    msg = f"Value must be a list {ModelClass}"
+                    raise ValueError(msg)  # noqa: TRY004
+            return dump(self.type_adapter, list(value))
         elif isinstance(self.pydantic_model, dict):
             if not isinstance(value, BaseTypeModel):
                 raise ValueError("Value must be an instance of BaseTypeModel")
@@ -916,10 +1773,11 @@ class PydanticModelField(models.JSONField):
 
             if not isinstance(value, ModelClass):
                 raise ValueError("Value must be a list %s" % str(ModelClass))
-            data = {
-                "type": model_type,
-                "data": value.model_dump(mode="json", by_alias=True),
-            }
+            data = dump(get_type_adapter(ModelClass), value)
+            if not as_json:
+                return {"type": model_type, "data": data}
+            type_json = json.dumps(model_type)
+            return f'{{"type":{type_json},"data":{data}}}'
         elif issubclass(self.pydantic_model, (BaseModel, BaseTypeModel)):
             if not isinstance(value, BaseModel):
                 if not value:
@@ -927,10 +1785,26 @@ class PydanticModelField(models.JSONField):
                 raise ValueError(
                     f"Value must be an instance of BaseModel: {value.__class__.__name__}"
                 )
-            return value.model_dump_json(by_alias=True)
+            return dump(self.type_adapter, value)
         else:
             raise ValueError("Invalid data")
-        return json.dumps(data)
+
+    def get_db_prep_value(self, value, connection, prepared=False):  # noqa: FBT002
+        if not prepared:
+            if isinstance(value, LazyPydanticValue) and not value.is_loaded:
+                # written back exactly as stored, whichever format that is
+                return connection.ops.adapt_json_value(
+                    value.raw,
+                    PassthroughJSONEncoder,
+                )
+            value = self.get_prep_value(value)
+        if isinstance(value, str):
+            if not self.store_objects:
+                # rows hold a jsonb string until unwrap_legacy_json rewrote them
+                value = json.dumps(value)
+            # already JSON, hand it to the driver without encoding it again
+            return connection.ops.adapt_json_value(value, PassthroughJSONEncoder)
+        return super().get_db_prep_value(value, connection, prepared=True)
 
     def value_to_string(self, obj):
         value = self.value_from_object(obj)
@@ -987,10 +1861,9 @@ class PydanticModelSerializerField(JSONField):
                         deserialized_data.append(ModelClass(**item))
                     return deserialized_data
                 elif isinstance(self.pydantic_model, dict):
-                    ModelClass = self.pydantic_model.get(data.get("type"))
-                    if not ModelClass:
+                    if data.get("type") not in self.pydantic_model:
                         raise ValidationError(f"Invalid type; {data.get('type')}")
-                    return ModelClass(**data)
+                    return self.model_field.type_adapter.validate_python(data)
                 elif issubclass(self.pydantic_model, (BaseModel, BaseTypeModel)):
                     return self.pydantic_model(**data)
                 else:
@@ -999,11 +1872,12 @@ class PydanticModelSerializerField(JSONField):
         except PydanticValidationError as e:
             raise ValidationError(e.json())
 
-    def to_representation(self, value) -> str:
-        data = PydanticModelField(self.pydantic_model).get_prep_value(value)
-        if isinstance(data, str):
-            data = json.loads(data)
-        return data
+    @cached_property
+    def model_field(self) -> PydanticModelField:
+        return PydanticModelField(self.pydantic_model)
+
+    def to_representation(self, value):
+        return self.model_field.to_json_python(value)
 
     def _format_validation_error(self, error):
         if isinstance(error, PydanticValidationError):
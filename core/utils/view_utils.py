@@ -1,4 +1,118 @@
+import hashlib
+from collections import Counter
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ValidationError
+
+from core.utils.cache import bump_model_version
+from core.utils.cache import get_model_versions
+from core.utils.cache import get_or_compute
+from core.utils.cache import make_response_cache_key
+from core.utils.cache import track_model_versions
+
+
+def _overrides(obj, name: str, base: type) -> bool:
+    return getattr(type(obj), name) is not getattr(base, name)
+
+
+class BulkListSerializer(ListSerializer):
+    """ListSerializer validating every item in one pass and writing them with
+    ``bulk_create``/``bulk_update``.
+
+    When the child serializer overrides ``create``/``update`` (nested writes,
+    password hashing...) every item goes through it instead, one at a time.
+
+    For updates ``instance`` is a dict of ``str(lookup_field value)`` -> model
+    instance and every item in ``data`` must carry its ``lookup_field``.
+    """
+
+    def __init__(self, *args, lookup_field="id", **kwargs):
+        self.lookup_field = lookup_field
+        super().__init__(*args, **kwargs)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            key = data.get(self.lookup_field) if isinstance(data, dict) else None
+            if key is None:
+                raise ValidationError({self.lookup_field: ["This field is required."]})
+            if str(key) not in self.instance:
+                raise ValidationError({self.lookup_field: ["Not found."]})
+            self.child.instance = self.instance[str(key)]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def _split_many_to_many(self, attrs: dict) -> tuple[dict, dict]:
+        many_to_many = {
+            field.name
+            for field in self.child.Meta.model._meta.many_to_many  # noqa: SLF001
+            if field.name in attrs
+        }
+        return (
+            {key: value for key, value in attrs.items() if key not in many_to_many},
+            {key: value for key, value in attrs.items() if key in many_to_many},
+        )
+
+    def create(self, validated_data):
+        model_class = self.child.Meta.model
+        if _overrides(self.child, "create", ModelSerializer):
+            return [self.child.create(attrs) for attrs in validated_data]
+        instances, relations = [], []
+        for item in validated_data:
+            attrs, many_to_many = self._split_many_to_many(item)
+            instances.append(model_class(**attrs))
+            relations.append(many_to_many)
+
+        model_class.objects.bulk_create(instances)
+        for instance, many_to_many in zip(instances, relations, strict=True):
+            for name, value in many_to_many.items():
+                getattr(instance, name).set(value)
+        bump_model_version(model_class)
+        return instances
+
+    def update(self, instance, validated_data):
+        model_class = self.child.Meta.model
+        if _overrides(self.child, "update", ModelSerializer):
+            return [
+                self.child.update(instance[str(data[self.lookup_field])], attrs)
+                for data, attrs in zip(self.initial_data, validated_data, strict=True)
+            ]
+        # bulk_update skips Field.pre_save so auto_now fields are set by hand
+        auto_now = [
+            field
+            for field in model_class._meta.concrete_fields  # noqa: SLF001
+            if getattr(field, "auto_now", False)
+        ]
+        now = timezone.now()
+        instances, fields = [], {field.name for field in auto_now}
+        for data, item in zip(self.initial_data, validated_data, strict=True):
+            obj = instance[str(data[self.lookup_field])]
+            attrs, many_to_many = self._split_many_to_many(item)
+            for name, value in attrs.items():
+                setattr(obj, name, value)
+                fields.add(name)
+            for field in auto_now:
+                setattr(obj, field.attname, now)
+            for name, value in many_to_many.items():
+                getattr(obj, name).set(value)
+            instances.append(obj)
+
+        model_class.objects.bulk_update(instances, fields)
+        bump_model_version(model_class)
+        return instances
 
 
 class ModelViewSetExcludeActionMixin:
@@ -45,6 +159,342 @@ class ModelViewSetExcludeActionMixin:
         super().perform_destroy(instance)
 
 
+class BulkModelViewSetMixin(ModelViewSetExcludeActionMixin):
+    """:class:`ModelViewSetExcludeActionMixin` with bulk endpoints, opt in by
+    using it instead.
+
+    ``POST``/``PATCH``/``DELETE`` on ``<prefix>/bulk/`` run the
+    ``bulk_create``/``bulk_update``/``bulk_destroy`` actions, which take an
+    array of at most ``bulk_max_items``, validate it in one serializer pass,
+    write it in one transaction and return a result per item. They are gated
+    by ``allow_actions`` like every other action.
+
+    A batch is all or nothing: when any item is invalid nothing is written
+    and the 400 response lists the errors per item, an empty dict for the
+    valid ones.
+
+    Writes go through ``perform_bulk_create``/``perform_bulk_update``, which
+    call ``perform_create``/``perform_update`` with the list serializer, and
+    ``perform_bulk_destroy``, which calls ``perform_destroy`` per instance
+    when it is overridden.
+    """
+
+    bulk_lookup_field = "id"
+    bulk_max_items = 1000
+
+    def get_bulk_serializer(self, *args, **kwargs) -> BulkListSerializer:
+        return BulkListSerializer(
+            *args,
+            child=self.get_serializer(partial=kwargs.get("partial", False)),
+            lookup_field=self.bulk_lookup_field,
+            max_length=self.bulk_max_items,
+            context=self.get_serializer_context(),
+            **kwargs,
+        )
+
+    def get_bulk_instances(self, keys: list) -> dict:
+        """fetch the instances in one query, keyed by ``str(key)`` so JSON
+        values match int and UUID primary keys alike"""
+        instances = self.get_queryset().in_bulk(keys, field_name=self.bulk_lookup_field)
+        for instance in instances.values():
+            self.check_object_permissions(self.request, instance)
+        return {str(key): instance for key, instance in instances.items()}
+
+    def check_bulk_items(self, items):
+        """reject anything but a list of at most ``bulk_max_items`` before
+        it reaches the database"""
+        if not isinstance(items, list) or len(items) > self.bulk_max_items:
+            msg = f"Expected a list of at most {self.bulk_max_items} items."
+            raise ValidationError(msg)
+
+    def check_bulk_keys(self, keys: list):
+        """reject values the lookup field can't hold and duplicates"""
+        opts = self.get_queryset().model._meta  # noqa: SLF001
+        if self.bulk_lookup_field == "pk":
+            field = opts.pk
+        else:
+            field = opts.get_field(self.bulk_lookup_field)
+        invalid = []
+        for key in keys:
+            if isinstance(key, (dict, list, bool)):
+                invalid.append(str(key))
+                continue
+            try:
+                field.to_python(key)
+            except DjangoValidationError:
+                invalid.append(str(key))
+        if invalid:
+            raise ValidationError(
+                {self.bulk_lookup_field: [f"Invalid values: {', '.join(invalid)}."]},
+            )
+        counts = Counter(str(key) for key in keys)
+        duplicates = sorted(key for key, count in counts.items() if count > 1)
+        if duplicates:
+            raise ValidationError(
+                {
+                    self.bulk_lookup_field: [
+                        f"Duplicate values: {', '.join(duplicates)}.",
+                    ],
+                },
+            )
+
+    def perform_bulk_create(self, serializer: BulkListSerializer):
+        # perform_create overrides usually call serializer.save(**kwargs),
+        # which the list serializer applies to every item
+        self.perform_create(serializer)
+
+    def perform_bulk_update(self, serializer: BulkListSerializer):
+        self.perform_update(serializer)
+
+    def perform_bulk_destroy(self, instances: list):
+        if _overrides(self, "perform_destroy", BulkModelViewSetMixin):
+            for instance in instances:
+                self.perform_destroy(instance)
+            return
+        self.get_queryset().filter(
+            pk__in=[instance.pk for instance in instances],
+        ).delete()
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request, *args, **kwargs):
+        self.check_action_allowed()
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_bulk_create(serializer)
+        return Response(
+            [{"status": "created", "data": data} for data in serializer.data],
+            status=status.HTTP_201_CREATED,
+        )
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        self.check_action_allowed()
+        self.check_bulk_items(request.data)
+        # items without a key are reported by the serializer
+        keys = [
+            item[self.bulk_lookup_field]
+            for item in request.data
+            if isinstance(item, dict) and item.get(self.bulk_lookup_field) is not None
+        ]
+        self.check_bulk_keys(keys)
+        serializer = self.get_bulk_serializer(
+            self.get_bulk_instances(keys),
+            data=request.data,
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_bulk_update(serializer)
+        return Response(
+            [{"status": "updated", "data": data} for data in serializer.data],
+        )
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        """takes a list of ``bulk_lookup_field`` values"""
+        self.check_action_allowed()
+        keys = request.data
+        self.check_bulk_items(keys)
+        self.check_bulk_keys(keys)
+        instances = self.get_bulk_instances(keys)
+        with transaction.atomic():
+            self.perform_bulk_destroy(list(instances.values()))
+        return Response(
+            [
+                {
+                    self.bulk_lookup_field: key,
+                    "status": "deleted" if str(key) in instances else "not_found",
+                }
+                for key in keys
+            ],
+        )
+
+
+class CachedListMixin:
+    """Cache ``list`` responses until one of ``cache_models`` changes.
+
+    The key is built from the view, the URL kwargs, the normalized query
+    params, the auth scope and the version counter of every model in
+    ``cache_models`` (defaults to the queryset model). Saving or deleting one
+    of those models bumps its version so old entries are simply never read
+    again. The response data is cached together with the headers the view
+    set.
+
+    Defining the view tracks its models. Processes that never import the
+    views (celery workers, management commands) only bump them once
+    :func:`core.utils.cache.track_model_versions` is called for those models,
+    e.g. from the ``AppConfig.ready`` of the app owning them.
+
+    cache_scope:
+        "user"   - one entry per authenticated user (default)
+        "public" - one entry shared by everybody, only for querysets that
+                   don't depend on request.user
+    """
+
+    cache_models = None
+    cache_scope = "user"
+    cache_timeout = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_models is not None:
+            track_model_versions(*cls.cache_models)
+        elif getattr(cls, "queryset", None) is not None:
+            track_model_versions(cls.queryset.model)
+
+    def get_cache_models(self):
+        if self.cache_models is not None:
+            return self.cache_models
+        queryset = self.queryset if self.queryset is not None else self.get_queryset()
+        return [queryset.model]
+
+    def get_cache_scope(self, request) -> str:
+        if self.cache_scope == "public":
+            return "public"
+        user = request.user
+        return f"user:{user.pk}" if user.is_authenticated else "anonymous"
+
+    def get_response_cache_key(self, request) -> str:
+        params = sorted(
+            (key, sorted(values)) for key, values in request.query_params.lists()
+        )
+        versions = sorted(get_model_versions(self.get_cache_models()).items())
+        renderer = getattr(request, "accepted_renderer", None)
+        return make_response_cache_key(
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            self.action,
+            sorted((key, str(value)) for key, value in self.kwargs.items()),
+            getattr(renderer, "format", None),
+            params,
+            self.get_cache_scope(request),
+            versions,
+        )
+
+    def list(self, request, *args, **kwargs):
+        response = None
+
+        def compute():
+            nonlocal response
+            response = super(CachedListMixin, self).list(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            return response.data, dict(response.items())
+
+        cached = get_or_compute(
+            self.get_response_cache_key(request),
+            compute,
+            timeout=self.cache_timeout,
+        )
+        if response is not None:
+            return response
+        data, headers = cached
+        return Response(data, headers=headers)
+
+
+class ConditionalGetMixin:
+    """Answer ``304 Not Modified`` for unchanged lists and details before the
+    serializer runs.
+
+    Validators come from ``conditional_field`` (``updated_at`` on every
+    ``TimeBasedModel``): for paginated lists an ETag over the page's rows and
+    the paginator's count, for unpaginated lists an ETag over
+    ``MAX(updated_at)`` plus the row count in a single aggregate query, and
+    ETag/Last-Modified from the instance's ``updated_at`` for details.
+    """
+
+    conditional_field = "updated_at"
+
+    def make_etag(self, request, *parts) -> str:
+        renderer = getattr(request, "accepted_renderer", None)
+        params = sorted(
+            (key, sorted(values)) for key, values in request.query_params.lists()
+        )
+        digest = hashlib.md5(  # noqa: S324
+            repr(
+                (self.action, getattr(renderer, "format", None), params, parts),
+            ).encode(),
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def conditional_response(self, request, response, etag, last_modified=None):
+        """return a 304 when the request validators match, otherwise
+        ``response`` (or None) with the validators attached"""
+        # non datetime fields (e.g. a version number) only feed the ETag
+        if isinstance(last_modified, datetime):
+            last_modified = int(last_modified.timestamp())
+        else:
+            last_modified = None
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        response = not_modified or response
+        if response is not None:
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_paginated_count(self):
+        """total reported by the paginator, so no second COUNT(*) runs"""
+        page = getattr(self.paginator, "page", None)
+        if page is not None:
+            return page.paginator.count
+        return getattr(self.paginator, "count", None)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            # the page is fetched for the response anyway, its rows and the
+            # paginator's (possibly estimated) count make up the ETag
+            etag = "W/" + self.make_etag(
+                request,
+                self.get_paginated_count(),
+                [(obj.pk, getattr(obj, self.conditional_field)) for obj in page],
+            )
+            not_modified = self.conditional_response(request, None, etag)
+            if not_modified is not None:
+                return not_modified
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return self.conditional_response(request, response, etag)
+
+        validators = queryset.aggregate(
+            last_modified=Max(self.conditional_field),
+            count=Count("pk"),
+        )
+        etag = "W/" + self.make_etag(
+            request,
+            validators["last_modified"],
+            validators["count"],
+        )
+        # no Last-Modified on lists, a delete lowers the count without moving
+        # MAX(updated_at) so only the ETag can be trusted
+        not_modified = self.conditional_response(request, None, etag)
+        if not_modified is not None:
+            return not_modified
+        response = super().list(request, *args, **kwargs)
+        return self.conditional_response(request, response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.conditional_field, None)
+        etag = self.make_etag(request, instance.pk, last_modified)
+        not_modified = self.conditional_response(request, None, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.conditional_response(
+            request,
+            Response(serializer.data),
+            etag,
+            last_modified,
+        )
+
+
 detail_success_response = {
     202: {
         "type": "object",